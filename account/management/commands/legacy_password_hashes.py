@@ -0,0 +1,38 @@
+from collections import Counter
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, get_hashers
+from django.core.management.base import BaseCommand
+from account.models import User
+
+
+class Command(BaseCommand):
+    help = 'Показать, какими алгоритмами захешированы пароли пользователей'
+
+    def handle(self, *args, **options):
+        preferred = get_hashers()[0].algorithm
+
+        counts = Counter()
+        passwords = User.objects.values_list('password', flat=True).iterator(chunk_size=2000)
+        for password in passwords:
+            if not password or password.startswith(UNUSABLE_PASSWORD_PREFIX):
+                counts['unusable'] += 1
+            else:
+                counts[password.split('$', 1)[0]] += 1
+
+        for algorithm, count in counts.most_common():
+            marker = '✅' if algorithm in (preferred, 'unusable') else '⚠️'
+            self.stdout.write(f'{marker} {algorithm}: {count}')
+
+        legacy = sum(
+            count for algorithm, count in counts.items()
+            if algorithm not in (preferred, 'unusable')
+        )
+        if legacy:
+            self.stdout.write(self.style.WARNING(
+                f'Устаревших хешей: {legacy}. Они обновятся до {preferred} при следующем входе — '
+                f'до этого соответствующие хешеры нельзя убирать из PASSWORD_HASHERS'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Все пароли используют {preferred} — устаревшие хешеры можно убрать из PASSWORD_HASHERS'
+            ))
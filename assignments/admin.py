@@ -1,10 +1,38 @@
 from django.contrib import admin
 from django.utils.html import format_html
+from django.utils.safestring import mark_safe
 from django.db.models import Count, Avg
 from content.models import Lesson
+from core.admin_filters import CourseListFilter
+from core.paginators import EstimatedCountPaginator
 from .models import AssignmentLesson, AssignmentSubmission, AssignmentComment
 
 
+_BADGE_TEMPLATE = '<span style="background-color: {}; color: white; padding: 3px 10px; border-radius: 3px;">{}</span>'
+_DEFAULT_BADGE_COLOR = '#6c757d'
+
+_SUBMISSION_STATUS_COLORS = {
+    'waiting': '#6c757d',
+    'in_review': '#ffc107',
+    'needs_revision': '#17a2b8',
+    'failed': '#dc3545',
+    'passed': '#28a745',
+}
+
+# Бейджи статусов собираем один раз при импорте
+_SUBMISSION_STATUS_BADGES = {
+    value: format_html(_BADGE_TEMPLATE, _SUBMISSION_STATUS_COLORS.get(value, _DEFAULT_BADGE_COLOR), label)
+    for value, label in AssignmentSubmission.STATUS_CHOICES
+}
+
+# Статичные фрагменты разметки — без format_html на каждую строку
+_AUTHOR_TYPE_BADGES = (
+    mark_safe('<span style="color: #28a745;">👨‍🎓 Студент</span>'),
+    mark_safe('<span style="color: #007bff; font-weight: bold;">👨‍🏫 Преподаватель</span>'),
+)
+_UNREAD_BADGE = mark_safe('<span style="color: #dc3545; font-weight: bold;">📬 Новое</span>')
+
+
 class AssignmentSubmissionInline(admin.TabularInline):
     """Inline для сдач задания"""
     model = AssignmentSubmission
@@ -14,6 +42,9 @@ class AssignmentSubmissionInline(admin.TabularInline):
     can_delete = False
     show_change_link = True
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user')
+
     def has_add_permission(self, request, obj=None):
         return False
 
@@ -22,6 +53,7 @@ class AssignmentSubmissionInline(admin.TabularInline):
 class AssignmentLessonAdmin(admin.ModelAdmin):
     list_display = ['lesson', 'require_text_badge', 'require_file_badge', 'max_score', 'deadline_days',
                     'submissions_info']
+    list_select_related = ('lesson',)
     search_fields = ['lesson__title', 'instructions']
     readonly_fields = ['submissions_count', 'pending_count', 'average_score']
 
@@ -64,30 +96,29 @@ class AssignmentLessonAdmin(admin.ModelAdmin):
 
     def submissions_info(self, obj):
         if obj.pk:
-            total = obj.get_submissions_count()
-            pending = obj.get_pending_count()
-            return f'📝 {total} | 🔍 {pending}'
+            stats = obj.submission_stats
+            return f'📝 {stats["total"]} | 🔍 {stats["pending"]}'
         return '-'
 
     submissions_info.short_description = 'Сдачи'
 
     def submissions_count(self, obj):
         if obj.pk:
-            return f'📝 {obj.get_submissions_count()}'
+            return f'📝 {obj.submission_stats["total"]}'
         return 0
 
     submissions_count.short_description = 'Всего сдач'
 
     def pending_count(self, obj):
         if obj.pk:
-            return f'🔍 {obj.get_pending_count()}'
+            return f'🔍 {obj.submission_stats["pending"]}'
         return 0
 
     pending_count.short_description = 'На проверке'
 
     def average_score(self, obj):
         if obj.pk:
-            return f'⭐ {obj.get_average_score()}'
+            return f'⭐ {obj.submission_stats["average_score"]}'
         return 0
 
     average_score.short_description = 'Средний балл'
@@ -99,6 +130,7 @@ class AssignmentCommentInline(admin.TabularInline):
     extra = 1
     fields = ['author', 'message', 'is_instructor', 'is_read', 'created_at']
     readonly_fields = ['created_at']
+    raw_id_fields = ['author']
     ordering = ['created_at']
 
 
@@ -106,11 +138,15 @@ class AssignmentCommentInline(admin.TabularInline):
 class AssignmentSubmissionAdmin(admin.ModelAdmin):
     list_display = ['user_info', 'assignment_short', 'submission_number', 'status_badge', 'score_display',
                     'submitted_at', 'comments_count']
-    list_filter = ['status', 'assignment__lesson__module__course', 'submitted_at']
+    list_select_related = ('user', 'assignment__lesson')
+    list_filter = ['status', CourseListFilter.for_path('assignment__lesson__module__course'), 'submitted_at']
     search_fields = ['user__email', 'user__first_name', 'user__last_name', 'assignment__lesson__title']
     readonly_fields = ['user', 'assignment', 'submission_number', 'submitted_at', 'reviewed_at', 'file_link',
                        'score_percentage', 'comments_count']
+    raw_id_fields = ['reviewed_by']
     date_hierarchy = 'submitted_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         ('Основная информация', {
@@ -131,6 +167,9 @@ class AssignmentSubmissionAdmin(admin.ModelAdmin):
     inlines = [AssignmentCommentInline]
     actions = ['mark_in_review_action', 'mark_passed_action', 'mark_needs_revision_action']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(comments_total=Count('comments'))
+
     def user_info(self, obj):
         return f"{obj.user.get_full_name()} ({obj.user.email})"
 
@@ -142,18 +181,10 @@ class AssignmentSubmissionAdmin(admin.ModelAdmin):
     assignment_short.short_description = 'Задание'
 
     def status_badge(self, obj):
-        colors = {
-            'waiting': '#6c757d',
-            'in_review': '#ffc107',
-            'needs_revision': '#17a2b8',
-            'failed': '#dc3545',
-            'passed': '#28a745',
-        }
-        return format_html(
-            '<span style="background-color: {}; color: white; padding: 3px 10px; border-radius: 3px;">{}</span>',
-            colors.get(obj.status, '#6c757d'),
-            obj.get_status_display()
-        )
+        badge = _SUBMISSION_STATUS_BADGES.get(obj.status)
+        if badge is None:
+            return format_html(_BADGE_TEMPLATE, _DEFAULT_BADGE_COLOR, obj.get_status_display())
+        return badge
 
     status_badge.short_description = 'Статус'
 
@@ -235,6 +266,7 @@ class AssignmentSubmissionAdmin(admin.ModelAdmin):
 class AssignmentCommentAdmin(admin.ModelAdmin):
     list_display = ['author_info', 'submission_short', 'message_short', 'author_type_badge', 'is_read_badge',
                     'created_at']
+    list_select_related = ('author', 'submission__user', 'submission__assignment__lesson')
     list_filter = ['is_instructor', 'is_read', 'created_at']
     search_fields = ['author__email', 'message', 'submission__user__email']
     readonly_fields = ['submission', 'author', 'created_at']
@@ -266,16 +298,14 @@ class AssignmentCommentAdmin(admin.ModelAdmin):
     message_short.short_description = 'Сообщение'
 
     def author_type_badge(self, obj):
-        if obj.is_instructor:
-            return format_html('<span style="color: #007bff; font-weight: bold;">👨‍🏫 Преподаватель</span>')
-        return format_html('<span style="color: #28a745;">👨‍🎓 Студент</span>')
+        return _AUTHOR_TYPE_BADGES[obj.is_instructor]
 
     author_type_badge.short_description = 'Тип'
 
     def is_read_badge(self, obj):
         if obj.is_read:
             return '✅ Прочитано'
-        return format_html('<span style="color: #dc3545; font-weight: bold;">📬 Новое</span>')
+        return _UNREAD_BADGE
 
     is_read_badge.short_description = 'Статус'
 
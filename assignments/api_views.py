@@ -1,3 +1,4 @@
+from django.db.models import Count, Prefetch, prefetch_related_objects
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes, parser_classes
@@ -16,6 +17,15 @@ from .serializers import (
 )
 
 
+def _prefetch_comments(submission):
+    """Комментарии с авторами для AssignmentSubmissionDetailSerializer — одним запросом"""
+    prefetch_related_objects(
+        [submission],
+        Prefetch('comments', queryset=AssignmentComment.objects.select_related('author'))
+    )
+    return submission
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 @parser_classes([MultiPartParser, FormParser])
@@ -29,13 +39,13 @@ def submit_assignment(request, assignment_id):
     - submission_text: текст ответа (опционально)
     - submission_file: файл (опционально)
     """
-    assignment = get_object_or_404(AssignmentLesson, id=assignment_id)
+    assignment = get_object_or_404(AssignmentLesson.objects.select_related('lesson'), id=assignment_id)
 
     # Проверка: зачислен ли на курс
     try:
         lesson_progress = LessonProgress.objects.get(
             user=request.user,
-            lesson=assignment.lesson
+            lesson_id=assignment.lesson_id
         )
     except LessonProgress.DoesNotExist:
         return Response(
@@ -58,23 +68,24 @@ def submit_assignment(request, assignment_id):
         )
 
     # Проверка: есть ли работа на проверке
-    existing_submission = AssignmentSubmission.objects.filter(
+    has_submission_in_review = AssignmentSubmission.objects.filter(
         user=request.user,
         assignment=assignment,
         status='in_review'
-    ).first()
+    ).exists()
 
-    if existing_submission:
+    if has_submission_in_review:
         return Response(
             {'error': 'У вас уже есть работа на проверке'},
             status=status.HTTP_400_BAD_REQUEST
         )
 
     # Проверка: можно ли пересдать
+    # (из прошлой сдачи нужны только статус и номер — текст ответа не загружаем)
     last_submission = AssignmentSubmission.objects.filter(
         user=request.user,
         assignment=assignment
-    ).order_by('-submission_number').first()
+    ).order_by('-submission_number').only('status', 'submission_number').first()
 
     if last_submission:
         if last_submission.status == 'needs_revision':
@@ -136,6 +147,8 @@ def my_submissions(request):
     ).select_related(
         'assignment__lesson',
         'reviewed_by'
+    ).annotate(
+        comments_total=Count('comments')
     ).order_by('-submitted_at')
 
     serializer = AssignmentSubmissionSerializer(
@@ -156,23 +169,19 @@ def submission_detail(request, submission_id):
     GET /api/assignments/submissions/{id}/
     """
     submission = get_object_or_404(
-        AssignmentSubmission,
+        AssignmentSubmission.objects.select_related('assignment__lesson', 'reviewed_by'),
         id=submission_id,
         user=request.user
     )
 
+    # Отметить комментарии как прочитанные (до загрузки — в ответе они уже прочитаны)
+    AssignmentComment.mark_thread_read(submission, request.user)
+
     serializer = AssignmentSubmissionDetailSerializer(
-        submission,
+        _prefetch_comments(submission),
         context={'request': request}
     )
 
-    # Отметить комментарии как прочитанные
-    submission.comments.filter(
-        is_read=False
-    ).exclude(
-        author=request.user
-    ).update(is_read=True)
-
     return Response(serializer.data)
 
 
@@ -231,7 +240,10 @@ def grade_assignment(request, submission_id):
     """
     print(f"🟢 grade_assignment: START submission_id={submission_id}")
 
-    submission = get_object_or_404(AssignmentSubmission, id=submission_id)
+    submission = get_object_or_404(
+        AssignmentSubmission.objects.select_related('user', 'assignment__lesson__module'),
+        id=submission_id
+    )
     print(f"🟢 Найдена сдача: {submission}")
 
     # ✅ Проверка прав: только инструктор курса может оценивать
@@ -249,13 +261,13 @@ def grade_assignment(request, submission_id):
         from progress.models import CourseEnrollment
 
         accessible_groups = user.get_accessible_groups()
-        enrollment = CourseEnrollment.objects.filter(
+        has_enrollment = CourseEnrollment.objects.filter(
             user=submission.user,
-            course=submission.assignment.lesson.module.course,
+            course_id=submission.assignment.lesson.module.course_id,
             group__in=accessible_groups
-        ).first()
+        ).exists()
 
-        if not enrollment:
+        if not has_enrollment:
             return Response(
                 {'error': 'У вас нет доступа к этой работе'},
                 status=status.HTTP_403_FORBIDDEN
@@ -306,7 +318,7 @@ def grade_assignment(request, submission_id):
         'success': True,
         'message': message,
         'submission': AssignmentSubmissionDetailSerializer(
-            submission,
+            _prefetch_comments(submission),
             context={'request': request}
         ).data
     })
\ No newline at end of file
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-17 01:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='assignmentsubmission',
+            name='status',
+            field=models.CharField(choices=[('waiting', '⏳ Ожидает сдачи'), ('in_review', '🔍 На проверке'), ('needs_revision', '✏️ Требуется доработка'), ('failed', '❌ Не зачтено'), ('passed', '✅ Зачтено')], default='in_review', max_length=20, verbose_name='Статус'),
+        ),
+        migrations.AddIndex(
+            model_name='assignmentsubmission',
+            index=models.Index(condition=models.Q(('status', 'in_review')), fields=['-submitted_at'], name='assignments_in_review_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-17 01:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assignments', '0002_submission_in_review_partial_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='assignmentsubmission',
+            constraint=models.CheckConstraint(condition=models.Q(('status', 'waiting'), models.Q(('submission_text', ''), _negated=True), models.Q(('submission_file__isnull', False), models.Q(('submission_file', ''), _negated=True)), _connector='OR'), name='assignments_submission_has_content', violation_error_message='Необходимо отправить текст или файл'),
+        ),
+    ]
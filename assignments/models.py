@@ -2,6 +2,7 @@ from django.conf import settings
 from django.core.validators import MinValueValidator
 from django.db import models
 from django.utils import timezone
+from django.utils.functional import cached_property
 
 from content.models import Lesson
 
@@ -71,11 +72,25 @@ class AssignmentLesson(models.Model):
 
     def get_average_score(self):
         """Средний балл по заданию"""
-        submissions = self.submissions.filter(status='passed', score__isnull=False)
-        if submissions.exists():
-            avg = submissions.aggregate(models.Avg('score'))['score__avg']
-            return round(avg, 2) if avg else 0
-        return 0
+        avg = self.submissions.filter(
+            status='passed', score__isnull=False
+        ).aggregate(models.Avg('score'))['score__avg']
+        return round(avg, 2) if avg else 0
+
+    @cached_property
+    def submission_stats(self):
+        """
+        Статистика сдач одним запросом: total, pending и average_score.
+        Считается один раз на объект — для отображения, где нужны сразу все показатели.
+        """
+        stats = self.submissions.aggregate(
+            total=models.Count('pk'),
+            pending=models.Count('pk', filter=models.Q(status='in_review')),
+            average_score=models.Avg('score', filter=models.Q(status='passed', score__isnull=False)),
+        )
+        avg = stats['average_score']
+        stats['average_score'] = round(avg, 2) if avg else 0
+        return stats
 
 
 class AssignmentSubmission(models.Model):
@@ -124,8 +139,7 @@ class AssignmentSubmission(models.Model):
         'Статус',
         max_length=20,
         choices=STATUS_CHOICES,
-        default='in_review',
-        db_index=True
+        default='in_review'
     )
 
     score = models.PositiveIntegerField(
@@ -156,10 +170,29 @@ class AssignmentSubmission(models.Model):
         verbose_name = 'Сдача задания'
         verbose_name_plural = 'Сдачи заданий'
         ordering = ['-submitted_at']
+        # Отдельный индекс по status не нужен: его покрывает (status, -submitted_at)
         indexes = [
             models.Index(fields=['user', 'assignment', '-submitted_at']),
             models.Index(fields=['status', '-submitted_at']),
             models.Index(fields=['assignment', 'status']),
+            # Очередь проверки: только работы на проверке — малая доля таблицы
+            models.Index(
+                fields=['-submitted_at'],
+                condition=models.Q(status='in_review'),
+                name='assignments_in_review_idx',
+            ),
+        ]
+        # Сданная работа должна содержать текст или файл; дружелюбные сообщения даёт сериализатор
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(status='waiting')
+                    | ~models.Q(submission_text='')
+                    | (models.Q(submission_file__isnull=False) & ~models.Q(submission_file=''))
+                ),
+                name='assignments_submission_has_content',
+                violation_error_message='Необходимо отправить текст или файл',
+            ),
         ]
 
     def __str__(self):
@@ -167,36 +200,39 @@ class AssignmentSubmission(models.Model):
 
     def save(self, *args, **kwargs):
         """Переопределяем save для автозавершения урока"""
-        if self.pk:
-            try:
-                old_submission = AssignmentSubmission.objects.get(pk=self.pk)
-                if old_submission.status != 'passed' and self.status == 'passed':
-                    # Статус изменен на passed — завершаем урок через mark_completed
-                    super().save(*args, **kwargs)
-
-                    from progress.models import LessonProgress
-
-                    lesson_progress, created = LessonProgress.objects.get_or_create(
-                        user=self.user,
-                        lesson=self.assignment.lesson,
-                        defaults={'is_completed': False}
-                    )
-
-                    if not lesson_progress.is_completed:
-                        lesson_progress.mark_completed(
-                            completion_data={'assignment_score': self.score}
-                        )
-                    return
-            except AssignmentSubmission.DoesNotExist:
-                pass
+        update_fields = kwargs.get('update_fields')
+        status_changed = update_fields is None or 'status' in update_fields
+
+        # Старая запись нужна только ради статуса: текст ответа и остальные поля не читаем
+        if self.pk and status_changed and self.status == 'passed':
+            old_status = AssignmentSubmission.objects.filter(
+                pk=self.pk
+            ).values_list('status', flat=True).first()
+
+            if old_status is not None and old_status != 'passed':
+                # Статус изменен на passed — завершаем урок через mark_completed
+                super().save(*args, **kwargs)
+                self._complete_lesson()
+                return
 
         super().save(*args, **kwargs)
 
+    def _complete_lesson(self):
+        """Завершить урок задания: mark_completed пересчитает прогресс курса и создаст выпускника"""
+        from progress.models import LessonProgress
+
+        # Прогресс создаётся при зачислении, так что обычно это один SELECT
+        lesson_progress, created = LessonProgress.get_or_create_safe(
+            user=self.user,
+            lesson=self.assignment.lesson
+        )
+        lesson_progress.mark_completed(completion_data={'assignment_score': self.score})
+
     def mark_in_review(self, instructor):
         """Взять на проверку"""
         self.status = 'in_review'
         self.reviewed_by = instructor
-        self.save()
+        self.save(update_fields=['status', 'reviewed_by'])
 
     def mark_needs_revision(self, instructor, feedback):
         """Отправить на доработку"""
@@ -204,7 +240,7 @@ class AssignmentSubmission(models.Model):
         self.reviewed_by = instructor
         self.feedback = feedback
         self.reviewed_at = timezone.now()
-        self.save()
+        self.save(update_fields=['status', 'reviewed_by', 'feedback', 'reviewed_at'])
 
 
         from notifications.services import NotificationService
@@ -220,29 +256,23 @@ class AssignmentSubmission(models.Model):
         self.reviewed_by = instructor
         self.feedback = feedback
         self.reviewed_at = timezone.now()
-        self.save()
+        self.save(update_fields=['status', 'score', 'reviewed_by', 'feedback', 'reviewed_at'])
 
     def mark_passed(self, instructor, score, feedback=''):
         """Зачесть"""
+        was_passed = self.status == 'passed'
+
         self.status = 'passed'
         self.score = score
         self.reviewed_by = instructor
         self.feedback = feedback
         self.reviewed_at = timezone.now()
-        self.save()
-
-        # Обновить прогресс урока
-        from progress.models import LessonProgress, CourseEnrollment
+        # Переход в passed завершает урок внутри save()
+        self.save(update_fields=['status', 'score', 'reviewed_by', 'feedback', 'reviewed_at'])
 
-        lesson_progress, created = LessonProgress.objects.get_or_create(
-            user=self.user,
-            lesson=self.assignment.lesson,
-            defaults={'is_completed': False}
-        )
-
-        # Вызываем mark_completed — он пересчитает прогресс курса и создаст выпускника
-        if not lesson_progress.is_completed:
-            lesson_progress.mark_completed(completion_data={'assignment_score': score})
+        # Повторная оценка зачтённой работы: save() урок не трогал
+        if was_passed:
+            self._complete_lesson()
 
         # Уведомление
         from notifications.services import NotificationService
@@ -263,6 +293,11 @@ class AssignmentSubmission(models.Model):
 
     def get_comments_count(self):
         """Количество комментариев"""
+        # Аннотация comments_total из списков — без COUNT на каждую сдачу
+        comments_total = getattr(self, 'comments_total', None)
+        if comments_total is not None:
+            return comments_total
+
         return self.comments.count()
 
     def get_unread_comments_count(self, user):
@@ -312,4 +347,14 @@ class AssignmentComment(models.Model):
 
     def __str__(self):
         author_type = '👨‍🏫' if self.is_instructor else '👨‍🎓'
-        return f"{author_type} {self.author.email} - {self.created_at.strftime('%d.%m.%Y %H:%M')}"
\ No newline at end of file
+        return f"{author_type} {self.author.email} - {self.created_at.strftime('%d.%m.%Y %H:%M')}"
+
+    @classmethod
+    def mark_thread_read(cls, submission, reader):
+        """Отметить прочитанными все чужие комментарии к сдаче — одним UPDATE"""
+        return cls.objects.filter(
+            submission=submission,
+            is_read=False
+        ).exclude(
+            author=reader
+        ).update(is_read=True)
\ No newline at end of file
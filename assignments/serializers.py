@@ -52,7 +52,8 @@ class AssignmentSubmissionSerializer(serializers.ModelSerializer):
 
     assignment_title = serializers.CharField(source='assignment.lesson.title', read_only=True)
     score_percentage = serializers.SerializerMethodField()
-    file_url = serializers.SerializerMethodField()
+    # Абсолютный URL строит сам FileField (build_absolute_uri при наличии request) — без метода на каждую сдачу
+    file_url = serializers.FileField(source='submission_file', read_only=True, use_url=True)
     comments_count = serializers.SerializerMethodField()
 
     class Meta:
@@ -73,13 +74,6 @@ class AssignmentSubmissionSerializer(serializers.ModelSerializer):
     def get_score_percentage(self, obj):
         return obj.get_score_percentage()
 
-    def get_file_url(self, obj):
-        if obj.submission_file:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.submission_file.url)
-        return None
-
     def get_comments_count(self, obj):
         return obj.get_comments_count()
 
@@ -90,7 +84,7 @@ class AssignmentSubmissionDetailSerializer(serializers.ModelSerializer):
     assignment = AssignmentLessonDetailSerializer(read_only=True)
     comments = AssignmentCommentSerializer(many=True, read_only=True)
     score_percentage = serializers.SerializerMethodField()
-    file_url = serializers.SerializerMethodField()
+    file_url = serializers.FileField(source='submission_file', read_only=True, use_url=True)
     reviewed_by_name = serializers.SerializerMethodField()
     can_resubmit = serializers.SerializerMethodField()
 
@@ -116,13 +110,6 @@ class AssignmentSubmissionDetailSerializer(serializers.ModelSerializer):
     def get_score_percentage(self, obj):
         return obj.get_score_percentage()
 
-    def get_file_url(self, obj):
-        if obj.submission_file:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.submission_file.url)
-        return None
-
     def get_reviewed_by_name(self, obj):
         if obj.reviewed_by:
             return obj.reviewed_by.get_full_name()
@@ -1,3 +1,48 @@
 from django.test import TestCase
+from rest_framework.test import APIRequestFactory
 
-# Create your tests here.
+from account.models import User
+from assignments.models import AssignmentLesson, AssignmentSubmission
+from assignments.serializers import AssignmentSubmissionSerializer, AssignmentSubmissionDetailSerializer
+from content.models import Course, Module, Lesson
+
+
+# ─── file_url в сериализаторах сдачи ───────────────────────────────
+
+class AssignmentSubmissionFileUrlTest(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user(
+            email='student@test.com',
+            password='testpass123',
+            iin='123456789012',
+            first_name='Test',
+            last_name='Student',
+        )
+        course = Course.objects.create(title='Test Course')
+        module = Module.objects.create(course=course, title='Module 1', order=0)
+        lesson = Lesson.objects.create(module=module, title='Assignment', lesson_type='assignment', order=0)
+        assignment = AssignmentLesson.objects.create(lesson=lesson, instructions='Сделать')
+
+        self.with_file = AssignmentSubmission.objects.create(
+            user=user, assignment=assignment, submission_number=1,
+            submission_file='assignment_submissions/2024/05/answer.pdf',
+        )
+        self.text_only = AssignmentSubmission.objects.create(
+            user=user, assignment=assignment, submission_number=2, submission_text='Ответ',
+        )
+        self.request = APIRequestFactory().get('/', HTTP_HOST='lms.example.com')
+
+    def test_absolute_url(self):
+        for serializer_class in (AssignmentSubmissionSerializer, AssignmentSubmissionDetailSerializer):
+            with self.subTest(serializer=serializer_class.__name__):
+                data = serializer_class(self.with_file, context={'request': self.request}).data
+                self.assertEqual(
+                    data['file_url'], 'http://lms.example.com/media/assignment_submissions/2024/05/answer.pdf',
+                )
+
+    def test_no_file(self):
+        for serializer_class in (AssignmentSubmissionSerializer, AssignmentSubmissionDetailSerializer):
+            with self.subTest(serializer=serializer_class.__name__):
+                data = serializer_class(self.text_only, context={'request': self.request}).data
+                self.assertIsNone(data['file_url'])
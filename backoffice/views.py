@@ -1,7 +1,7 @@
 from django.http import HttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.db.models import Count, Q, F
+from django.db.models import Count, Q, F, Prefetch
 from .decorators import backoffice_required, instructor_required, instructor_or_manager_required, manager_required
 from groups.models import Group, GroupMembership, GroupInstructor
 from assignments.models import AssignmentSubmission
@@ -82,13 +82,13 @@ def assignment_detail(request, submission_id):
     if not user.is_super_instructor():
         # Проверяем что студент в доступной группе
         accessible_groups = user.get_accessible_groups()
-        enrollment = CourseEnrollment.objects.filter(
+        has_enrollment = CourseEnrollment.objects.filter(
             user=submission.user,
-            course=submission.assignment.lesson.module.course,
+            course_id=submission.assignment.lesson.module.course_id,
             group__in=accessible_groups
-        ).first()
+        ).exists()
 
-        if not enrollment:
+        if not has_enrollment:
             messages.error(request, 'У вас нет доступа к этой работе')
             return redirect('backoffice:assignments_check')
 
@@ -222,23 +222,30 @@ def group_program(request, group_id):
     student_ids = [s.id for s in students]
 
     # Все модули курса с уроками
-    modules = Module.objects.filter(course=course).prefetch_related('lessons').order_by('order')
-
-    # Весь прогресс студентов этой группы по урокам курса
-    all_progress = LessonProgress.objects.filter(
+    # Шаблону нужны только количество и id уроков — тяжёлые поля не загружаем
+    modules = Module.objects.filter(course=course).prefetch_related(
+        Prefetch('lessons', queryset=Lesson.objects.listing())
+    ).order_by('order')
+
+    # Завершённые уроки студентов этой группы по курсу — только нужные колонки кортежами,
+    # без создания моделей и загрузки completion_data/user agent на каждую строку
+    # (связи и сортировка не нужны: прогресс индексируется по user_id и lesson_id)
+    completed_progress = LessonProgress.objects.filter(
         user_id__in=student_ids,
-        lesson__module__course=course
-    ).select_related('lesson', 'lesson__module', 'user')
+        course=course,
+        is_completed=True
+    ).order_by().values_list('user_id', 'lesson_id', 'completed_at', 'completed_ip')
 
-    # Индексируем: {user_id: {lesson_id: lesson_progress}}
+    # Индексируем: {user_id: {lesson_id: (completed_at, completed_ip)}}
     progress_map = {}
-    for lp in all_progress:
-        progress_map.setdefault(lp.user_id, {})[lp.lesson_id] = lp
+    for user_id, lesson_id, completed_at, completed_ip in completed_progress:
+        progress_map.setdefault(user_id, {})[lesson_id] = (completed_at, completed_ip)
 
     # Собираем данные по модулям
     modules_data = []
     for module in modules:
-        lessons = list(module.lessons.all().order_by('order'))
+        # Уроки из prefetch уже упорядочены (Meta.ordering) — order_by() обошёл бы кэш
+        lessons = list(module.lessons.all())
         lesson_ids = [l.id for l in lessons]
         total_lessons = len(lessons)
 
@@ -250,14 +257,14 @@ def group_program(request, group_id):
             user_progress = progress_map.get(student.id, {})
 
             completed_in_module = 0
-            last_completed_lp = None
+            last_completed = None  # (completed_at, completed_ip) последнего завершённого урока
 
             for lesson in lessons:
-                lp = user_progress.get(lesson.id)
-                if lp and lp.is_completed:
+                completed = user_progress.get(lesson.id)
+                if completed:
                     completed_in_module += 1
-                    if not last_completed_lp or (lp.completed_at and (not last_completed_lp.completed_at or lp.completed_at > last_completed_lp.completed_at)):
-                        last_completed_lp = lp
+                    if not last_completed or (completed[0] and (not last_completed[0] or completed[0] > last_completed[0])):
+                        last_completed = completed
 
             if completed_in_module == total_lessons and total_lessons > 0:
                 # Завершил весь модуль
@@ -265,8 +272,8 @@ def group_program(request, group_id):
                     'user': student,
                     'completed_lessons': completed_in_module,
                     'total_lessons': total_lessons,
-                    'last_ip': last_completed_lp.completed_ip if last_completed_lp else None,
-                    'last_completed_at': last_completed_lp.completed_at if last_completed_lp else None,
+                    'last_ip': last_completed[1] if last_completed else None,
+                    'last_completed_at': last_completed[0] if last_completed else None,
                 })
             elif completed_in_module > 0:
                 # В процессе прохождения этого модуля
@@ -274,8 +281,8 @@ def group_program(request, group_id):
                     'user': student,
                     'completed_lessons': completed_in_module,
                     'total_lessons': total_lessons,
-                    'last_ip': last_completed_lp.completed_ip if last_completed_lp else None,
-                    'last_completed_at': last_completed_lp.completed_at if last_completed_lp else None,
+                    'last_ip': last_completed[1] if last_completed else None,
+                    'last_completed_at': last_completed[0] if last_completed else None,
                 })
 
         modules_data.append({
@@ -337,7 +344,7 @@ def student_progress(request, user_id, group_id):
     # Прогресс по урокам
     lessons_progress = LessonProgress.objects.filter(
         user=student,
-        lesson__module__course=group.course
+        course_id=group.course_id
     ).select_related('lesson', 'lesson__module').order_by(
         'lesson__module__order',
         'lesson__order'
@@ -588,7 +595,7 @@ def quiz_attempt_detail(request, attempt_id):
     # Получаем enrollment студента для этого курса
     enrollment = CourseEnrollment.objects.filter(
         user=attempt.user,
-        course=attempt.quiz.lesson.module.course,
+        course_id=attempt.quiz.lesson.module.course_id,
     ).select_related('group').first()
 
     # Проверка доступа для обычного инструктора
@@ -636,7 +643,7 @@ def export_quiz_attempt_pdf(request, attempt_id):
     if not user.is_super_instructor():
         enrollment = CourseEnrollment.objects.filter(
             user=attempt.user,
-            course=attempt.quiz.lesson.module.course,
+            course_id=attempt.quiz.lesson.module.course_id,
         ).select_related('group').first()
 
         accessible_groups = user.get_accessible_groups()
@@ -688,14 +695,16 @@ def assignments_check(request):
             ).distinct()
 
     # Применяем фильтр по статусу для отображения
-    filtered_submissions = submissions.filter(status=status_filter).order_by('-submitted_at')
-
-    # Статистика - с учетом групп (для обычного) или все (для супер)
-    stats = {
-        'in_review': submissions.filter(status='in_review').count(),
-        'needs_revision': submissions.filter(status='needs_revision').count(),
-        'passed': submissions.filter(status='passed').count(),
-    }
+    # (текст ответа и отзыв в списке не показываются — не загружаем их)
+    filtered_submissions = submissions.filter(status=status_filter).defer(
+        'submission_text', 'feedback'
+    ).order_by('-submitted_at')
+
+    # Статистика - с учетом групп (для обычного) или все (для супер), одним запросом
+    stats = submissions.order_by().aggregate(**{
+        status_value: Count('id', distinct=True, filter=Q(status=status_value))
+        for status_value in ('in_review', 'needs_revision', 'passed')
+    })
 
     context = {
         'submissions': filtered_submissions,
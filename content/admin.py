@@ -1,9 +1,46 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from django.db.models import Count
+from django.utils.safestring import mark_safe
+from django.db import connections
+from django.db.models import Count, CharField, Func, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat
+from core.admin_filters import CourseListFilter
+from core.paginators import EstimatedCountPaginator
 from .models import Course, Module, Lesson, VideoLesson, TextLesson, LessonMaterial
 
 
+_BADGE_TEMPLATE = '<span style="background-color: {}; color: white; padding: 3px 10px; border-radius: 3px;">{}</span>'
+
+# Бейджи зависят только от фиксированных значений — собираем их один раз при импорте
+_COURSE_STATUS_BADGES = (
+    mark_safe(_BADGE_TEMPLATE.format('#dc3545', '❌ Неактивен')),
+    mark_safe(_BADGE_TEMPLATE.format('#28a745', '✅ Активен')),
+)
+
+_LESSON_TYPE_COLORS = {
+    'video': '#007bff',
+    'text': '#28a745',
+    'quiz': '#ffc107',
+    'assignment': '#dc3545',
+}
+_LESSON_TYPE_BADGES = {
+    lesson_type: format_html(_BADGE_TEMPLATE, _LESSON_TYPE_COLORS[lesson_type], label)
+    for lesson_type, label in Lesson.LESSON_TYPES
+}
+
+
+class WordCount(Func):
+    """
+    Количество слов в тексте, посчитанное в PostgreSQL.
+    Совпадает с len(content.split()): пробелы по краям не дают пустых слов.
+    """
+    template = (
+        r"COALESCE(array_length(regexp_split_to_array("
+        r"NULLIF(regexp_replace(%(expressions)s, '^\s+|\s+$', '', 'g'), ''), '\s+'), 1), 0)"
+    )
+    output_field = IntegerField()
+
+
 class ModuleInline(admin.TabularInline):
     """Inline для модулей курса"""
     model = Module
@@ -12,9 +49,12 @@ class ModuleInline(admin.TabularInline):
     readonly_fields = ['lessons_count']
     ordering = ['order']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_lessons_count=Count('lessons'))
+
     def lessons_count(self, obj):
         if obj.pk:
-            return obj.get_lessons_count()
+            return obj._lessons_count
         return 0
 
     lessons_count.short_description = '📚 Уроков'
@@ -53,30 +93,36 @@ class CourseAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
     def status_badge(self, obj):
-        if obj.is_active:
-            return format_html(
-                '<span style="background-color: #28a745; color: white; padding: 3px 10px; border-radius: 3px;">✅ Активен</span>'
-            )
-        return format_html(
-            '<span style="background-color: #dc3545; color: white; padding: 3px 10px; border-radius: 3px;">❌ Неактивен</span>'
-        )
+        return _COURSE_STATUS_BADGES[obj.is_active]
 
     status_badge.short_description = 'Статус'
 
-    def modules_count(self, obj):
-        return obj.get_modules_count()
+    def get_queryset(self, request):
+        from progress.models import CourseEnrollment
 
-    modules_count.short_description = '📦 Модулей'
+        # Студентов считаем подзапросом, чтобы не перемножать JOIN с модулями и уроками
+        students_subquery = CourseEnrollment.objects.filter(
+            course=OuterRef('pk'),
+            is_active=True
+        ).order_by().values('course').annotate(count=Count('pk')).values('count')
 
-    def lessons_count(self, obj):
-        return obj.get_lessons_count()
+        return super().get_queryset(request).annotate(
+            _modules_count=Count('modules', distinct=True),
+            _lessons_count=Count('modules__lessons', distinct=True),
+            _students_count=Coalesce(Subquery(students_subquery, output_field=IntegerField()), 0),
+        )
 
-    lessons_count.short_description = '📚 Уроков'
+    @admin.display(description='📦 Модулей', ordering='_modules_count')
+    def modules_count(self, obj):
+        return obj._modules_count
 
-    def students_count(self, obj):
-        return obj.get_enrolled_students_count()
+    @admin.display(description='📚 Уроков', ordering='_lessons_count')
+    def lessons_count(self, obj):
+        return obj._lessons_count
 
-    students_count.short_description = '👥 Студентов'
+    @admin.display(description='👥 Студентов', ordering='_students_count')
+    def students_count(self, obj):
+        return obj._students_count
 
     actions = ['activate_courses', 'deactivate_courses']
 
@@ -104,7 +150,8 @@ class LessonInline(admin.TabularInline):
 @admin.register(Module)
 class ModuleAdmin(admin.ModelAdmin):
     list_display = ['title', 'course', 'order', 'lessons_count', 'created_at']
-    list_filter = ['course', 'created_at']
+    list_select_related = ('course',)
+    list_filter = [CourseListFilter, 'created_at']
     search_fields = ['title', 'description', 'course__title']
     readonly_fields = ['created_at', 'updated_at', 'lessons_count']
 
@@ -124,12 +171,12 @@ class ModuleAdmin(admin.ModelAdmin):
 
     inlines = [LessonInline]
 
-    def lessons_count(self, obj):
-        if obj.pk:
-            return obj.get_lessons_count()
-        return 0
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_lessons_count=Count('lessons'))
 
-    lessons_count.short_description = '📚 Уроков'
+    @admin.display(description='📚 Уроков', ordering='_lessons_count')
+    def lessons_count(self, obj):
+        return obj._lessons_count
 
 
 class VideoLessonInline(admin.StackedInline):
@@ -171,7 +218,8 @@ class LessonMaterialInline(admin.TabularInline):
 class LessonAdmin(admin.ModelAdmin):
     list_display = ['title', 'type_badge', 'module', 'order', 'access_delay_badge', 'requires_completion_badge',
                     'materials_count']
-    list_filter = ['lesson_type', 'module__course', 'requires_previous_completion']
+    list_select_related = ('module__course',)
+    list_filter = ['lesson_type', CourseListFilter.for_path('module__course'), 'requires_previous_completion']
     search_fields = ['title', 'description', 'module__title']
     readonly_fields = ['created_at', 'updated_at', 'materials_count', 'type_instance_info']
 
@@ -194,6 +242,12 @@ class LessonAdmin(admin.ModelAdmin):
 
     inlines = [VideoLessonInline, TextLessonInline, LessonMaterialInline]
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        """Модули в списке выбора — вместе с курсом (он в __str__ модуля)"""
+        if db_field.name == "module":
+            kwargs["queryset"] = Module.objects.select_related('course')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
     def get_inline_instances(self, request, obj=None):
         """Показываем только нужный inline в зависимости от типа урока"""
         if obj:
@@ -207,17 +261,10 @@ class LessonAdmin(admin.ModelAdmin):
         return []
 
     def type_badge(self, obj):
-        colors = {
-            'video': '#007bff',
-            'text': '#28a745',
-            'quiz': '#ffc107',
-            'assignment': '#dc3545',
-        }
-        return format_html(
-            '<span style="background-color: {}; color: white; padding: 3px 10px; border-radius: 3px;">{}</span>',
-            colors.get(obj.lesson_type, '#6c757d'),
-            obj.get_lesson_type_display()
-        )
+        badge = _LESSON_TYPE_BADGES.get(obj.lesson_type)
+        if badge is None:
+            return format_html(_BADGE_TEMPLATE, '#6c757d', obj.get_lesson_type_display())
+        return badge
 
     type_badge.short_description = 'Тип'
 
@@ -233,12 +280,18 @@ class LessonAdmin(admin.ModelAdmin):
 
     requires_completion_badge.short_description = 'Требует завершения'
 
-    def materials_count(self, obj):
-        if obj.pk:
-            return obj.get_materials_count()
-        return 0
+    def get_queryset(self, request):
+        # Материалы для колонки списка считаем в том же запросе, а не COUNT на каждую строку
+        return super().get_queryset(request).annotate(_materials_count=Count('materials'))
 
-    materials_count.short_description = '📎 Материалов'
+    @admin.display(description='📎 Материалов', ordering='_materials_count')
+    def materials_count(self, obj):
+        if not obj.pk:
+            return 0
+        materials_count = getattr(obj, '_materials_count', None)
+        if materials_count is None:
+            materials_count = obj.get_materials_count()
+        return materials_count
 
     def type_instance_info(self, obj):
         """Информация о конкретном типе урока"""
@@ -271,6 +324,7 @@ class LessonAdmin(admin.ModelAdmin):
 @admin.register(VideoLesson)
 class VideoLessonAdmin(admin.ModelAdmin):
     list_display = ['lesson', 'vimeo_video_id', 'formatted_duration', 'completion_threshold']
+    list_select_related = ('lesson',)
     search_fields = ['lesson__title', 'vimeo_video_id']
     readonly_fields = ['video_duration', 'formatted_duration', 'embed_url', 'thumbnail_preview']
 
@@ -330,6 +384,7 @@ class VideoLessonAdmin(admin.ModelAdmin):
 @admin.register(TextLesson)
 class TextLessonAdmin(admin.ModelAdmin):
     list_display = ['lesson', 'word_count', 'estimated_reading_time']
+    list_select_related = ('lesson',)
     search_fields = ['lesson__title', 'content']
     readonly_fields = ['word_count']
 
@@ -348,19 +403,32 @@ class TextLessonAdmin(admin.ModelAdmin):
             kwargs["queryset"] = Lesson.objects.filter(lesson_type='text')
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        # Считаем слова в БД, чтобы не гонять длинные тексты через split() на каждой строке
+        if connections[queryset.db].vendor == 'postgresql':
+            queryset = queryset.annotate(_word_count=WordCount('content'))
+        return queryset
+
     def word_count(self, obj):
         if obj.pk:
-            return f'📝 {obj.get_word_count()} слов'
+            count = getattr(obj, '_word_count', None)
+            if count is None:
+                count = obj.get_word_count()
+            return f'📝 {count} слов'
         return '-'
 
     word_count.short_description = 'Количество слов'
 
 @admin.register(LessonMaterial)
 class LessonMaterialAdmin(admin.ModelAdmin):
-    list_display = ['title', 'lesson', 'order', 'has_file', 'has_url']
-    list_filter = ['lesson__module__course']
+    list_display = ['title', 'lesson_title', 'order', 'has_file', 'has_url']
+    list_filter = [CourseListFilter.for_path('lesson__module__course')]
     search_fields = ['title', 'description', 'lesson__title']
     readonly_fields = ['created_at', 'file_size_display']
+    raw_id_fields = ['lesson']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         ('Основная информация', {
@@ -375,16 +443,26 @@ class LessonMaterialAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        # Подпись урока собирается в SQL — без загрузки Lesson на каждую строку
+        return super().get_queryset(request).annotate(
+            _lesson_title=Concat(
+                'lesson__order', Value('. '), 'lesson__title', output_field=CharField()
+            ),
+        )
+
+    @admin.display(description='Урок', ordering='_lesson_title')
+    def lesson_title(self, obj):
+        return obj._lesson_title
+
+    @admin.display(description='Файл', ordering='file')
     def has_file(self, obj):
         return '📎 Да' if obj.file else '❌ Нет'
 
-    has_file.short_description = 'Файл'
-
+    @admin.display(description='Ссылка', ordering='url')
     def has_url(self, obj):
         return '🔗 Да' if obj.url else '❌ Нет'
 
-    has_url.short_description = 'Ссылка'
-
     def file_size_display(self, obj):
         if obj.pk and obj.file:
             size = obj.get_file_size()
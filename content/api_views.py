@@ -3,7 +3,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
-from .models import Course, Lesson, VideoLesson, TextLesson
+from .models import Course, Module, Lesson, VideoLesson, TextLesson
 from .serializers import (
     CourseListSerializer,
     CourseDetailSerializer,
@@ -22,7 +22,7 @@ class CourseListView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        from django.db.models import Count, Exists, OuterRef
+        from django.db.models import Exists, OuterRef
         from progress.models import CourseEnrollment
 
         # Подзапрос для проверки зачисления
@@ -32,12 +32,10 @@ class CourseListView(APIView):
             is_active=True
         )
 
-        # Один запрос с аннотациями
+        # Один запрос: счётчики — подзапросами, без JOIN модулей и уроков
         courses = Course.objects.filter(
             is_active=True
-        ).annotate(
-            modules_count_annotated=Count('modules', distinct=True),
-            lessons_count_annotated=Count('modules__lessons', distinct=True),
+        ).with_counts().annotate(
             is_enrolled_annotated=Exists(enrollment_subquery)
         ).order_by('-created_at')
 
@@ -56,7 +54,27 @@ class CourseDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk):
-        course = get_object_or_404(Course, pk=pk, is_active=True)
+        from django.db.models import Count, Exists, OuterRef, Prefetch
+
+        enrollment_subquery = CourseEnrollment.objects.filter(
+            user=request.user,
+            course=OuterRef('pk'),
+            is_active=True
+        )
+
+        # Счётчики — аннотациями, модули и уроки — двумя запросами вместо запроса на каждый модуль
+        modules = Module.objects.annotate(
+            lessons_count_annotated=Count('lessons')
+        ).prefetch_related(
+            Prefetch('lessons', queryset=Lesson.objects.select_related('videolesson'))
+        )
+        course = get_object_or_404(
+            Course.objects.with_counts().annotate(
+                is_enrolled_annotated=Exists(enrollment_subquery)
+            ).prefetch_related(Prefetch('modules', queryset=modules)),
+            pk=pk,
+            is_active=True
+        )
         serializer = CourseDetailSerializer(course, context={'request': request})
         return Response(serializer.data)
 
@@ -71,22 +89,36 @@ class LessonDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk):
-        lesson = get_object_or_404(Lesson, pk=pk)
+        from django.db.models import Exists, OuterRef
+        from groups.models import GroupMembership
+
+        # Зачисление и доступ (активное членство в группе) — подзапросами в том же запросе, что и урок
+        enrollment_subquery = CourseEnrollment.objects.filter(
+            user_id=request.user.id,
+            course_id=OuterRef('module__course_id')
+        )
+        membership_subquery = GroupMembership.objects.filter(
+            user_id=request.user.id,
+            group_id=OuterRef('group_id'),
+            is_active=True
+        )
+        lesson = get_object_or_404(
+            Lesson.objects.annotate(
+                user_enrolled=Exists(enrollment_subquery),
+                user_has_access=Exists(enrollment_subquery.filter(Exists(membership_subquery)))
+            ),
+            pk=pk
+        )
 
         # Проверка 1: Зачислен ли пользователь на курс
-        try:
-            enrollment = CourseEnrollment.objects.get(
-                user=request.user,
-                course=lesson.module.course
-            )
-        except CourseEnrollment.DoesNotExist:
+        if not lesson.user_enrolled:
             return Response(
                 {'error': 'Вы не зачислены на этот курс'},
                 status=status.HTTP_403_FORBIDDEN
             )
 
         # Проверка 2: Есть ли доступ к курсу (активное членство в группе)
-        if not enrollment.has_access():
+        if not lesson.user_has_access:
             return Response(
                 {'error': 'Доступ к курсу закрыт. Возможно истек дедлайн или вы удалены из группы.'},
                 status=status.HTTP_403_FORBIDDEN
@@ -105,7 +137,7 @@ class LessonDetailView(APIView):
 
         # Проверка 3: Доступен ли урок
         if not lesson_progress.is_available():
-            available_in = self._get_available_in(lesson_progress.available_at)
+            available_in = lesson_progress.get_available_in()
             return Response(
                 {
                     'error': 'Урок недоступен',
@@ -128,20 +160,20 @@ class LessonDetailView(APIView):
 
         # В зависимости от типа урока добавляем специфичные данные
         if lesson.lesson_type == 'video':
-            response_data.update(self._get_video_lesson_data(lesson, request.user))
+            response_data.update(self._get_video_lesson_data(lesson, request.user, lesson_progress))
 
         elif lesson.lesson_type == 'text':
             response_data.update(self._get_text_lesson_data(lesson, lesson_progress))
 
         elif lesson.lesson_type == 'quiz':
-            response_data.update(self._get_quiz_lesson_data(lesson, request.user))  # ← НОВОЕ
+            response_data.update(self._get_quiz_lesson_data(lesson, request.user, lesson_progress))  # ← НОВОЕ
 
         elif lesson.lesson_type == 'assignment':  # ← ДОБАВЬТЕ
             response_data.update(self._get_assignment_lesson_data(lesson, request.user, lesson_progress))
 
         return Response(response_data)
 
-    def _get_video_lesson_data(self, lesson, user):
+    def _get_video_lesson_data(self, lesson, user, lesson_progress):
         """Данные для видео-урока"""
         video_lesson = get_object_or_404(VideoLesson, lesson=lesson)
 
@@ -157,7 +189,7 @@ class LessonDetailView(APIView):
                 context={'request': self.request}
             ).data,
             'progress': {
-                'is_completed': LessonProgress.objects.get(user=user, lesson=lesson).is_completed,
+                'is_completed': lesson_progress.is_completed,
                 'watch_percentage': float(video_progress.watch_percentage),
                 'started_at': video_progress.started_at
             }
@@ -178,7 +210,7 @@ class LessonDetailView(APIView):
             }
         }
 
-    def _get_quiz_lesson_data(self, lesson, user):
+    def _get_quiz_lesson_data(self, lesson, user, lesson_progress):
         """Данные для теста - ОПТИМИЗИРОВАНО"""
         from quizzes.models import QuizLesson, QuizAttempt
         from quizzes.serializers import QuizLessonDetailSerializer
@@ -199,9 +231,6 @@ class LessonDetailView(APIView):
             )
         ).get(lesson=lesson)
 
-        # Получаем прогресс урока
-        lesson_progress = LessonProgress.objects.get(user=user, lesson=lesson)
-
         return {
             'quiz': QuizLessonDetailSerializer(
                 quiz_lesson,
@@ -241,24 +270,3 @@ class LessonDetailView(APIView):
                 'is_completed': lesson_progress.is_completed
             }
         }
-
-    def _get_available_in(self, available_at):
-        """Человекочитаемое время до доступности"""
-        if not available_at:
-            return None
-
-        from django.utils import timezone
-        delta = available_at - timezone.now()
-
-        if delta.total_seconds() < 0:
-            return "доступен сейчас"
-
-        hours = int(delta.total_seconds() // 3600)
-        minutes = int((delta.total_seconds() % 3600) // 60)
-
-        if hours > 0 and minutes > 0:
-            return f"через {hours} ч. {minutes} мин."
-        elif hours > 0:
-            return f"через {hours} ч."
-        else:
-            return f"через {minutes} мин."
\ No newline at end of file
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0006_remove_requires_previous_module'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonmaterial',
+            name='file_size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True, verbose_name='Размер файла (байт)'),
+        ),
+    ]
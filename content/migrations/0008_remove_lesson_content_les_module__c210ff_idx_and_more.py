@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:25
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0007_lessonmaterial_file_size'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='lesson',
+            name='content_les_module__c210ff_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='module',
+            name='content_mod_course__07037a_idx',
+        ),
+    ]
@@ -1,16 +1,51 @@
 import logging
+import re
 import sys
 from io import BytesIO
 
 import requests
 from PIL import Image
 from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.db.models import DEFERRED
+from django.db.models.functions import Coalesce
 
 logger = logging.getLogger(__name__)
 
+# Единицы размера файла от крупной к мелкой: (байт в единице, подпись)
+_FILE_SIZE_UNITS = ((1 << 30, 'ГБ'), (1 << 20, 'МБ'), (1 << 10, 'КБ'), (1, 'Б'))
+
+# Сколько секунд помнить результат проверки файла материала в хранилище
+MATERIAL_FILE_EXISTS_CACHE_TIMEOUT = 3600
+
+# Слово — непрерывная последовательность непробельных символов (как у str.split())
+_WORD_RE = re.compile(r'\S+')
+
+
+class CourseQuerySet(models.QuerySet):
+
+    def with_counts(self):
+        """
+        Аннотировать количество модулей и уроков коррелированными подзапросами.
+        Count через JOIN modules × lessons с distinct раздувает выборку до числа уроков
+        на каждый курс и требует GROUP BY по всем полям курса.
+        """
+        modules_count = Module.objects.filter(
+            course=models.OuterRef('pk')
+        ).order_by().values('course').annotate(count=models.Count('pk')).values('count')
+        lessons_count = Lesson.objects.filter(
+            module__course=models.OuterRef('pk')
+        ).order_by().values('module__course').annotate(count=models.Count('pk')).values('count')
+
+        return self.annotate(
+            modules_count_annotated=Coalesce(models.Subquery(modules_count), 0),
+            lessons_count_annotated=Coalesce(models.Subquery(lessons_count), 0),
+        )
+
 
 class Course(models.Model):
     """Курс обучения"""
@@ -41,6 +76,8 @@ class Course(models.Model):
     created_at = models.DateTimeField('Создан', auto_now_add=True)
     updated_at = models.DateTimeField('Обновлен', auto_now=True)
 
+    objects = CourseQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Курс'
         verbose_name_plural = 'Курсы'
@@ -54,13 +91,7 @@ class Course(models.Model):
 
     def get_enrolled_students_count(self):
         """Получить количество записанных студентов"""
-        # TODO: Будет работать после создания приложения progress
-        return 0
-
-        # # Будет работать после создания приложения progress
-        # if hasattr(self, 'enrollments'):
-        #     return self.enrollments.filter(is_active=True).count()
-        # return 0
+        return self.enrollments.filter(is_active=True).count()
 
     def get_modules_count(self):
         """Количество модулей в курсе"""
@@ -68,7 +99,7 @@ class Course(models.Model):
 
     def get_lessons_count(self):
         """Общее количество уроков в курсе"""
-        return sum(module.lessons.count() for module in self.modules.all())
+        return Lesson.objects.filter(module__course=self).count()
 
 
 class Module(models.Model):
@@ -92,14 +123,34 @@ class Module(models.Model):
         verbose_name = 'Модуль'
         verbose_name_plural = 'Модули'
         ordering = ['course', 'order']
+        # Индекс (course, order) создаётся ограничением unique_together
         unique_together = ['course', 'order']
-        indexes = [
-            models.Index(fields=['course', 'order']),
-        ]
 
     def __str__(self):
         return f"{self.course.title} - {self.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Курс на момент загрузки: прогресс уроков синхронизируем только при реальном переносе модуля
+        instance._loaded_course_id = dict(zip(field_names, values)).get('course_id', DEFERRED)
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+
+        update_fields = kwargs.get('update_fields')
+        course_changed = getattr(self, '_loaded_course_id', DEFERRED) != self.course_id
+        if not adding and course_changed and (update_fields is None or 'course' in update_fields):
+            # Курс продублирован в прогрессе уроков — переносим его вместе с модулем
+            from progress.models import LessonProgress
+            LessonProgress.objects.filter(lesson__module=self).exclude(
+                course_id=self.course_id
+            ).update(course_id=self.course_id)
+        if update_fields is None or 'course' in update_fields:
+            self._loaded_course_id = self.course_id
+
     def get_lessons_count(self):
         """Количество уроков в модуле"""
         return self.lessons.count()
@@ -112,6 +163,30 @@ class Module(models.Model):
         ).order_by('-order').first()
 
 
+class LessonQuerySet(models.QuerySet):
+
+    # Поля урока для списков; описание и служебные даты догружаются отдельным запросом при обращении
+    LISTING_FIELDS = (
+        'id', 'module_id', 'title', 'order', 'lesson_type',
+        'access_delay_hours', 'requires_previous_completion',
+    )
+
+    def listing(self):
+        """Урок без тяжёлых полей — для списков и подсчётов"""
+        return self.only(*self.LISTING_FIELDS)
+
+    def for_student(self, user):
+        """Аннотировать is_completed и completed_at прогрессом пользователя — без запроса на каждый урок"""
+        from progress.models import LessonProgress
+
+        user_progress = LessonProgress.objects.filter(user=user, lesson=models.OuterRef('pk'))
+
+        return self.annotate(
+            is_completed=models.Exists(user_progress.filter(is_completed=True)),
+            completed_at=models.Subquery(user_progress.values('completed_at')[:1]),
+        )
+
+
 class Lesson(models.Model):
     """Базовая модель урока (полиморфная)"""
 
@@ -122,6 +197,14 @@ class Lesson(models.Model):
         ('assignment', '📝 Домашнее задание'),
     ]
 
+    # Тип урока → обратная OneToOne-связь с моделью конкретного типа
+    TYPE_RELATIONS = {
+        'video': 'videolesson',
+        'text': 'textlesson',
+        'quiz': 'quizlesson',
+        'assignment': 'assignmentlesson',
+    }
+
     module = models.ForeignKey(
         Module,
         on_delete=models.CASCADE,
@@ -155,30 +238,52 @@ class Lesson(models.Model):
     created_at = models.DateTimeField('Создан', auto_now_add=True)
     updated_at = models.DateTimeField('Обновлен', auto_now=True)
 
+    objects = LessonQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Урок'
         verbose_name_plural = 'Уроки'
         ordering = ['module', 'order']
+        # Индекс (module, order) создаётся ограничением unique_together
         unique_together = ['module', 'order']
         indexes = [
-            models.Index(fields=['module', 'order']),
             models.Index(fields=['lesson_type']),
         ]
 
     def __str__(self):
         return f"{self.get_lesson_type_display()} - {self.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Модуль на момент загрузки: прогресс синхронизируем только при реальном переносе урока
+        instance._loaded_module_id = dict(zip(field_names, values)).get('module_id', DEFERRED)
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+
+        update_fields = kwargs.get('update_fields')
+        module_changed = getattr(self, '_loaded_module_id', DEFERRED) != self.module_id
+        if not adding and module_changed and (update_fields is None or 'module' in update_fields):
+            # Курс продублирован в прогрессе урока — при переносе в модуль другого курса обновляем
+            course_id = Module.objects.filter(pk=self.module_id).values_list('course_id', flat=True).first()
+            self.progress_records.exclude(course_id=course_id).update(course_id=course_id)
+        if update_fields is None or 'module' in update_fields:
+            self._loaded_module_id = self.module_id
+
     def get_type_instance(self):
         """Получить экземпляр конкретного типа урока"""
-        if self.lesson_type == 'video' and hasattr(self, 'videolesson'):
-            return self.videolesson
-        elif self.lesson_type == 'text' and hasattr(self, 'textlesson'):
-            return self.textlesson
-        elif self.lesson_type == 'quiz' and hasattr(self, 'quizlesson'):
-            return self.quizlesson
-        elif self.lesson_type == 'assignment' and hasattr(self, 'assignmentlesson'):
-            return self.assignmentlesson
-        return None
+        relation = self.TYPE_RELATIONS.get(self.lesson_type)
+        if relation is None:
+            return None
+
+        # Один запрос по нужной связи; hasattr скрыл бы и посторонние AttributeError
+        try:
+            return getattr(self, relation)
+        except ObjectDoesNotExist:
+            return None
 
     def is_available_for_user(self, user):
         """Проверить доступность урока для пользователя"""
@@ -219,61 +324,75 @@ class Lesson(models.Model):
 
     def get_previous_lesson(self):
         """Получить предыдущий урок в курсе (учитывает модули)"""
-
-        # 1. Ищем в том же модуле
-        previous_in_module = Lesson.objects.filter(
-            module=self.module,
-            order__lt=self.order
-        ).order_by('-order').first()
-
-        if previous_in_module:
-            return previous_in_module
-
-        # 2. Ищем предыдущий модуль
-        previous_module = Module.objects.filter(
-            course=self.module.course,
-            order__lt=self.module.order
-        ).order_by('-order').first()
-
-        if not previous_module:
-            # Это первый урок курса
-            return None
-
-        # 3. Возвращаем последний урок предыдущего модуля
-        return Lesson.objects.filter(
-            module=previous_module
-        ).order_by('-order').first()
-
+        # Результат кешируется на экземпляре: метод вызывается повторно при расчёте доступности
+        if not hasattr(self, '_previous_lesson'):
+            # Предыдущий урок в том же модуле или последний урок предыдущего модуля — одним запросом
+            previous_module = Module.objects.filter(
+                course_id=self.module.course_id,
+                order__lt=self.module.order
+            ).order_by('-order').values('pk')[:1]
+
+            self._previous_lesson = Lesson.objects.filter(
+                models.Q(module_id=self.module_id, order__lt=self.order) |
+                models.Q(module_id=models.Subquery(previous_module))
+            ).order_by('-module__order', '-order').first()
+
+        return self._previous_lesson
+
+    @classmethod
+    def prefetch_previous_lessons(cls, lessons):
+        """
+        Заполнить кеш get_previous_lesson() для списка уроков одним запросом к модулям.
+        lessons — все уроки затронутых модулей (например, все уроки курса).
+        """
+        lessons_by_module = {}
+        for lesson in sorted(lessons, key=lambda lesson: lesson.order):
+            lessons_by_module.setdefault(lesson.module_id, []).append(lesson)
+
+        modules = Module.objects.filter(
+            course__modules__in=list(lessons_by_module)
+        ).distinct().order_by('course_id', 'order').values_list('pk', 'course_id', 'order')
+
+        # Предыдущий модуль — последний модуль курса с меньшим order (как в get_previous_lesson)
+        previous_module = {}
+        course_id, last_smaller, last_module = None, None, None
+        for module_id, module_course_id, order in modules:
+            if module_course_id != course_id:
+                course_id, last_smaller, last_module = module_course_id, None, None
+            elif order > last_module[1]:
+                last_smaller = last_module[0]
+            previous_module[module_id] = last_smaller
+            last_module = (module_id, order)
+
+        for module_id, module_lessons in lessons_by_module.items():
+            previous_module_lessons = lessons_by_module.get(previous_module.get(module_id))
+            last_smaller = previous_module_lessons[-1] if previous_module_lessons else None
+            for index, lesson in enumerate(module_lessons):
+                if index and lesson.order > module_lessons[index - 1].order:
+                    last_smaller = module_lessons[index - 1]
+                lesson._previous_lesson = last_smaller
 
     def get_next_lesson(self):
         """Получить следующий урок в курсе (учитывает модули)"""
+        if not hasattr(self, '_next_lesson'):
+            # Следующий урок в том же модуле или первый урок следующего модуля — одним запросом
+            next_module = Module.objects.filter(
+                course_id=self.module.course_id,
+                order__gt=self.module.order
+            ).order_by('order').values('pk')[:1]
 
-        # 1. Ищем в том же модуле
-        next_in_module = Lesson.objects.filter(
-            module=self.module,
-            order__gt=self.order
-        ).order_by('order').first()
+            self._next_lesson = Lesson.objects.filter(
+                models.Q(module_id=self.module_id, order__gt=self.order) |
+                models.Q(module_id=models.Subquery(next_module))
+            ).order_by('module__order', 'order').first()
 
-        if next_in_module:
-            return next_in_module
-
-        # 2. Ищем следующий модуль
-        next_module = Module.objects.filter(
-            course=self.module.course,
-            order__gt=self.module.order
-        ).order_by('order').first()
-
-        if not next_module:
-            # Это последний урок курса
-            return None
-
-        # 3. Возвращаем первый урок следующего модуля
-        return Lesson.objects.filter(
-            module=next_module
-        ).order_by('order').first()
+        return self._next_lesson
 
     def get_materials_count(self):
         """Количество материалов к уроку"""
+        # Материалы уже загружены через prefetch_related — считаем без COUNT-запроса
+        if 'materials' in getattr(self, '_prefetched_objects_cache', {}):
+            return len(self.materials.all())
         return self.materials.count()
 
 
@@ -336,12 +455,12 @@ class VideoLesson(models.Model):
         if self.vimeo_video_id:
             need_fetch = not self.pk  # новый объект
             if self.pk:
-                try:
-                    old = VideoLesson.objects.get(pk=self.pk)
-                    if old.vimeo_video_id != self.vimeo_video_id:
-                        need_fetch = True  # video ID изменился
-                except VideoLesson.DoesNotExist:
-                    need_fetch = True
+                # Сравниваем только video ID — без загрузки остальной строки (таймкоды в JSON)
+                old_video_id = VideoLesson.objects.filter(pk=self.pk).values_list(
+                    'vimeo_video_id', flat=True
+                ).first()
+                if old_video_id != self.vimeo_video_id:
+                    need_fetch = True  # video ID изменился или записи нет
 
             if need_fetch:
                 duration = self._fetch_vimeo_duration()
@@ -417,8 +536,7 @@ class VideoLesson(models.Model):
 
     def format_duration(self):
         """Форматировать длительность в читаемый вид"""
-        minutes = self.video_duration // 60
-        seconds = self.video_duration % 60
+        minutes, seconds = divmod(self.video_duration or 0, 60)
         return f"{minutes}:{seconds:02d}"
 
 
@@ -449,8 +567,17 @@ class TextLesson(models.Model):
         return f"Текст: {self.lesson.title}"
 
     def get_word_count(self):
-        """Количество слов в уроке"""
-        return len(self.content.split())
+        """
+        Количество слов в уроке.
+        Считается потоково, без списка слов, и пересчитывается только если content изменился.
+        """
+        cached = getattr(self, '_word_count_cache', None)
+        if cached is not None and cached[0] is self.content:
+            return cached[1]
+
+        count = sum(1 for _ in _WORD_RE.finditer(self.content))
+        self._word_count_cache = (self.content, count)
+        return count
 
 
 class LessonMaterial(models.Model):
@@ -473,6 +600,13 @@ class LessonMaterial(models.Model):
         null=True
     )
 
+    file_size = models.PositiveBigIntegerField(
+        'Размер файла (байт)',
+        blank=True,
+        null=True,
+        editable=False
+    )
+
     url = models.URLField(
         'Ссылка',
         blank=True,
@@ -491,15 +625,54 @@ class LessonMaterial(models.Model):
     def __str__(self):
         return f"{self.lesson.title} - {self.title}"
 
+    def save(self, *args, **kwargs):
+        """Запоминаем размер файла при загрузке, чтобы не обращаться к хранилищу при каждом показе"""
+        update_fields = kwargs.get('update_fields')
+        # Сохранение без поля file (например, только порядок) размер не трогает
+        if update_fields is None or 'file' in update_fields:
+            if not self.file:
+                self.file_size = None
+            elif not self.file._committed:
+                # Файл только что загружен — размер известен без запроса к хранилищу
+                self.file_size = self.file.size
+
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'file_size'}
+        super().save(*args, **kwargs)
+        if update_fields is None or 'file' in update_fields:
+            cache.delete(self._file_exists_cache_key())
+
     def get_file_size(self):
         """Размер файла в читаемом виде"""
         if self.file:
+            size = self.file_size
+            if size is None:
+                # Материалы, загруженные до появления поля file_size
+                try:
+                    size = self.file.size
+                except (FileNotFoundError, OSError):
+                    return None
+            unit, label = next(((threshold, unit_label) for threshold, unit_label in _FILE_SIZE_UNITS if size >= threshold), _FILE_SIZE_UNITS[-1])
+            return f"{size / unit:.1f} {label}"
+        return None
+
+    def _file_exists_cache_key(self):
+        return f'lesson-material:{self.pk}:file-exists'
+
+    def file_exists(self):
+        """
+        Есть ли загруженный файл в хранилище.
+        Ответ хранилища кэшируется: материалы отдаются в каждом ответе урока,
+        а exists() у S3 — сетевой запрос на каждый файл.
+        """
+        if not self.file:
+            return False
+        cache_key = self._file_exists_cache_key()
+        exists = cache.get(cache_key)
+        if exists is None:
             try:
-                size = self.file.size
-            except (FileNotFoundError, OSError):
-                return None
-            for unit in ['Б', 'КБ', 'МБ', 'ГБ']:
-                if size < 1024.0:
-                    return f"{size:.1f} {unit}"
-                size /= 1024.0
-        return None
\ No newline at end of file
+                exists = self.file.storage.exists(self.file.name)
+            except Exception:
+                return False
+            cache.set(cache_key, exists, MATERIAL_FILE_EXISTS_CACHE_TIMEOUT)
+        return exists
\ No newline at end of file
@@ -1,37 +1,25 @@
 from rest_framework import serializers
+
+from core.serializers import CachedFieldsSerializerMixin
 from .models import Course, Module, Lesson, VideoLesson, TextLesson, LessonMaterial
 
 
-class LessonMaterialSerializer(serializers.ModelSerializer):
+class LessonMaterialSerializer(CachedFieldsSerializerMixin, serializers.ModelSerializer):
     """Материалы к уроку"""
-    file_size = serializers.SerializerMethodField()
-    file_exists = serializers.SerializerMethodField()
+    # Обычные поля с источником в методах модели — без диспетчеризации SerializerMethodField на каждый материал
+    file_size = serializers.CharField(source='get_file_size', read_only=True)
+    file_exists = serializers.BooleanField(read_only=True)
 
     class Meta:
         model = LessonMaterial
         fields = ['id', 'title', 'description', 'file', 'url', 'order', 'file_size', 'file_exists']
 
-    def get_file_size(self, obj):
-        return obj.get_file_size()
-
-    def get_file_exists(self, obj):
-        if not obj.file:
-            return False
-        try:
-            return obj.file.storage.exists(obj.file.name)
-        except Exception:
-            return False
-
 
-class CourseListSerializer(serializers.ModelSerializer):
-    """Курс в каталоге (список) - ОПТИМИЗИРОВАНО"""
-    modules_count = serializers.SerializerMethodField()
-    lessons_count = serializers.SerializerMethodField()
-    is_enrolled = serializers.SerializerMethodField()
-
-    class Meta:
-        model = Course
-        fields = ['id', 'title', 'label', 'description', 'duration', 'modules_count', 'lessons_count', 'is_enrolled', 'project_url']
+class CourseCountsMixin:
+    """
+    Счётчики и признак зачисления для сериализаторов курса (каталог и детальная страница).
+    Значения берутся из аннотаций вьюх; без них — запасной путь через запросы.
+    """
 
     def get_modules_count(self, obj):
         # Используем аннотацию если есть
@@ -50,20 +38,34 @@ class CourseListSerializer(serializers.ModelSerializer):
         if hasattr(obj, 'is_enrolled_annotated'):
             return obj.is_enrolled_annotated
 
-        # Fallback
+        # Fallback: курсы студента загружаются один раз на весь ответ и хранятся в общем context
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return False
 
-        from progress.models import CourseEnrollment
-        return CourseEnrollment.objects.filter(
-            user=request.user,
-            course=obj,
-            is_active=True
-        ).exists()
+        enrolled_course_ids = self.context.get('_enrolled_course_ids')
+        if enrolled_course_ids is None:
+            from progress.models import CourseEnrollment
+            enrolled_course_ids = set(CourseEnrollment.objects.filter(
+                user=request.user,
+                is_active=True
+            ).values_list('course_id', flat=True))
+            self.context['_enrolled_course_ids'] = enrolled_course_ids
+        return obj.pk in enrolled_course_ids
+
+
+class CourseListSerializer(CourseCountsMixin, CachedFieldsSerializerMixin, serializers.ModelSerializer):
+    """Курс в каталоге (список) - ОПТИМИЗИРОВАНО"""
+    modules_count = serializers.SerializerMethodField()
+    lessons_count = serializers.SerializerMethodField()
+    is_enrolled = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Course
+        fields = ['id', 'title', 'label', 'description', 'duration', 'modules_count', 'lessons_count', 'is_enrolled', 'project_url']
 
 
-class VideoLessonDetailSerializer(serializers.ModelSerializer):
+class VideoLessonDetailSerializer(CachedFieldsSerializerMixin, serializers.ModelSerializer):
     """Детали видео-урока"""
     embed_url = serializers.SerializerMethodField()
     formatted_duration = serializers.SerializerMethodField()
@@ -91,7 +93,7 @@ class VideoLessonDetailSerializer(serializers.ModelSerializer):
         return None
 
 
-class LessonListSerializer(serializers.ModelSerializer):
+class LessonListSerializer(CachedFieldsSerializerMixin, serializers.ModelSerializer):
     """Урок в списке (для структуры курса)"""
     type = serializers.CharField(source='lesson_type')
     type_display = serializers.CharField(source='get_lesson_type_display')
@@ -111,7 +113,7 @@ class LessonListSerializer(serializers.ModelSerializer):
         return None
 
 
-class ModuleSerializer(serializers.ModelSerializer):
+class ModuleSerializer(CachedFieldsSerializerMixin, serializers.ModelSerializer):
     """Модуль с уроками"""
     lessons = LessonListSerializer(many=True, read_only=True)
     lessons_count = serializers.SerializerMethodField()
@@ -121,10 +123,13 @@ class ModuleSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'description', 'order', 'lessons_count', 'lessons']
 
     def get_lessons_count(self, obj):
+        # Используем аннотацию если есть
+        if hasattr(obj, 'lessons_count_annotated'):
+            return obj.lessons_count_annotated
         return obj.get_lessons_count()
 
 
-class CourseDetailSerializer(serializers.ModelSerializer):
+class CourseDetailSerializer(CourseCountsMixin, CachedFieldsSerializerMixin, serializers.ModelSerializer):
     """Детальная информация о курсе"""
     modules = ModuleSerializer(many=True, read_only=True)
     modules_count = serializers.SerializerMethodField()
@@ -135,26 +140,8 @@ class CourseDetailSerializer(serializers.ModelSerializer):
         model = Course
         fields = ['id', 'title', 'label', 'description', 'duration', 'modules_count', 'lessons_count', 'is_enrolled', 'modules']
 
-    def get_modules_count(self, obj):
-        return obj.get_modules_count()
-
-    def get_lessons_count(self, obj):
-        return obj.get_lessons_count()
-
-    def get_is_enrolled(self, obj):
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return False
-
-        from progress.models import CourseEnrollment
-        return CourseEnrollment.objects.filter(
-            user=request.user,
-            course=obj,
-            is_active=True
-        ).exists()
-
 
-class TextLessonDetailSerializer(serializers.ModelSerializer):
+class TextLessonDetailSerializer(CachedFieldsSerializerMixin, serializers.ModelSerializer):
     """Детали текстового урока"""
     word_count = serializers.SerializerMethodField()
 
@@ -1,3 +1,56 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
 from django.test import TestCase
 
-# Create your tests here.
+from content.models import Course, Module, Lesson, LessonMaterial
+from content.serializers import LessonMaterialSerializer
+
+
+# ─── LessonMaterial.file_exists() ──────────────────────────────────
+
+class LessonMaterialFileExistsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        course = Course.objects.create(title='Test Course')
+        module = Module.objects.create(course=course, title='Module 1', order=0)
+        lesson = Lesson.objects.create(module=module, title='Text', lesson_type='text', order=0)
+        self.material = LessonMaterial.objects.create(lesson=lesson, title='Конспект', file='materials/notes.pdf')
+
+    def test_storage_checked_once(self):
+        """Повторные ответы урока не обращаются к хранилищу."""
+        with patch.object(FileSystemStorage, 'exists', return_value=True) as exists:
+            for _ in range(3):
+                data = LessonMaterialSerializer(LessonMaterial.objects.all(), many=True).data
+                self.assertTrue(data[0]['file_exists'])
+        exists.assert_called_once_with('materials/notes.pdf')
+
+    def test_missing_file_cached_too(self):
+        with patch.object(FileSystemStorage, 'exists', return_value=False) as exists:
+            self.assertFalse(self.material.file_exists())
+            self.assertFalse(self.material.file_exists())
+        exists.assert_called_once()
+
+    def test_new_file_rechecked(self):
+        with patch.object(FileSystemStorage, 'exists', return_value=False):
+            self.assertFalse(self.material.file_exists())
+
+        self.material.file = 'materials/notes-v2.pdf'
+        self.material.save()
+
+        with patch.object(FileSystemStorage, 'exists', return_value=True):
+            self.assertTrue(self.material.file_exists())
+
+    def test_storage_error_not_cached(self):
+        with patch.object(FileSystemStorage, 'exists', side_effect=OSError):
+            self.assertFalse(self.material.file_exists())
+        with patch.object(FileSystemStorage, 'exists', return_value=True):
+            self.assertTrue(self.material.file_exists())
+
+    def test_no_file(self):
+        self.material.file = ''
+        with patch.object(FileSystemStorage, 'exists') as exists:
+            self.assertFalse(self.material.file_exists())
+        exists.assert_not_called()
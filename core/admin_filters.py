@@ -0,0 +1,32 @@
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.core.exceptions import ValidationError
+
+from content.models import Course
+
+
+class CourseListFilter(admin.SimpleListFilter):
+    """
+    Фильтр по курсу для списков в админке.
+    Варианты берутся одним запросом id/title, без загрузки курсов целиком.
+    Путь до курса задаётся через CourseListFilter.for_path('lesson__module__course').
+    """
+
+    title = 'Курс'
+    parameter_name = 'course'
+    course_path = 'course'
+
+    @classmethod
+    def for_path(cls, course_path):
+        return type(cls.__name__, (cls,), {'course_path': course_path})
+
+    def lookups(self, request, model_admin):
+        return list(Course.objects.values_list('id', 'title'))
+
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+        try:
+            return queryset.filter(**{f'{self.course_path}_id': self.value()})
+        except (ValidationError, ValueError) as e:
+            raise IncorrectLookupParameters(e)
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpRequest
+
+
+class PublicURLMiddleware:
+    """
+    Строит абсолютные URL от PUBLIC_URL_BASE вместо разбора заголовков запроса.
+    Сериализаторы вызывают build_absolute_uri для каждого файла/обложки в списках,
+    а get_host() с проверкой ALLOWED_HOSTS на каждый вызов заметно дороже конкатенации.
+    Без PUBLIC_URL_BASE middleware отключается.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.base = settings.PUBLIC_URL_BASE.rstrip('/')
+        if not self.base:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        base = self.base
+
+        def build_absolute_uri(location=None):
+            if location is None:
+                location = request.get_full_path()
+            if location.startswith('/') and not location.startswith('//'):
+                return base + location
+            return HttpRequest.build_absolute_uri(request, location)
+
+        request.build_absolute_uri = build_absolute_uri
+        return self.get_response(request)
@@ -0,0 +1,24 @@
+import random
+
+from django.conf import settings
+
+# Служебные и частые «пустые» эндпоинты, которые не нужно профилировать
+SILK_SKIP_PATH_PREFIXES = (
+    '/api/schema/',
+    '/api/docs/',
+    '/api/notifications/count/',
+)
+
+
+def silk_intercept(request):
+    """
+    Решает, записывать ли запрос в Silk.
+    Пропускает OPTIONS и служебные пути, остальные — выборочно по SILK_INTERCEPT_PERCENT.
+    """
+    if request.method == 'OPTIONS':
+        return False
+
+    if request.path.startswith(SILK_SKIP_PATH_PREFIXES):
+        return False
+
+    return random.random() * 100 < settings.SILK_INTERCEPT_PERCENT
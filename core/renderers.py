@@ -0,0 +1,34 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class OrjsonRenderer(JSONRenderer):
+    """
+    JSON-рендерер на orjson — в разы быстрее json.dumps на больших ответах.
+    Даты, Decimal и ленивые строки отдаются в стандартный энкодер DRF,
+    чтобы формат ответа (например, '...Z' вместо '+00:00') не изменился.
+
+    Отличие от JSONRenderer: NaN и Infinity orjson пишет как null,
+    а DRF при STRICT_JSON (по умолчанию) падает с ValueError.
+    """
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        # С отступами (?indent=, Browsable API), с экранированием не-ASCII
+        # или с пробелами после разделителей — стандартный рендерер:
+        # orjson так не умеет. Без STRICT_JSON DRF пишет NaN — тоже к нему
+        if (
+            self.get_indent(accepted_media_type, renderer_context or {})
+            or self.ensure_ascii or not self.compact or not self.strict
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self.encoder.default, option=self.options)
+        # Как и DRF, экранируем U+2028/U+2029: ответ должен оставаться валидным JavaScript
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
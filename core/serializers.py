@@ -0,0 +1,23 @@
+import copy
+
+
+class CachedFieldsSerializerMixin:
+    """
+    Кэш полей ModelSerializer на уровне класса.
+    DRF заново разбирает модель и строит поля для каждого экземпляра сериализатора;
+    здесь они строятся один раз, а экземпляр получает глубокую копию —
+    поля привязываются к своему родителю, как и без кэша.
+    Только для сериализаторов, у которых набор полей не зависит от context.
+    """
+
+    @classmethod
+    def _get_cached_fields(cls, serializer):
+        # Кэш хранится в __dict__ конкретного класса, чтобы наследники не делили его с родителем
+        fields = cls.__dict__.get('_cached_fields')
+        if fields is None:
+            fields = super(CachedFieldsSerializerMixin, serializer).get_fields()
+            cls._cached_fields = fields
+        return fields
+
+    def get_fields(self):
+        return copy.deepcopy(self._get_cached_fields(self))
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PublicURLMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -103,6 +104,8 @@ SPECTACULAR_SETTINGS = {
 
 # Admin URL (security through obscurity)
 ADMIN_URL = config('ADMIN_URL', default=secrets.token_urlsafe(32))
+# На API-only инстансах админку можно не монтировать — короче список URL-паттернов
+ENABLE_ADMIN = config('ENABLE_ADMIN', default=True, cast=bool)
 
 ROOT_URLCONF = 'core.urls'
 
@@ -171,6 +174,10 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.OrjsonRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 # CORS Settings
@@ -185,6 +192,8 @@ CSRF_TRUSTED_ORIGINS = [
 
 # Frontend URL
 FRONTEND_URL = config('FRONTEND_URL', default='http://localhost:3000')
+# Публичный адрес API для абсолютных ссылок на файлы (например, https://api.example.com)
+PUBLIC_URL_BASE = config('PUBLIC_URL_BASE', default='')
 
 # Sigex eGov Authentication
 SIGEX_API_URL = 'https://sigex.kz'
@@ -194,6 +203,8 @@ SIGEX_AUTH_DATA = 'LMS Authentication Request'
 # =============================================================================
 # PASSWORD HASHING
 # =============================================================================
+# Остальные хешеры нужны только для проверки старых паролей (при входе они
+# перехешируются в Argon2). Убирать их — после `manage.py legacy_password_hashes`.
 PASSWORD_HASHERS = [
     'django.contrib.auth.hashers.Argon2PasswordHasher',
     'django.contrib.auth.hashers.PBKDF2PasswordHasher',
@@ -211,6 +222,24 @@ SENDPULSE_API_URL = 'https://api.sendpulse.com'
 # Vimeo API
 VIMEO_ACCESS_TOKEN = config('VIMEO_ACCESS_TOKEN', default='')
 
+# CACHE
+# Кэш ответа «Мои курсы» — отдельный алиас, остальные кэши (троттлинг входа, токен SendPulse)
+# остаются на бэкенде по умолчанию. Он должен быть общим для всех воркеров, иначе сброс
+# в одном процессе не дойдёт до других: задайте MY_COURSES_CACHE_URL (Redis, нужен пакет redis).
+# Без него кэширование ответа выключено (DummyCache).
+MY_COURSES_CACHE_URL = config('MY_COURSES_CACHE_URL', default='')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'my_courses': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': MY_COURSES_CACHE_URL,
+    } if MY_COURSES_CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
+}
+
 # CELERY
 CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://redis:6379/0')
 CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default='redis://redis:6379/0')
@@ -224,6 +253,11 @@ CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_ACKS_LATE = True
 CELERY_TASK_REJECT_ON_WORKER_LOST = True
 
+# Расписание хранится в коде, а не в БД: задач единицы, и DatabaseScheduler
+# (django-celery-beat) лишь добавил бы запросы к PeriodicTask на каждом тике Beat.
+# Переходить на него стоит только при десятках динамически создаваемых задач.
+CELERY_BEAT_SCHEDULER = 'celery.beat:PersistentScheduler'
+
 CELERY_BEAT_SCHEDULE = {
     # Создание досье инструкторов — каждый день в 3:00
     'create-instructor-dossiers': {
@@ -248,11 +282,17 @@ CELERY_BEAT_SCHEDULE = {
 SILK_ENABLED = config('SILK_ENABLED', default=False, cast=bool)
 
 if SILK_ENABLED:
+    from core.profiling import silk_intercept
+
     INSTALLED_APPS += ['silk']
     MIDDLEWARE.insert(0, 'silk.middleware.SilkyMiddleware')
 
-    SILKY_PYTHON_PROFILER = True
+    # cProfile — основная часть накладных расходов Silk, включается явно
+    SILKY_PYTHON_PROFILER = config('SILK_PYTHON_PROFILER', default=False, cast=bool)
     SILKY_META = True
+    # Процент записываемых запросов (см. core.profiling.silk_intercept)
+    SILK_INTERCEPT_PERCENT = config('SILK_INTERCEPT_PERCENT', default=5, cast=int)
+    SILKY_INTERCEPT_FUNC = silk_intercept
     SILKY_MAX_RECORDED_REQUESTS = 500
     SILKY_MAX_RECORDED_REQUESTS_CHECK_PERCENT = 10
     # Аутентификация для доступа к Silk
@@ -265,8 +305,8 @@ LOGGING = {
     'disable_existing_loggers': False,
     'formatters': {
         'verbose': {
-            'format': '{levelname} {asctime} {module} {message}',
-            'style': '{',
+            'format': '%(levelname)s %(asctime)s %(module)s %(message)s',
+            'style': '%',
         },
     },
     'handlers': {
@@ -280,6 +320,12 @@ LOGGING = {
         'level': 'INFO',
     },
     'loggers': {
+        # SQL-запросы логируются только при DEBUG — держим их выше порога
+        'django.db.backends': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
         'notifications': {
             'handlers': ['console'],
             'level': 'INFO',
@@ -0,0 +1,111 @@
+import math
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+from django.contrib import admin
+from django.test import SimpleTestCase, TestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from content.models import Course
+from core.paginators import EstimatedCountPaginator
+from core.renderers import OrjsonRenderer
+
+
+# ─── OrjsonRenderer ────────────────────────────────────────────────
+
+class OrjsonRendererTest(SimpleTestCase):
+
+    def assertSameAsDrf(self, data, accepted_media_type=None, renderer_context=None):
+        self.assertEqual(
+            OrjsonRenderer().render(data, accepted_media_type, renderer_context),
+            JSONRenderer().render(data, accepted_media_type, renderer_context),
+        )
+
+    def test_same_output_as_drf(self):
+        self.assertSameAsDrf({
+            'title': 'Курс «Основы»',
+            'created_at': datetime(2024, 5, 1, 12, 30, tzinfo=dt_timezone.utc),
+            'starts_on': date(2024, 5, 1),
+            'duration': timedelta(hours=2),
+            'score': Decimal('87.50'),
+            'label': gettext_lazy('Курс'),
+            'ids': [1, 2, 3],
+            'nested': {'empty': None, 'flag': True, 'ratio': 0.25},
+        })
+
+    def test_non_str_keys(self):
+        self.assertSameAsDrf({1: 'a', 2: 'b'})
+
+    def test_line_separators_escaped(self):
+        """U+2028/U+2029 экранируются, как у DRF."""
+        data = {'text': 'строка\u2028вторая\u2029третья'}
+        self.assertEqual(OrjsonRenderer().render(data), '{"text":"строка\\u2028вторая\\u2029третья"}'.encode())
+        self.assertSameAsDrf(data)
+
+    def test_indent_uses_drf(self):
+        self.assertSameAsDrf({'a': [1, 2]}, 'application/json; indent=4')
+
+    def test_none_renders_empty(self):
+        self.assertEqual(OrjsonRenderer().render(None), b'')
+
+    def test_non_finite_floats_become_null(self):
+        """Известное отличие: DRF при STRICT_JSON падает, orjson пишет null."""
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({'score': math.nan})
+        self.assertEqual(
+            OrjsonRenderer().render({'score': math.nan, 'limit': math.inf}),
+            b'{"score":null,"limit":null}',
+        )
+
+
+# ─── Админки с EstimatedCountPaginator ─────────────────────────────
+
+class EstimatedCountAdminsTest(SimpleTestCase):
+
+    def test_full_result_count_disabled(self):
+        """Иначе ChangeList всё равно считает COUNT(*) по всей таблице."""
+        model_admins = [
+            model_admin for model_admin in admin.site._registry.values()
+            if model_admin.paginator is EstimatedCountPaginator
+        ]
+        self.assertTrue(model_admins)
+        for model_admin in model_admins:
+            with self.subTest(admin=type(model_admin).__name__):
+                self.assertFalse(model_admin.show_full_result_count)
+
+
+# ─── EstimatedCountPaginator ───────────────────────────────────────
+
+class EstimatedCountPaginatorTest(TestCase):
+    """PostgreSQL подменяется: проверяем запрос к pg_class и запасной COUNT(*)."""
+
+    def setUp(self):
+        Course.objects.create(title='Test Course')
+        self.connection = MagicMock(vendor='postgresql')
+        self.connection.ops.quote_name = lambda name: f'"{name}"'
+        self.cursor = self.connection.cursor.return_value.__enter__.return_value
+
+    def _count(self, queryset, reltuples):
+        self.cursor.fetchone.return_value = reltuples
+        with patch('core.paginators.connections', {'default': self.connection}):
+            return EstimatedCountPaginator(queryset, 20).count
+
+    def test_estimate_from_regclass(self):
+        self.assertEqual(self._count(Course.objects.all(), (50000,)), 50000)
+        self.cursor.execute.assert_called_once_with(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [f'"{Course._meta.db_table}"'],
+        )
+
+    def test_never_analyzed_table_counted(self):
+        """reltuples = -1 (таблица не анализировалась) — точный COUNT(*)."""
+        self.assertEqual(self._count(Course.objects.all(), (-1,)), 1)
+
+    def test_small_estimate_counted(self):
+        self.assertEqual(self._count(Course.objects.all(), (5,)), 1)
+
+    def test_filtered_list_counted(self):
+        self.assertEqual(self._count(Course.objects.filter(title='Test Course'), (50000,)), 1)
+        self.cursor.execute.assert_not_called()
@@ -7,11 +7,8 @@ from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
 logger = logging.getLogger(__name__)
-logger.info("Admin URL: /%s/", settings.ADMIN_URL)
 
 urlpatterns = [
-    path(f'{settings.ADMIN_URL}/', admin.site.urls),
-
     # API документация
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
@@ -41,6 +38,13 @@ urlpatterns = [
 
 ]
 
+# Админка
+if settings.ENABLE_ADMIN:
+    logger.info("Admin URL: /%s/", settings.ADMIN_URL)
+    urlpatterns += [
+        path(f'{settings.ADMIN_URL}/', admin.site.urls),
+    ]
+
 # if settings.DEBUG:
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
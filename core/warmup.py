@@ -7,27 +7,19 @@ def warmup():
     """Прогрев Django при старте Gunicorn"""
     logger.info("🔥 Warmup started...")
 
-    from django.contrib.auth import get_user_model
+    from django.apps import apps
     from django.db import connections
 
-    # Прогреваем подключение к БД
+    # Прогреваем подключение к БД — лёгкий SELECT 1 вместо выборок из таблиц
     for conn in connections.all():
         conn.ensure_connection()
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
     logger.info("✅ Database connection established")
 
-    # Прогреваем основные модели
-    User = get_user_model()
-    User.objects.first()
-
-    from content.models import Course
-    from progress.models import CourseEnrollment
-    from graduates.models import Graduate
-    from notifications.models import Notification
-
-    Course.objects.first()
-    Notification.objects.first()
-    CourseEnrollment.objects.first()
-    Graduate.objects.first()
+    # Прогреваем метаданные моделей (поля, связи) без запросов к БД
+    for model in apps.get_models():
+        model._meta.get_fields()
 
     logger.info("✅ ORM models loaded")
 
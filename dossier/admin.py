@@ -1,10 +1,64 @@
 from django.contrib import admin
+from django.contrib.admin.utils import unquote
+from django.http import Http404, JsonResponse
+from django.urls import path, reverse
+from django.utils.html import format_html_join
+from django.utils.safestring import mark_safe
 
 from .models import StudentDossier, InstructorDossier
 
 
+class LazyHistoryAdminMixin:
+    """
+    JSON-история досье может весить мегабайты, поэтому ни список, ни форма её не загружают:
+    поля откладываются в get_queryset, а в форме вместо них — ссылки на отдельный URL,
+    который отдаёт одно поле по запросу.
+    """
+    history_fields = ()
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer(*self.history_fields)
+
+    def get_urls(self):
+        info = self.opts.app_label, self.opts.model_name
+        return [
+            path(
+                '<path:object_id>/history/<str:field_name>/',
+                self.admin_site.admin_view(self.history_view),
+                name='%s_%s_history' % info,
+            ),
+        ] + super().get_urls()
+
+    def history_view(self, request, object_id, field_name):
+        """JSON одного поля истории — догружается только по запросу администратора"""
+        if field_name not in self.history_fields:
+            raise Http404
+        obj = self.get_object(request, unquote(object_id))
+        if obj is None or not self.has_view_permission(request, obj):
+            raise Http404
+        return JsonResponse(
+            getattr(obj, field_name),
+            safe=False,
+            json_dumps_params={'ensure_ascii': False, 'indent': 2},
+        )
+
+    @admin.display(description='История')
+    def history_links(self, obj):
+        if obj.pk is None:
+            return '-'
+        url_name = 'admin:%s_%s_history' % (self.opts.app_label, self.opts.model_name)
+        return format_html_join(
+            mark_safe('<br>'),
+            '<a href="{}" target="_blank">📄 {}</a>',
+            (
+                (reverse(url_name, args=[obj.pk, name]), self.opts.get_field(name).verbose_name)
+                for name in self.history_fields
+            ),
+        )
+
+
 @admin.register(StudentDossier)
-class StudentDossierAdmin(admin.ModelAdmin):
+class StudentDossierAdmin(LazyHistoryAdminMixin, admin.ModelAdmin):
     list_display = (
         'get_full_name', 'course_title', 'group_name',
         'certificate_number', 'final_score', 'graduated_at',
@@ -14,11 +68,14 @@ class StudentDossierAdmin(admin.ModelAdmin):
         'first_name', 'last_name', 'iin',
         'email', 'certificate_number',
     )
-    readonly_fields = (
-        'dossier_created_at',
+    list_per_page = 25
+    # Без второго COUNT(*) по всей таблице при поиске и фильтрах
+    show_full_result_count = False
+    history_fields = (
         'lessons_history', 'quizzes_history',
         'assignments_history', 'modules_history',
     )
+    readonly_fields = ('dossier_created_at', 'history_links')
     fieldsets = (
         ('Личные данные', {
             'fields': (
@@ -50,26 +107,23 @@ class StudentDossierAdmin(admin.ModelAdmin):
         }),
         ('История (JSON)', {
             'classes': ('collapse',),
-            'fields': (
-                'lessons_history', 'quizzes_history',
-                'assignments_history', 'modules_history',
-            ),
+            'fields': ('history_links',),
         }),
     )
 
 
 @admin.register(InstructorDossier)
-class InstructorDossierAdmin(admin.ModelAdmin):
+class InstructorDossierAdmin(LazyHistoryAdminMixin, admin.ModelAdmin):
     list_display = (
         'get_full_name', 'role', 'total_groups_led',
         'total_students_taught', 'total_graduates', 'last_updated_at',
     )
     list_filter = ('role',)
     search_fields = ('first_name', 'last_name', 'email')
-    readonly_fields = (
-        'dossier_created_at', 'last_updated_at',
-        'groups_history', 'reviews_summary',
-    )
+    list_per_page = 25
+    show_full_result_count = False
+    history_fields = ('groups_history', 'reviews_summary')
+    readonly_fields = ('dossier_created_at', 'last_updated_at', 'history_links')
     fieldsets = (
         ('Личные данные', {
             'fields': (
@@ -93,6 +147,6 @@ class InstructorDossierAdmin(admin.ModelAdmin):
         }),
         ('История (JSON)', {
             'classes': ('collapse',),
-            'fields': ('groups_history', 'reviews_summary'),
+            'fields': ('history_links',),
         }),
     )
@@ -1,5 +1,4 @@
 from django.core.management.base import BaseCommand
-from account.models import User
 from dossier.services import DossierService
 
 
@@ -7,12 +6,11 @@ class Command(BaseCommand):
     help = 'Создать досье для всех инструкторов'
 
     def handle(self, *args, **options):
-        instructors = User.objects.filter(role__in=['instructor', 'super_instructor'])
-
+        # Пачками: статистика и запись досье — несколько запросов на пачку, а не на каждого инструктора
         count = 0
-        for instructor in instructors:
-            DossierService.create_or_update_instructor_dossier(instructor)
-            count += 1
-            self.stdout.write(f'✅ {instructor.email}')
+        for batch in DossierService.iter_instructor_batches():
+            count += DossierService.update_instructor_dossiers(batch)
+            for instructor in batch:
+                self.stdout.write(f'✅ {instructor.email}')
 
         self.stdout.write(self.style.SUCCESS(f'Создано/обновлено досье: {count}'))
\ No newline at end of file
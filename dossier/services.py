@@ -1,6 +1,6 @@
 import logging
 from django.utils import timezone
-from django.db.models import Avg, Count
+from django.db.models import Avg, Count, Max
 
 from .models import StudentDossier, InstructorDossier
 
@@ -145,7 +145,7 @@ class DossierService:
         lessons = []
         progresses = LessonProgress.objects.filter(
             user=user,
-            lesson__module__course=course,
+            course=course,
             is_completed=True
         ).select_related('lesson', 'lesson__module').order_by(
             'lesson__module__order', 'lesson__order'
@@ -172,31 +172,35 @@ class DossierService:
         from progress.models import LessonProgress
 
         modules = []
-        course_modules = Module.objects.filter(course=course).order_by('order')
-
-        for module in course_modules:
-            # Получаем последний завершенный урок модуля
-            last_lesson = LessonProgress.objects.filter(
+        course_modules = Module.objects.filter(course=course).annotate(
+            total_lessons=Count('lessons')
+        ).order_by('order')
+
+        # Завершённые уроки по модулям одним запросом: количество и дата последнего
+        completed_by_module = {
+            row['lesson__module_id']: row
+            for row in LessonProgress.objects.filter(
                 user=user,
-                lesson__module=module,
+                course=course,
                 is_completed=True
-            ).order_by('-completed_at').first()
+            ).order_by().values('lesson__module_id').annotate(
+                completed_lessons=Count('id'),
+                last_completed_at=Max('completed_at')
+            )
+        }
 
-            if last_lesson:
-                total_lessons = module.lessons.count()
-                completed_lessons = LessonProgress.objects.filter(
-                    user=user,
-                    lesson__module=module,
-                    is_completed=True
-                ).count()
+        for module in course_modules:
+            completed = completed_by_module.get(module.id)
 
+            if completed:
+                last_completed_at = completed['last_completed_at']
                 modules.append({
                     'module_id': module.id,
                     'module_title': module.title,
                     'module_order': module.order,
-                    'total_lessons': total_lessons,
-                    'completed_lessons': completed_lessons,
-                    'completed_at': last_lesson.completed_at.isoformat() if last_lesson.completed_at else None,
+                    'total_lessons': module.total_lessons,
+                    'completed_lessons': completed['completed_lessons'],
+                    'completed_at': last_completed_at.isoformat() if last_completed_at else None,
                 })
 
         return modules
@@ -304,6 +308,21 @@ class DossierService:
 
     # === INSTRUCTOR DOSSIER ===
 
+    # Поля, которые перезаписываются при обновлении досье (дата назначения роли и регистрации — только при создании)
+    INSTRUCTOR_DOSSIER_UPDATE_FIELDS = [
+        'first_name', 'last_name', 'middle_name', 'email', 'phone', 'role',
+        'total_groups_led', 'total_students_taught', 'total_graduates',
+        'total_assignments_reviewed', 'total_assignments_passed', 'total_assignments_rejected',
+        'average_score_given', 'groups_history', 'reviews_summary', 'last_updated_at',
+    ]
+
+    # Поля пользователя, нужные для досье инструктора
+    INSTRUCTOR_USER_FIELDS = (
+        'id', 'email', 'first_name', 'last_name', 'middle_name', 'phone', 'role', 'date_joined',
+    )
+
+    INSTRUCTOR_BATCH_SIZE = 500
+
     @classmethod
     def create_or_update_instructor_dossier(cls, user):
         """
@@ -318,8 +337,7 @@ class DossierService:
         Returns:
             InstructorDossier
         """
-        from assignments.models import AssignmentSubmission
-        from groups.models import GroupMembership
+        stats = cls._collect_instructor_stats([user])[user.pk]
 
         # Получаем или создаем досье
         dossier, created = InstructorDossier.objects.get_or_create(
@@ -336,6 +354,128 @@ class DossierService:
             }
         )
 
+        cls._fill_instructor_dossier(dossier, user, stats)
+        dossier.save()
+
+        action = "Создано" if created else "Обновлено"
+        logger.info(f"✅ {action} досье инструктора: {dossier}")
+
+        return dossier
+
+    @classmethod
+    def update_instructor_dossiers(cls, users):
+        """
+        Создать или обновить досье пачки инструкторов.
+        Статистика — несколькими агрегирующими запросами на всю пачку,
+        запись — одним INSERT ... ON CONFLICT (user) DO UPDATE.
+        """
+        if not users:
+            return 0
+
+        stats = cls._collect_instructor_stats(users)
+        now = timezone.now()
+
+        dossiers = [
+            cls._fill_instructor_dossier(
+                InstructorDossier(user=user, role_assigned_at=now, registered_at=user.date_joined),
+                user,
+                stats[user.pk]
+            )
+            for user in users
+        ]
+        InstructorDossier.objects.bulk_create(
+            dossiers,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=cls.INSTRUCTOR_DOSSIER_UPDATE_FIELDS
+        )
+        return len(dossiers)
+
+    @classmethod
+    def iter_instructor_batches(cls, batch_size=INSTRUCTOR_BATCH_SIZE):
+        """Инструкторы пачками — без загрузки всех пользователей в память"""
+        from account.models import User
+
+        instructors = User.objects.filter(
+            role__in=['instructor', 'super_instructor']
+        ).only(*cls.INSTRUCTOR_USER_FIELDS).iterator(chunk_size=batch_size)
+
+        batch = []
+        for instructor in instructors:
+            batch.append(instructor)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    @classmethod
+    def _collect_instructor_stats(cls, users):
+        """
+        Статистика для досье инструкторов: {user_id: {...}}.
+        Каждая выборка сгруппирована по инструктору, поэтому число запросов не зависит от размера пачки.
+        """
+        from assignments.models import AssignmentSubmission
+        from groups.models import Group, GroupMembership
+        from django.db.models import F, OuterRef, Q, Subquery
+        from django.db.models.functions import Coalesce, TruncMonth
+
+        stats = {
+            user.pk: {'historical_groups': [], 'current_groups': [], 'reviews': {}, 'reviews_by_month': []}
+            for user in users
+        }
+        user_ids_by_email = {}
+        for user in users:
+            user_ids_by_email.setdefault(user.email, []).append(user.pk)
+
+        # === СТАТИСТИКА ИЗ ДОСЬЕ СТУДЕНТОВ ===
+        # Это источник правды — кого реально выпустил
+        historical_groups = StudentDossier.objects.filter(
+            instructor_email__in=list(user_ids_by_email)
+        ).values('instructor_email', 'group_name').annotate(
+            students_count=Count('id')
+        ).order_by('instructor_email', 'group_name')
+        for row in historical_groups:
+            for user_id in user_ids_by_email[row['instructor_email']]:
+                stats[user_id]['historical_groups'].append(row)
+
+        # Текущие назначения (активные группы) с числом студентов в каждой
+        students_count = GroupMembership.objects.filter(
+            group=OuterRef('pk')
+        ).order_by().values('group').annotate(count=Count('pk')).values('count')
+        current_groups = Group.objects.filter(
+            assigned_instructors__in=list(stats)
+        ).select_related('course').annotate(
+            instructor_id=F('assigned_instructors'),
+            students_count=Coalesce(Subquery(students_count), 0)
+        )
+        for group in current_groups:
+            stats[group.instructor_id]['current_groups'].append(group)
+
+        # === СТАТИСТИКА ПО ДЗ ===
+        reviews = AssignmentSubmission.objects.filter(reviewed_by_id__in=list(stats))
+        for row in reviews.order_by().values('reviewed_by_id').annotate(
+            total=Count('id'),
+            passed=Count('id', filter=Q(status='passed')),
+            rejected=Count('id', filter=Q(status='needs_revision')),
+            average_score=Avg('score')
+        ):
+            stats[row['reviewed_by_id']]['reviews'] = row
+
+        # === СВОДКА ПРОВЕРОК ПО МЕСЯЦАМ ===
+        reviews_by_month = reviews.annotate(
+            month=TruncMonth('reviewed_at')
+        ).values('reviewed_by_id', 'month').annotate(count=Count('id')).order_by('reviewed_by_id', '-month')
+        for row in reviews_by_month:
+            by_month = stats[row['reviewed_by_id']]['reviews_by_month']
+            if len(by_month) < 12:
+                by_month.append(row)
+
+        return stats
+
+    @classmethod
+    def _fill_instructor_dossier(cls, dossier, user, stats):
+        """Заполнить личные данные и статистику досье (без сохранения)"""
         # Обновляем личные данные
         dossier.first_name = user.first_name
         dossier.last_name = user.last_name
@@ -344,25 +484,11 @@ class DossierService:
         dossier.phone = getattr(user, 'phone', '') or ''
         dossier.role = user.role
 
-        # === СТАТИСТИКА ИЗ ДОСЬЕ СТУДЕНТОВ ===
-        # Это источник правды — кого реально выпустил
-        graduates_taught = StudentDossier.objects.filter(instructor_email=user.email)
+        historical_groups = stats['historical_groups']
+        current_groups = stats['current_groups']
 
         # Выпускники
-        dossier.total_graduates = graduates_taught.count()
-
-        # Уникальные группы из досье (исторические)
-        historical_groups = list(graduates_taught.values('group_name').annotate(
-            students_count=Count('id')
-        ).order_by('group_name'))
-
-        # Текущие назначения (активные группы)
-        current_groups = user.assigned_groups.all()
-
-        # Текущие студенты в активных группах (ещё не выпущены)
-        current_students = GroupMembership.objects.filter(
-            group__in=current_groups
-        ).values('user').distinct().count()
+        dossier.total_graduates = sum(g['students_count'] for g in historical_groups)
 
         # Всего студентов = выпускники + текущие
         dossier.total_students_taught = dossier.total_graduates
@@ -374,14 +500,13 @@ class DossierService:
         dossier.total_groups_led = len(all_groups)
 
         # === СТАТИСТИКА ПО ДЗ ===
-        reviews = AssignmentSubmission.objects.filter(reviewed_by=user)
-        dossier.total_assignments_reviewed = reviews.count()
-        dossier.total_assignments_passed = reviews.filter(status='passed').count()
-        dossier.total_assignments_rejected = reviews.filter(status='needs_revision').count()
+        reviews = stats['reviews']
+        dossier.total_assignments_reviewed = reviews.get('total', 0)
+        dossier.total_assignments_passed = reviews.get('passed', 0)
+        dossier.total_assignments_rejected = reviews.get('rejected', 0)
 
         # Средняя оценка
-        avg_score = reviews.filter(score__isnull=False).aggregate(Avg('score'))
-        dossier.average_score_given = avg_score['score__avg'] or 0
+        dossier.average_score_given = reviews.get('average_score') or 0
 
         # === ИСТОРИЯ ГРУПП ===
         groups_history = []
@@ -405,58 +530,39 @@ class DossierService:
                         gh['group_id'] = group.id
                         gh['status'] = 'active'
                         # Добавляем текущих студентов
-                        gh['current_students'] = GroupMembership.objects.filter(group=group).count()
+                        gh['current_students'] = group.students_count
                         break
             else:
                 # Новая активная группа
-                students_count = GroupMembership.objects.filter(group=group).count()
                 groups_history.append({
                     'group_id': group.id,
                     'group_name': group.name,
                     'course_title': group.course.title if group.course else '',
-                    'current_students': students_count,
+                    'current_students': group.students_count,
                     'graduates_count': 0,
                     'status': 'active',
                 })
 
         dossier.groups_history = groups_history
 
-        # === СВОДКА ПРОВЕРОК ПО МЕСЯЦАМ ===
-        from django.db.models.functions import TruncMonth
-        reviews_by_month = reviews.annotate(
-            month=TruncMonth('reviewed_at')
-        ).values('month').annotate(count=Count('id')).order_by('-month')[:12]
-
         dossier.reviews_summary = {
             'by_month': [
                 {
                     'month': r['month'].isoformat() if r['month'] else None,
                     'count': r['count']
                 }
-                for r in reviews_by_month
+                for r in stats['reviews_by_month']
             ]
         }
 
-        dossier.save()
-
-        action = "Создано" if created else "Обновлено"
-        logger.info(f"✅ {action} досье инструктора: {dossier}")
-
         return dossier
 
     @classmethod
     def update_all_instructor_dossiers(cls):
         """Обновить досье всех инструкторов (для cron job)"""
-        from account.models import User
-
-        instructors = User.objects.filter(
-            role__in=['instructor', 'super_instructor']
-        )
-
         count = 0
-        for instructor in instructors:
-            cls.create_or_update_instructor_dossier(instructor)
-            count += 1
+        for batch in cls.iter_instructor_batches():
+            count += cls.update_instructor_dossiers(batch)
 
         logger.info(f"✅ Обновлено досье инструкторов: {count}")
         return count
\ No newline at end of file
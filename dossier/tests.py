@@ -1,3 +1,275 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.db import connection
+from django.db.models import Avg, Count
+from django.db.models.functions import TruncMonth
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from account.models import User
+from assignments.models import AssignmentLesson, AssignmentSubmission
+from content.models import Course, Module, Lesson
+from dossier.models import StudentDossier, InstructorDossier
+from dossier.services import DossierService
+from groups.models import Group, GroupMembership
+
+
+# Поля досье, которые считает пакетное обновление (last_updated_at — время записи)
+STATS_FIELDS = [
+    field for field in DossierService.INSTRUCTOR_DOSSIER_UPDATE_FIELDS if field != 'last_updated_at'
+]
+
+
+def expected_instructor_dossier(user):
+    """
+    Эталон: досье инструктора, посчитанное отдельными запросами на одного инструктора
+    (так, как считалось до пакетной обработки).
+    """
+    graduates_taught = StudentDossier.objects.filter(instructor_email=user.email)
+    historical_groups = list(graduates_taught.values('group_name').annotate(
+        students_count=Count('id')
+    ).order_by('group_name'))
+    historical_group_names = {g['group_name'] for g in historical_groups}
+    current_groups = list(user.assigned_groups.all())
+
+    groups_history = [
+        {'group_name': g['group_name'], 'graduates_count': g['students_count'], 'status': 'completed'}
+        for g in historical_groups
+    ]
+    for group in current_groups:
+        students_count = GroupMembership.objects.filter(group=group).count()
+        if group.name in historical_group_names:
+            entry = next(gh for gh in groups_history if gh['group_name'] == group.name)
+            entry.update({
+                'course_title': group.course.title if group.course else '',
+                'group_id': group.id,
+                'status': 'active',
+                'current_students': students_count,
+            })
+        else:
+            groups_history.append({
+                'group_id': group.id,
+                'group_name': group.name,
+                'course_title': group.course.title if group.course else '',
+                'current_students': students_count,
+                'graduates_count': 0,
+                'status': 'active',
+            })
+
+    reviews = AssignmentSubmission.objects.filter(reviewed_by=user)
+    reviews_by_month = reviews.annotate(
+        month=TruncMonth('reviewed_at')
+    ).values('month').annotate(count=Count('id')).order_by('-month')[:12]
+    total_graduates = graduates_taught.count()
+
+    return {
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'middle_name': user.middle_name or '',
+        'email': user.email,
+        'phone': user.phone or '',
+        'role': user.role,
+        'total_groups_led': len(historical_group_names | {g.name for g in current_groups}),
+        'total_students_taught': total_graduates,
+        'total_graduates': total_graduates,
+        'total_assignments_reviewed': reviews.count(),
+        'total_assignments_passed': reviews.filter(status='passed').count(),
+        'total_assignments_rejected': reviews.filter(status='needs_revision').count(),
+        'average_score_given': float(reviews.filter(score__isnull=False).aggregate(Avg('score'))['score__avg'] or 0),
+        'groups_history': groups_history,
+        'reviews_summary': {
+            'by_month': [
+                {'month': r['month'].isoformat() if r['month'] else None, 'count': r['count']}
+                for r in reviews_by_month
+            ]
+        },
+    }
+
+
+def dossier_values(dossier):
+    values = {field: getattr(dossier, field) for field in STATS_FIELDS}
+    values['average_score_given'] = float(values['average_score_given'])
+    return values
+
+
+class InstructorDossierTestBase(TestCase):
+    """
+    Общие фикстуры. Пять инструкторов (больше одной пачки при размере пачки 2):
+    текущие группы со студентами, выпускники в досье студентов и проверенные ДЗ.
+    """
+
+    def setUp(self):
+        now = timezone.now()
+        self.course = Course.objects.create(title='Test Course')
+        self.module = Module.objects.create(course=self.course, title='Module 1', order=0)
+        lesson = Lesson.objects.create(
+            module=self.module, title='Assignment', lesson_type='assignment', order=0,
+        )
+        self.assignment = AssignmentLesson.objects.create(lesson=lesson, instructions='Сделать')
+
+        self.instructors = [
+            User.objects.create_user(
+                email=f'instructor{i}@test.com',
+                password='testpass123',
+                iin=f'90000000000{i}',
+                first_name=f'Instructor{i}',
+                last_name='Test',
+                role='super_instructor' if i == 0 else 'instructor',
+            )
+            for i in range(5)
+        ]
+
+        self.students = [
+            User.objects.create_user(
+                email=f'student{i}@test.com',
+                password='testpass123',
+                iin=f'80000000000{i}',
+                first_name=f'Student{i}',
+                last_name='Test',
+            )
+            for i in range(4)
+        ]
+
+        self.group_a = Group.objects.create(
+            course=self.course, name='Group A', deadline_type='personal_days', deadline_days=90,
+        )
+        self.group_b = Group.objects.create(
+            course=self.course, name='Group B', deadline_type='personal_days', deadline_days=90,
+        )
+        for student in self.students[:3]:
+            self.group_a.add_student(student)
+        self.group_b.add_student(self.students[3])
+
+        # instructor0: текущие A и B; instructor1: A (она же в истории); instructor3: без групп
+        self.instructors[0].assigned_groups.add(self.group_a, self.group_b)
+        self.instructors[1].assigned_groups.add(self.group_a)
+        self.instructors[4].assigned_groups.add(self.group_b)
+
+        # Выпускники: instructor1 — «Group A» и «Old Group», instructor2 — только история
+        graduates = [
+            ('instructor1@test.com', 'Group A'),
+            ('instructor1@test.com', 'Old Group'),
+            ('instructor1@test.com', 'Old Group'),
+            ('instructor2@test.com', 'Ancient Group'),
+        ]
+        for i, (instructor_email, group_name) in enumerate(graduates):
+            StudentDossier.objects.create(
+                first_name='Grad', last_name=str(i), email=f'grad{i}@test.com', iin=f'70000000000{i}',
+                course_title=self.course.title, group_name=group_name, instructor_email=instructor_email,
+                certificate_number=f'CERT-{i}', enrolled_at=now, completed_at=now, graduated_at=now,
+                final_score=90, total_lessons_completed=1, total_study_days=10, average_quiz_score=90,
+            )
+
+        # ДЗ: instructor0 проверил в двух разных месяцах, instructor2 — одно без оценки
+        reviews = [
+            (self.instructors[0], 'passed', 90, now),
+            (self.instructors[0], 'passed', 70, now - timedelta(days=40)),
+            (self.instructors[0], 'needs_revision', None, now),
+            (self.instructors[2], 'needs_revision', None, now),
+        ]
+        for n, (reviewer, status, score, reviewed_at) in enumerate(reviews, 1):
+            AssignmentSubmission.objects.create(
+                user=self.students[0], assignment=self.assignment, submission_number=n,
+                submission_text='Ответ', status=status, score=score,
+                reviewed_by=reviewer, reviewed_at=reviewed_at,
+            )
+
+
+# ─── DossierService.update_instructor_dossiers() ───────────────────
+
+class UpdateInstructorDossiersTest(InstructorDossierTestBase):
+
+    def test_batches_match_per_instructor_computation(self):
+        """Пачки по 2 инструктора дают те же досье, что и расчёт на каждого инструктора."""
+        batches = list(DossierService.iter_instructor_batches(batch_size=2))
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+
+        count = sum(DossierService.update_instructor_dossiers(batch) for batch in batches)
+
+        self.assertEqual(count, 5)
+        for instructor in self.instructors:
+            with self.subTest(instructor=instructor.email):
+                dossier = InstructorDossier.objects.get(user=instructor)
+                self.assertEqual(dossier_values(dossier), expected_instructor_dossier(instructor))
+
+    def test_totals(self):
+        DossierService.update_instructor_dossiers(list(self.instructors))
+        dossiers = {d.user_id: d for d in InstructorDossier.objects.all()}
+
+        first = dossiers[self.instructors[0].pk]
+        self.assertEqual(first.total_groups_led, 2)
+        self.assertEqual(first.total_graduates, 0)
+        self.assertEqual(first.total_assignments_reviewed, 3)
+        self.assertEqual(first.total_assignments_passed, 2)
+        self.assertEqual(first.total_assignments_rejected, 1)
+        self.assertEqual(float(first.average_score_given), 80.0)
+        self.assertEqual(len(first.reviews_summary['by_month']), 2)
+
+        second = dossiers[self.instructors[1].pk]
+        self.assertEqual(second.total_graduates, 3)
+        self.assertEqual(second.total_groups_led, 2)
+        self.assertEqual(second.groups_history, [
+            {
+                'group_name': 'Group A', 'graduates_count': 1, 'status': 'active',
+                'course_title': self.course.title, 'group_id': self.group_a.pk, 'current_students': 3,
+            },
+            {'group_name': 'Old Group', 'graduates_count': 2, 'status': 'completed'},
+        ])
+
+        third = dossiers[self.instructors[2].pk]
+        self.assertEqual(third.total_graduates, 1)
+        self.assertEqual(third.total_assignments_rejected, 1)
+        self.assertEqual(float(third.average_score_given), 0)
+
+        idle = dossiers[self.instructors[3].pk]
+        self.assertEqual((idle.total_groups_led, idle.groups_history), (0, []))
+
+    def test_update_keeps_creation_fields(self):
+        """Повторный запуск обновляет статистику, но не дату назначения роли."""
+        DossierService.update_instructor_dossiers(list(self.instructors))
+        role_assigned_at = InstructorDossier.objects.get(user=self.instructors[1]).role_assigned_at
+
+        StudentDossier.objects.filter(group_name='Old Group').delete()
+        DossierService.update_instructor_dossiers(list(self.instructors))
+
+        dossier = InstructorDossier.objects.get(user=self.instructors[1])
+        self.assertEqual(dossier.role_assigned_at, role_assigned_at)
+        self.assertEqual(dossier.total_graduates, 1)
+        self.assertEqual(InstructorDossier.objects.count(), 5)
+
+    def test_query_count_does_not_depend_on_batch_size(self):
+        with CaptureQueriesContext(connection) as small:
+            DossierService.update_instructor_dossiers(self.instructors[:2])
+        with CaptureQueriesContext(connection) as large:
+            DossierService.update_instructor_dossiers(list(self.instructors))
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_single_instructor_matches_batch(self):
+        for instructor in self.instructors:
+            dossier = DossierService.create_or_update_instructor_dossier(instructor)
+            self.assertEqual(dossier_values(dossier), expected_instructor_dossier(instructor))
+
+
+# ─── DossierService.update_all_instructor_dossiers() ───────────────
+
+class UpdateAllInstructorDossiersTest(InstructorDossierTestBase):
+
+    def test_all_batches_processed(self):
+        iter_batches = DossierService.iter_instructor_batches
+        batch_sizes = []
+
+        def small_batches():
+            for batch in iter_batches(batch_size=2):
+                batch_sizes.append(len(batch))
+                yield batch
+
+        with patch.object(DossierService, 'iter_instructor_batches', small_batches):
+            count = DossierService.update_all_instructor_dossiers()
 
-# Create your tests here.
+        self.assertEqual(count, 5)
+        self.assertEqual(batch_sizes, [2, 2, 1])
+        for instructor in self.instructors:
+            dossier = InstructorDossier.objects.get(user=instructor)
+            self.assertEqual(dossier_values(dossier), expected_instructor_dossier(instructor))
@@ -8,6 +8,13 @@ from .models import Graduate
 
 @admin.register(Graduate)
 class GraduateAdmin(admin.ModelAdmin):
+    # Цвета бейджей статусов (иконки — Graduate.STATUS_ICONS)
+    STATUS_COLORS = {
+        'pending': '#ffc107',
+        'graduated': '#28a745',
+        'rejected': '#dc3545',
+    }
+
     list_display = [
         'id',
         'user_info',
@@ -144,20 +151,10 @@ class GraduateAdmin(admin.ModelAdmin):
 
     def status_badge(self, obj):
         """Статус с красивым бейджем"""
-        colors = {
-            'pending': '#ffc107',
-            'graduated': '#28a745',
-            'rejected': '#dc3545',
-        }
-        icons = {
-            'pending': '⏳',
-            'graduated': '🎓',
-            'rejected': '❌',
-        }
         return format_html(
             '<span style="background-color: {}; color: white; padding: 5px 12px; border-radius: 3px; font-weight: bold;">{} {}</span>',
-            colors.get(obj.status, '#6c757d'),
-            icons.get(obj.status, '❓'),
+            self.STATUS_COLORS.get(obj.status, '#6c757d'),
+            Graduate.STATUS_ICONS.get(obj.status, '❓'),
             obj.get_status_display()
         )
 
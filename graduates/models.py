@@ -15,6 +15,13 @@ class Graduate(models.Model):
         ('rejected', '❌ Отклонен'),
     ]
 
+    # Иконки статусов для __str__ и админки
+    STATUS_ICONS = {
+        'pending': '⏳',
+        'graduated': '🎓',
+        'rejected': '❌',
+    }
+
     # === ОСНОВНАЯ ИНФОРМАЦИЯ ===
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -123,11 +130,7 @@ class Graduate(models.Model):
         ]
 
     def __str__(self):
-        status_icon = {
-            'pending': '⏳',
-            'graduated': '🎓',
-            'rejected': '❌'
-        }.get(self.status, '❓')
+        status_icon = self.STATUS_ICONS.get(self.status, '❓')
         return f"{status_icon} {self.user.get_full_name()} - {self.course.title}"
 
     # === МЕТОДЫ ===
@@ -169,8 +172,7 @@ class Graduate(models.Model):
 
     def calculate_completion_details(self):
         """Рассчитать детали прохождения"""
-        from progress.models import LessonProgress
-        from content.models import Module
+        from content.models import Lesson
 
         details = {
             'modules': [],
@@ -178,40 +180,40 @@ class Graduate(models.Model):
             'quizzes': self.get_quiz_attempts_summary()
         }
 
-        # Модули
-        modules = Module.objects.filter(course=self.course).order_by('order')
-        for module in modules:
-            module_lessons = LessonProgress.objects.filter(
-                user=self.user,
-                lesson__module=module,
-                is_completed=True
-            )
-
-            if module_lessons.exists():
-                last_completed = module_lessons.order_by('-completed_at').first()
-                details['modules'].append({
-                    'title': module.title,
-                    'order': module.order,
-                    'completed_at': last_completed.completed_at.strftime(
-                        '%d.%m.%Y %H:%M') if last_completed.completed_at else '-'
-                })
-
-        # Уроки
-        lessons = LessonProgress.objects.filter(
-            user=self.user,
-            lesson__module__course=self.course,
+        # Завершённые уроки курса одним запросом — статус берётся из аннотации for_student
+        lessons = Lesson.objects.filter(
+            module__course=self.course
+        ).for_student(self.user).filter(
             is_completed=True
-        ).select_related('lesson', 'lesson__module').order_by('lesson__module__order', 'lesson__order')
+        ).select_related('module').order_by('module__order', 'order')
+
+        # Модули: дата завершения — последняя дата завершения урока модуля
+        modules = {}
+        for lesson in lessons:
+            module = modules.setdefault(lesson.module_id, {
+                'title': lesson.module.title,
+                'order': lesson.module.order,
+                'last_completed_at': None
+            })
+            if lesson.completed_at and (
+                module['last_completed_at'] is None or lesson.completed_at > module['last_completed_at']
+            ):
+                module['last_completed_at'] = lesson.completed_at
 
-        for lesson_progress in lessons:
             details['lessons'].append({
-                'module': lesson_progress.lesson.module.title,
-                'title': lesson_progress.lesson.title,
-                'type': lesson_progress.lesson.get_lesson_type_display(),
-                'completed_at': lesson_progress.completed_at.strftime(
-                    '%d.%m.%Y %H:%M') if lesson_progress.completed_at else '-'
+                'module': lesson.module.title,
+                'title': lesson.title,
+                'type': lesson.get_lesson_type_display(),
+                'completed_at': lesson.completed_at.strftime(
+                    '%d.%m.%Y %H:%M') if lesson.completed_at else '-'
             })
 
+        for module in modules.values():
+            last_completed_at = module.pop('last_completed_at')
+            module['completed_at'] = last_completed_at.strftime(
+                '%d.%m.%Y %H:%M') if last_completed_at else '-'
+            details['modules'].append(module)
+
         return details
 
     def approve_graduation(self, manager):
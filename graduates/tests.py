@@ -108,6 +108,24 @@ class GraduateCreateFromEnrollmentTest(GraduateTestBase):
         result = Graduate.create_from_enrollment(self.enrollment)
         self.assertIsNone(result)
 
+    def test_completion_details_lists_completed_lessons(self):
+        """completion_details содержит только завершённые уроки и их модуль."""
+        for lesson in (self.lesson1, self.lesson2):
+            LessonProgress.objects.filter(user=self.user, lesson=lesson).update(
+                is_completed=True, completed_at=timezone.now(),
+            )
+
+        graduate = Graduate.create_from_enrollment(self.enrollment)
+        details = graduate.completion_details
+
+        self.assertEqual(
+            [lesson['title'] for lesson in details['lessons']],
+            ['Lesson 1', 'Lesson 2'],
+        )
+        self.assertEqual(len(details['modules']), 1)
+        self.assertEqual(details['modules'][0]['title'], 'Module 1')
+        self.assertNotEqual(details['modules'][0]['completed_at'], '-')
+
 
 # ─── Graduate.approve_graduation() ─────────────────────────────────
 
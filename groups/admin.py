@@ -284,7 +284,12 @@ class GroupMembershipAdmin(admin.ModelAdmin):
     days_until_deadline_display.short_description = 'До дедлайна'
 
     def activate_memberships(self, request, queryset):
+        from progress.cache import invalidate_my_courses
+
+        user_ids = list(queryset.values_list('user_id', flat=True))
         updated = queryset.update(is_active=True, left_at=None)
+        # UPDATE не шлёт post_save — сбрасываем кэш «Мои курсы» явно
+        invalidate_my_courses(user_ids)
         self.message_user(request, f'✅ Активировано: {updated}')
 
     activate_memberships.short_description = '✅ Активировать членства'
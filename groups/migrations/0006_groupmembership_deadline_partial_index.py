@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0005_group_final_exam_date_group_final_exam_end_time_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='groupmembership',
+            name='groups_grou_persona_7f1aec_idx',
+        ),
+        migrations.AddIndex(
+            model_name='groupmembership',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['personal_deadline_at'], name='groups_membership_deadline_idx'),
+        ),
+    ]
@@ -2,6 +2,7 @@ import uuid
 
 from django.conf import settings
 from django.db import models
+from django.db.models.functions import Now
 from django.utils import timezone
 
 from content.models import Course
@@ -317,35 +318,43 @@ class Group(models.Model):
         Деактивировать членства с истекшим дедлайном.
         Вызывается периодической задачей.
         """
+        from progress.cache import invalidate_my_courses
         from progress.models import CourseEnrollment
 
         now = timezone.now()
-        deactivated_count = 0
 
-        # Находим истекшие членства
+        # Находим истекшие членства (частичный индекс по active + дедлайну)
         expired_memberships = GroupMembership.objects.filter(
             is_active=True,
             personal_deadline_at__isnull=False,
             personal_deadline_at__lt=now
         )
+        expired = list(expired_memberships.values_list('pk', 'user_id', 'group__course_id'))
 
-        for membership in expired_memberships:
-            # Деактивируем членство
-            membership.is_active = False
-            membership.left_at = now
-            membership.save()
-
-            # Синхронизируем зачисление
-            try:
-                enrollment = CourseEnrollment.objects.get(
-                    user=membership.user,
-                    course=membership.group.course
-                )
-                enrollment.sync_active_status()
-            except CourseEnrollment.DoesNotExist:
-                pass
+        deactivated_count = 0
+        if expired:
+            # Деактивируем одним UPDATE вместо save() на каждое членство
+            deactivated_count = GroupMembership.objects.filter(
+                pk__in=[pk for pk, _, _ in expired],
+                is_active=True,
+            ).update(is_active=False, left_at=now)
+
+            # Синхронизируем зачисления: без активного членства доступа нет
+            active_membership = GroupMembership.objects.filter(
+                user=models.OuterRef('user'),
+                group=models.OuterRef('group'),
+                is_active=True,
+            )
+            CourseEnrollment.objects.filter(
+                is_active=True,
+                user_id__in={user_id for _, user_id, _ in expired},
+                course_id__in={course_id for _, _, course_id in expired},
+            ).exclude(
+                models.Exists(active_membership)
+            ).update(is_active=False)
 
-            deactivated_count += 1
+            # UPDATE не шлёт post_save — сбрасываем кэш «Мои курсы» явно
+            invalidate_my_courses(user_id for _, user_id, _ in expired)
 
         # Деактивируем группы с истекшим фиксированным дедлайном
         cls.objects.filter(
@@ -357,6 +366,20 @@ class Group(models.Model):
 
         return deactivated_count
 
+
+class GroupMembershipQuerySet(models.QuerySet):
+
+    def with_deadline_state(self):
+        """Аннотировать deadline_passed — истёк ли персональный дедлайн (по времени БД)"""
+        return self.annotate(
+            deadline_passed=models.Case(
+                models.When(personal_deadline_at__lt=Now(), then=models.Value(True)),
+                default=models.Value(False),
+                output_field=models.BooleanField(),
+            )
+        )
+
+
 class GroupMembership(models.Model):
     """Членство студента в группе"""
 
@@ -393,6 +416,8 @@ class GroupMembership(models.Model):
     joined_at = models.DateTimeField('Дата вступления', auto_now_add=True, db_index=True)
     left_at = models.DateTimeField('Дата выхода', null=True, blank=True)
 
+    objects = GroupMembershipQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Членство в группе'
         verbose_name_plural = 'Членства в группах'
@@ -400,7 +425,11 @@ class GroupMembership(models.Model):
         indexes = [
             models.Index(fields=['group', 'is_active']),
             models.Index(fields=['user', 'is_active']),
-            models.Index(fields=['personal_deadline_at']),
+            models.Index(
+                fields=['personal_deadline_at'],
+                condition=models.Q(is_active=True),
+                name='groups_membership_deadline_idx',
+            ),
         ]
 
     def __str__(self):
@@ -429,6 +458,15 @@ class GroupMembership(models.Model):
         delta = self.personal_deadline_at - timezone.now()
         return max(0, delta.days)
 
+    def is_deadline_passed(self):
+        """Истёк ли персональный дедлайн"""
+        # Аннотация with_deadline_state() — без сравнения на каждой строке
+        deadline_passed = getattr(self, 'deadline_passed', None)
+        if deadline_passed is not None:
+            return deadline_passed
+
+        return bool(self.personal_deadline_at and self.personal_deadline_at < timezone.now())
+
     def is_deadline_soon(self, days=7):
         """Скоро истекает дедлайн?"""
         days_left = self.get_days_until_deadline()
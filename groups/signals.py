@@ -66,18 +66,29 @@ def auto_enroll_on_membership_create(sender, instance, created, **kwargs):
         )
 
     # 2. Инициализируем LessonProgress
-    lessons = Lesson.objects.filter(
+    lessons = list(Lesson.objects.filter(
         module__course=course
-    ).order_by('module__order', 'order')
+    ).order_by('module__order', 'order'))
+
+    # Предыдущие уроки и уже существующий прогресс загружаем заранее,
+    # чтобы не делать по несколько запросов на каждый урок курса
+    Lesson.prefetch_previous_lessons(lessons)
+    progress_by_lesson = {
+        progress.lesson_id: progress
+        for progress in LessonProgress.objects.filter(user=user, lesson__in=lessons)
+    }
 
     for lesson in lessons:
+        if lesson.pk in progress_by_lesson:
+            continue
         progress, lp_created = LessonProgress.get_or_create_safe(
-            user=user, lesson=lesson
+            user=user, lesson=lesson, course=course
         )
+        progress_by_lesson[lesson.pk] = progress
         if lp_created:
-            progress.calculate_available_at()
+            progress.calculate_available_at(progress_by_lesson)
 
     logger.info(
         f"Инициализирован прогресс: {user.email}, "
-        f"{lessons.count()} уроков курса «{course.title}»"
+        f"{len(lessons)} уроков курса «{course.title}»"
     )
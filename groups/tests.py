@@ -368,6 +368,24 @@ class GroupDeactivateExpiredMembershipsTest(GroupTestBase):
         )
         self.assertFalse(enrollment.is_active)
 
+    def test_keeps_other_students_enrollment_active(self):
+        """Деактивация одного членства не затрагивает зачисления других студентов."""
+        self.group.add_student(self.user)
+        self.group.add_student(self.user2)
+        GroupMembership.objects.filter(
+            group=self.group, user=self.user,
+        ).update(personal_deadline_at=timezone.now() - timedelta(days=1))
+
+        count = Group.deactivate_expired_memberships()
+
+        self.assertEqual(count, 1)
+        self.assertFalse(
+            CourseEnrollment.objects.get(user=self.user, course=self.course).is_active
+        )
+        self.assertTrue(
+            CourseEnrollment.objects.get(user=self.user2, course=self.course).is_active
+        )
+
     def test_deactivates_group_with_expired_fixed_deadline(self):
         """Группа с fixed_date и истёкшим deadline_date деактивируется."""
         group_b2b = Group.objects.create(
@@ -404,3 +422,36 @@ class GroupDeactivateExpiredMembershipsTest(GroupTestBase):
 
         self.group.refresh_from_db()
         self.assertTrue(self.group.is_active)
+
+
+# ─── GroupMembership.objects.with_deadline_state() ─────────────────
+
+class GroupMembershipDeadlineStateTest(GroupTestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.group.add_student(self.user)
+        self.group.add_student(self.user2)
+        GroupMembership.objects.filter(user=self.user).update(
+            personal_deadline_at=timezone.now() - timedelta(days=1),
+        )
+
+    def test_annotates_deadline_passed(self):
+        """deadline_passed считается в запросе: истёкший — True, будущий — False."""
+        states = dict(
+            GroupMembership.objects.with_deadline_state().values_list('user_id', 'deadline_passed')
+        )
+        self.assertEqual(states, {self.user.id: True, self.user2.id: False})
+
+    def test_null_deadline_not_passed(self):
+        """Без дедлайна deadline_passed = False."""
+        GroupMembership.objects.filter(user=self.user).update(personal_deadline_at=None)
+        m = GroupMembership.objects.with_deadline_state().get(user=self.user)
+        self.assertFalse(m.deadline_passed)
+        self.assertFalse(m.is_deadline_passed())
+
+    def test_is_deadline_passed_matches_annotation(self):
+        """Метод без аннотации даёт тот же результат."""
+        for m in GroupMembership.objects.with_deadline_state():
+            plain = GroupMembership.objects.get(pk=m.pk)
+            self.assertEqual(plain.is_deadline_passed(), m.is_deadline_passed())
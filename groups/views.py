@@ -97,14 +97,14 @@ class JoinGroupByTokenView(APIView):
 
         # Случай 3: Новое зачисление на курс
         # Проверяем наличие неактивного enrollment (для сообщения о сбросе прогресса)
-        inactive_enrollment = CourseEnrollment.objects.filter(
+        has_inactive_enrollment = CourseEnrollment.objects.filter(
             user=request.user,
             course=group.course,
             is_active=False
-        ).first()
+        ).exists()
 
         progress_will_reset = False
-        if inactive_enrollment:
+        if has_inactive_enrollment:
             from graduates.models import Graduate
             progress_will_reset = not Graduate.objects.filter(
                 user=request.user,
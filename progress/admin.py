@@ -1,18 +1,72 @@
+from bisect import bisect_right
+
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from django.utils.html import format_html
-from django.db.models import Count, Avg
+from django.utils.safestring import mark_safe
+from django.db.models import Count, Avg, Exists, OuterRef, Q
+from content.models import Lesson, Module
+from groups.models import GroupMembership
+from core.admin_filters import CourseListFilter
+from core.paginators import EstimatedCountPaginator
 from .models import CourseEnrollment, LessonProgress, VideoProgress
 
 
+# Цвета по порогам: красный < 50% <= жёлтый < порога "зелёного" <= зелёный
+_THRESHOLD_COLORS = ('#dc3545', '#ffc107', '#28a745')
+_PROGRESS_BAR_THRESHOLDS = (50, 80)
+_WATCH_THRESHOLDS = (50, 90)
+
+# Шаблоны собираются один раз при импорте — в них подставляются только числа
+_PROGRESS_BAR_TEMPLATES = tuple(
+    '<div style="width: 100px; background-color: #e9ecef; border-radius: 4px; overflow: hidden;">'
+    '<div style="width: {width}%; background-color: ' + color + '; color: white; text-align: center; '
+    'padding: 2px 0; font-size: 11px;">'
+    '{value}%'
+    '</div>'
+    '</div>'
+    for color in _THRESHOLD_COLORS
+)
+_WATCH_TEMPLATES = tuple(
+    '<span style="color: ' + color + '; font-weight: bold;">{value}%</span>'
+    for color in _THRESHOLD_COLORS
+)
+
+_LESSON_TYPE_LABELS = dict(Lesson.LESSON_TYPES)
+
+_ACCESS_BADGES = (
+    mark_safe('<span style="background-color: #dc3545; color: white; padding: 3px 10px; border-radius: 3px;">❌ Доступа нет</span>'),
+    mark_safe('<span style="background-color: #28a745; color: white; padding: 3px 10px; border-radius: 3px;">✅ Доступ есть</span>'),
+)
+_COMPLETION_BADGES = (
+    mark_safe('<span style="background-color: #ffc107; color: white; padding: 3px 10px; border-radius: 3px;">⏳ В процессе</span>'),
+    mark_safe('<span style="background-color: #28a745; color: white; padding: 3px 10px; border-radius: 3px;">✅ Завершен</span>'),
+)
+
+
+def _progress_bar_html(percentage):
+    template = _PROGRESS_BAR_TEMPLATES[bisect_right(_PROGRESS_BAR_THRESHOLDS, percentage)]
+    return mark_safe(template.format(width=percentage, value=int(percentage)))
+
+
+def _watch_percentage_html(percentage):
+    template = _WATCH_TEMPLATES[bisect_right(_WATCH_THRESHOLDS, percentage)]
+    return mark_safe(template.format(value=int(percentage)))
+
+
 @admin.register(CourseEnrollment)
 class CourseEnrollmentAdmin(admin.ModelAdmin):
     list_display = ['user_info', 'course', 'group', 'access_badge', 'progress_bar', 'completed_lessons_info',
                     'enrolled_at', 'last_activity_at']
-    list_filter = ['is_active', 'course', 'group', 'enrolled_at']
+    list_select_related = ('user', 'course', 'group')
+    list_filter = ['is_active', CourseListFilter, 'group', 'enrolled_at']
     search_fields = ['user__email', 'user__first_name', 'user__last_name', 'course__title']
     readonly_fields = ['enrolled_at', 'progress_percentage', 'completed_lessons_count', 'last_activity_at',
                        'current_lesson_display', 'completed_modules_display', 'access_status_display']
+    raw_id_fields = ['user', 'course', 'group']
     date_hierarchy = 'enrolled_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         ('Основная информация', {
@@ -30,24 +84,27 @@ class CourseEnrollmentAdmin(admin.ModelAdmin):
         }),
     )
 
-    actions = ['sync_access_status']
+    actions = ['sync_access_status', 'recalculate_progress']
+
+    def get_queryset(self, request):
+        # Доступ и число уроков курса считаем в том же запросе, а не по запросу на строку
+        return super().get_queryset(request).with_total_lessons().annotate(
+            _has_access=Exists(GroupMembership.objects.filter(
+                user=OuterRef('user'),
+                group=OuterRef('group'),
+                is_active=True
+            )),
+        )
 
     def user_info(self, obj):
         return f"{obj.user.get_full_name()} ({obj.user.email})"
 
     user_info.short_description = 'Студент'
 
+    @admin.display(description='Доступ', ordering='_has_access')
     def access_badge(self, obj):
         """Бейдж доступа на основе GroupMembership"""
-        if obj.has_access():
-            return format_html(
-                '<span style="background-color: #28a745; color: white; padding: 3px 10px; border-radius: 3px;">✅ Доступ есть</span>'
-            )
-        return format_html(
-            '<span style="background-color: #dc3545; color: white; padding: 3px 10px; border-radius: 3px;">❌ Доступа нет</span>'
-        )
-
-    access_badge.short_description = 'Доступ'
+        return _ACCESS_BADGES[obj._has_access]
 
     def access_status_display(self, obj):
         """Детальный статус доступа"""
@@ -76,26 +133,13 @@ class CourseEnrollmentAdmin(admin.ModelAdmin):
 
     access_status_display.short_description = 'Статус доступа'
 
+    @admin.display(description='Прогресс', ordering='progress_percentage')
     def progress_bar(self, obj):
-        percentage = float(obj.progress_percentage)
-        color = '#28a745' if percentage >= 80 else '#ffc107' if percentage >= 50 else '#dc3545'
-        return format_html(
-            '<div style="width: 100px; background-color: #e9ecef; border-radius: 4px; overflow: hidden;">'
-            '<div style="width: {}%; background-color: {}; color: white; text-align: center; padding: 2px 0; font-size: 11px;">'
-            '{}%'
-            '</div>'
-            '</div>',
-            percentage, color, int(percentage)
-        )
-
-    progress_bar.short_description = 'Прогресс'
+        return _progress_bar_html(float(obj.progress_percentage))
 
+    @admin.display(description='Уроки', ordering='completed_lessons_count')
     def completed_lessons_info(self, obj):
-        from content.models import Lesson
-        total = Lesson.objects.filter(module__course=obj.course).count()
-        return f'📚 {obj.completed_lessons_count}/{total}'
-
-    completed_lessons_info.short_description = 'Уроки'
+        return f'📚 {obj.completed_lessons_count}/{obj._total_lessons}'
 
     def current_lesson_display(self, obj):
         lesson = obj.get_current_lesson()
@@ -106,7 +150,6 @@ class CourseEnrollmentAdmin(admin.ModelAdmin):
     current_lesson_display.short_description = 'Текущий урок'
 
     def completed_modules_display(self, obj):
-        from content.models import Module
         total = Module.objects.filter(course=obj.course).count()
         completed = obj.get_completed_modules_count()
         return f'📦 {completed}/{total} модулей'
@@ -123,15 +166,46 @@ class CourseEnrollmentAdmin(admin.ModelAdmin):
 
     sync_access_status.short_description = '🔄 Синхронизировать доступ'
 
+    def recalculate_progress(self, request, queryset):
+        """Пересчитать прогресс выбранных зачислений одним запросом"""
+        count = queryset.recalculate_progress()
+        self.message_user(request, f'📊 Пересчитан прогресс: {count}')
+
+    recalculate_progress.short_description = '📊 Пересчитать прогресс'
+
+
+class LessonProgressChangeList(ChangeList):
+    """
+    Список прогресса уроков.
+    Уроки страницы вместе с модулем и курсом загружаются одним запросом после выборки,
+    чтобы основной запрос списка не тянул JOIN на урок, модуль и курс.
+    """
+
+    def get_results(self, request):
+        super().get_results(request)
+        lesson_ids = {progress.lesson_id for progress in self.result_list}
+        lessons = Lesson.objects.filter(id__in=lesson_ids).select_related('module__course').only(
+            'title', 'lesson_type', 'module__course__title'
+        )
+        lessons_by_id = {lesson.id: lesson for lesson in lessons}
+        for progress in self.result_list:
+            progress.lesson = lessons_by_id[progress.lesson_id]
+
+
 @admin.register(LessonProgress)
 class LessonProgressAdmin(admin.ModelAdmin):
     list_display = ['user_info', 'lesson_info', 'completion_badge', 'started_at', 'completed_at', 'completed_ip',
                     'duration_display', 'available_badge']
-    list_filter = ['is_completed', 'lesson__lesson_type', 'lesson__module__course', 'completed_at']
+    list_select_related = ('user',)
+    list_filter = ['is_completed', 'lesson__lesson_type', CourseListFilter,
+                   'completed_at']
     search_fields = ['user__email', 'user__first_name', 'user__last_name', 'lesson__title']
     readonly_fields = ['started_at', 'completed_at', 'available_at', 'duration_display', 'completion_data_display',
                        'completed_ip', 'completed_user_agent']
+    raw_id_fields = ['user', 'lesson']
     date_hierarchy = 'completed_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         ('Основная информация', {
@@ -156,17 +230,21 @@ class LessonProgressAdmin(admin.ModelAdmin):
 
     user_info.short_description = 'Студент'
 
-    def lesson_info(self, obj):
-        return f"{obj.lesson.get_lesson_type_display()} - {obj.lesson.title}"
+    def get_changelist(self, request, **kwargs):
+        return LessonProgressChangeList
 
-    lesson_info.short_description = 'Урок'
+    @admin.display(description='Курс / Урок', ordering='lesson__title')
+    def lesson_info(self, obj):
+        lesson = obj.lesson
+        return format_html(
+            '<b>{}</b><br><small>{} - {}</small>',
+            lesson.module.course.title,
+            _LESSON_TYPE_LABELS.get(lesson.lesson_type, lesson.lesson_type),
+            lesson.title,
+        )
 
     def completion_badge(self, obj):
-        if obj.is_completed:
-            return format_html(
-                '<span style="background-color: #28a745; color: white; padding: 3px 10px; border-radius: 3px;">✅ Завершен</span>')
-        return format_html(
-            '<span style="background-color: #ffc107; color: white; padding: 3px 10px; border-radius: 3px;">⏳ В процессе</span>')
+        return _COMPLETION_BADGES[obj.is_completed]
 
     completion_badge.short_description = 'Статус'
 
@@ -180,8 +258,7 @@ class LessonProgressAdmin(admin.ModelAdmin):
     def duration_display(self, obj):
         seconds = obj.get_duration_seconds()
         if seconds > 0:
-            minutes = int(seconds // 60)
-            secs = int(seconds % 60)
+            minutes, secs = divmod(int(seconds), 60)
             return f'⏱️ {minutes}:{secs:02d}'
         return '-'
 
@@ -206,19 +283,17 @@ class LessonProgressAdmin(admin.ModelAdmin):
     mark_completed.short_description = '🔧 [Служебное] Вручную завершить урок'
 
     def mark_uncompleted(self, request, queryset):
+        # Пары (студент, курс) берём до UPDATE — прогресс каждого зачисления пересчитываем один раз
+        affected = set(queryset.values_list('user_id', 'course_id'))
         updated = queryset.update(is_completed=False, completed_at=None)
 
         # ВАЖНО: Пересчитать прогресс курса после отмены
-        for progress in queryset:
-            try:
-                from content.models import Lesson
-                enrollment = CourseEnrollment.objects.get(
-                    user=progress.user,
-                    course=progress.lesson.module.course
-                )
+        if affected:
+            enrollments_filter = Q()
+            for user_id, course_id in affected:
+                enrollments_filter |= Q(user_id=user_id, course_id=course_id)
+            for enrollment in CourseEnrollment.objects.filter(enrollments_filter).select_related('user', 'course'):
                 enrollment.calculate_progress()
-            except CourseEnrollment.DoesNotExist:
-                pass
 
         self.message_user(request, f'⏳ Отмечено незавершенными: {updated}')
 
@@ -237,9 +312,13 @@ class LessonProgressAdmin(admin.ModelAdmin):
 class VideoProgressAdmin(admin.ModelAdmin):
     list_display = ['user_info', 'video_lesson_title', 'watch_percentage_display', 'is_completed_badge', 'started_at',
                     'last_watched_at']
+    list_select_related = ('user', 'video_lesson__lesson')
     list_filter = ['started_at', 'last_watched_at']
     search_fields = ['user__email', 'user__first_name', 'user__last_name', 'video_lesson__lesson__title']
     readonly_fields = ['started_at', 'last_watched_at']
+    raw_id_fields = ['user', 'video_lesson']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         ('Основная информация', {
@@ -255,24 +334,21 @@ class VideoProgressAdmin(admin.ModelAdmin):
 
     user_info.short_description = 'Пользователь'
 
+    @admin.display(description='Видео-урок', ordering='video_lesson__lesson__title')
     def video_lesson_title(self, obj):
         return obj.video_lesson.lesson.title
 
-    video_lesson_title.short_description = 'Видео-урок'
-
+    @admin.display(description='Просмотр', ordering='watch_percentage')
     def watch_percentage_display(self, obj):
-        percentage = float(obj.watch_percentage)
-        color = '#28a745' if percentage >= 90 else '#ffc107' if percentage >= 50 else '#dc3545'
-        return format_html(
-            '<span style="color: {}; font-weight: bold;">{}%</span>',
-            color, int(percentage)
-        )
-
-    watch_percentage_display.short_description = 'Просмотр'
+        return _watch_percentage_html(float(obj.watch_percentage))
 
     def is_completed_badge(self, obj):
         if obj.is_mostly_watched():
             return '✅ Завершено'
         return '⏳ В процессе'
 
-    is_completed_badge.short_description = 'Статус'
\ No newline at end of file
+    is_completed_badge.short_description = 'Статус'
+
+    def get_queryset(self, request):
+        # Из видео-урока в списке нужен только порог завершения — таймкоды (JSON) не загружаем
+        return super().get_queryset(request).defer('video_lesson__timecodes')
\ No newline at end of file
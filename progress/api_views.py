@@ -1,5 +1,8 @@
-from django.db.models import Count
+import math
+
+from django.db.models import Count, Exists, F, OuterRef, Subquery
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -8,6 +11,7 @@ from rest_framework.views import APIView
 from account.models import UserActivityLog
 from content.models import Course, Lesson
 from groups.models import GroupMembership
+from .cache import MY_COURSES_CACHE_TIMEOUT, get_cached_my_courses, set_cached_my_courses
 from .models import CourseEnrollment, LessonProgress, VideoProgress
 from .serializers import MyCourseSerializer, CourseProgressSerializer
 
@@ -20,6 +24,33 @@ class MyCoursesView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
+        # Ответ не меняется, пока не изменились зачисления, прогресс или членства (их сигналы сбрасывают кэш)
+        cache_key, data = get_cached_my_courses(request.user.id)
+        if data is not None:
+            return Response(data)
+
+        now = timezone.now()
+
+        # Текущий урок: первый урок курса без завершённого прогресса студента
+        completed_progress = LessonProgress.objects.filter(
+            user_id=request.user.id,
+            lesson=OuterRef('pk'),
+            is_completed=True
+        )
+        current_lesson = Lesson.objects.filter(
+            module__course=OuterRef('course_id')
+        ).exclude(
+            Exists(completed_progress)
+        ).order_by('module__order', 'order').values('id')[:1]
+
+        # Ближайший заблокированный урок: первый незавершённый с датой доступности в будущем
+        next_locked = LessonProgress.objects.filter(
+            user_id=OuterRef('user_id'),
+            course_id=OuterRef('course_id'),
+            is_completed=False,
+            available_at__gt=now
+        ).order_by('lesson__module__order', 'lesson__order').values('id')[:1]
+
         # Получаем все зачисления с prefetch связанных данных
         enrollments = CourseEnrollment.objects.filter(
             user=request.user,
@@ -32,7 +63,9 @@ class MyCoursesView(APIView):
             total_lessons_count=Count(
                 'course__modules__lessons',
                 distinct=True
-            )
+            ),
+            current_lesson_id=Subquery(current_lesson),
+            next_locked_progress_id=Subquery(next_locked)
         ).order_by('-enrolled_at')
 
         # Prefetch memberships для всех групп сразу
@@ -47,18 +80,42 @@ class MyCoursesView(APIView):
             )
             memberships_map = {m.group_id: m for m in memberships}
 
-        # Привязываем membership к enrollment
+        # Привязываем membership к enrollment; доступ есть только при активном членстве
         for enrollment in enrollments:
             if enrollment.group_id:
                 enrollment._prefetched_membership = memberships_map.get(enrollment.group_id)
             else:
                 enrollment._prefetched_membership = None
+            enrollment._has_access = enrollment._prefetched_membership is not None
 
         # Фильтруем только с активным доступом
-        active_enrollments = [e for e in enrollments if e.has_access()]
+        active_enrollments = [e for e in enrollments if e._has_access]
+
+        # Текущие и заблокированные уроки всех курсов — по одному запросу
+        lessons = Lesson.objects.only('id', 'title', 'lesson_type').in_bulk(
+            [e.current_lesson_id for e in active_enrollments if e.current_lesson_id]
+        )
+        locked_progress = LessonProgress.objects.select_related('lesson').only(
+            'available_at', 'lesson__id', 'lesson__title'
+        ).in_bulk(
+            [e.next_locked_progress_id for e in active_enrollments if e.next_locked_progress_id]
+        )
+        for enrollment in active_enrollments:
+            enrollment._prefetched_current_lesson = lessons.get(enrollment.current_lesson_id)
+            enrollment._prefetched_next_locked = locked_progress.get(enrollment.next_locked_progress_id)
 
         serializer = MyCourseSerializer(active_enrollments, many=True)
-        return Response(serializer.data)
+        data = serializer.data
+
+        # Не дольше, чем до открытия ближайшего заблокированного урока
+        timeout = MY_COURSES_CACHE_TIMEOUT
+        for enrollment in active_enrollments:
+            if enrollment._prefetched_next_locked:
+                seconds_left = (enrollment._prefetched_next_locked.available_at - now).total_seconds()
+                timeout = min(timeout, max(1, math.ceil(seconds_left)))
+        set_cached_my_courses(cache_key, data, timeout)
+
+        return Response(data)
 
 
 class CourseProgressView(APIView):
@@ -90,6 +147,9 @@ class CourseProgressView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
+        # Курс уже загружен — сериализатору не нужен повторный запрос
+        enrollment.course = course
+
         serializer = CourseProgressSerializer(
             enrollment,
             context={'request': request}
@@ -109,12 +169,13 @@ class LessonCompleteView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, pk):
-        lesson = get_object_or_404(Lesson, pk=pk)
+        lesson = get_object_or_404(Lesson.objects.select_related('module'), pk=pk)
 
         try:
-            enrollment = CourseEnrollment.objects.get(
+            # Для проверки доступа нужны только id; course_id — для пересчёта прогресса в mark_completed
+            enrollment = CourseEnrollment.objects.only('user_id', 'course_id', 'group_id').get(
                 user=request.user,
-                course=lesson.module.course
+                course_id=lesson.module.course_id
             )
         except CourseEnrollment.DoesNotExist:
             return Response(
@@ -148,10 +209,13 @@ class LessonCompleteView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-            # Для видео: проверяем процент просмотра
-        if lesson.lesson_type == 'video':
+            # Для видео: проверяем процент просмотра (завершённый урок уже прошёл проверку)
+        if lesson.lesson_type == 'video' and not lesson_progress.is_completed:
             try:
-                video_progress = VideoProgress.objects.get(
+                # Порог завершения — тем же запросом, без загрузки видео-урока с таймкодами
+                video_progress = VideoProgress.objects.select_related('video_lesson').only(
+                    'watch_percentage', 'video_lesson__completion_threshold'
+                ).get(
                     user=request.user,
                     video_lesson__lesson=lesson
                 )
@@ -172,41 +236,55 @@ class LessonCompleteView(APIView):
 
             # Завершаем урок (если еще не завершен)
         if not lesson_progress.is_completed:
-            lesson_progress.mark_completed(request=request)
-            # mark_completed() уже пересчитывает прогресс курса
+            # mark_completed() пересчитывает прогресс курса прямо в переданном зачислении
+            lesson_progress.mark_completed(request=request, enrollment=enrollment)
 
             UserActivityLog.log(
                 request, request.user, 'lesson_completed', lesson=lesson
             )
 
-            # Обновляем enrollment из БД (т.к. mark_completed изменил его)
-        enrollment.refresh_from_db()
+        if 'progress_percentage' in enrollment.get_deferred_fields():
+            # Урок уже был завершён (или его завершил параллельный запрос) — прогресс берём из БД
+            enrollment.refresh_from_db(fields=['progress_percentage', 'completed_lessons_count'])
 
         # Получаем следующий урок
-        next_lesson = self._get_next_lesson(lesson)
         next_lesson_data = None
+        if hasattr(lesson_progress, '_next_lesson_progress'):
+            # Урок завершён этим запросом: mark_completed уже открыл следующий урок
+            # и сохранил его available_at — читаем готовое, без повторного расчёта
+            next_progress = lesson_progress._next_lesson_progress
+            next_lesson = next_progress.lesson if next_progress else None
+        else:
+            next_lesson = self._get_next_lesson(lesson)
+            next_progress = None
 
-        if next_lesson:
+        if next_lesson and next_progress is None:
             next_progress, created = LessonProgress.objects.get_or_create(
                 user=request.user,
                 lesson=next_lesson,
                 defaults={'is_completed': False}
             )
 
-            # Всегда пересчитываем доступность после завершения предыдущего урока
-            next_progress.calculate_available_at()
+            # Предыдущий для следующего урока — текущий, и его прогресс уже загружен:
+            # доступность считается без запросов урока, модулей и прогресса
+            next_lesson._previous_lesson = lesson
+            next_progress.lesson = next_lesson
 
+            # Урок был завершён раньше — пересчитываем доступность следующего на случай устаревших данных
+            next_progress.calculate_available_at({lesson.pk: lesson_progress})
+
+        if next_lesson:
             next_lesson_data = {
                 'id': next_lesson.id,
                 'title': next_lesson.title,
                 'type': next_lesson.lesson_type,
                 'is_available': next_progress.is_available(),
                 'available_at': next_progress.available_at,
-                'available_in': self._get_available_in(next_progress.available_at)
+                'available_in': next_progress.get_available_in()
             }
 
         # Подсчитываем общее количество уроков
-        total_lessons = Lesson.objects.filter(module__course=enrollment.course).count()
+        total_lessons = Lesson.objects.filter(module__course_id=lesson.module.course_id).count()
 
         return Response({
             'success': True,
@@ -225,47 +303,7 @@ class LessonCompleteView(APIView):
 
     def _get_next_lesson(self, current_lesson):
         """Получить следующий урок в курсе"""
-        # Пытаемся найти следующий урок в том же модуле
-        next_in_module = Lesson.objects.filter(
-            module=current_lesson.module,
-            order__gt=current_lesson.order
-        ).order_by('order').first()
-
-        if next_in_module:
-            return next_in_module
-
-        # Если нет - ищем в следующем модуле
-        from content.models import Module
-        next_module = Module.objects.filter(
-            course=current_lesson.module.course,
-            order__gt=current_lesson.module.order
-        ).order_by('order').first()
-
-        if next_module:
-            return Lesson.objects.filter(module=next_module).order_by('order').first()
-
-        return None
-
-    def _get_available_in(self, available_at):
-        """Человекочитаемое время до доступности"""
-        if not available_at:
-            return None
-
-        from django.utils import timezone
-        delta = available_at - timezone.now()
-
-        if delta.total_seconds() < 0:
-            return "доступен сейчас"
-
-        hours = int(delta.total_seconds() // 3600)
-        minutes = int((delta.total_seconds() % 3600) // 60)
-
-        if hours > 0 and minutes > 0:
-            return f"через {hours} ч. {minutes} мин."
-        elif hours > 0:
-            return f"через {hours} ч."
-        else:
-            return f"через {minutes} мин."
+        return current_lesson.get_next_lesson()
 
 
 class VideoProgressUpdateView(APIView):
@@ -278,13 +316,23 @@ class VideoProgressUpdateView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, pk):
-        lesson = get_object_or_404(Lesson, pk=pk, lesson_type='video')
+        # Плеер шлёт прогресс часто: видео-урок и курс берём одним запросом,
+        # из видео нужен только порог завершения — таймкоды (JSON) не загружаем
+        from content.models import VideoLesson
+        video_lesson = get_object_or_404(
+            VideoLesson.objects.only('id', 'completion_threshold').annotate(
+                lesson_course_id=F('lesson__module__course_id')
+            ),
+            lesson_id=pk,
+            lesson__lesson_type='video'
+        )
 
         # Проверка зачисления
         try:
-            enrollment = CourseEnrollment.objects.get(
+            # Нужен только для проверки доступа — остальные поля не загружаем
+            enrollment = CourseEnrollment.objects.only('user_id', 'group_id').get(
                 user=request.user,
-                course=lesson.module.course
+                course_id=video_lesson.lesson_course_id
             )
         except CourseEnrollment.DoesNotExist:
             return Response(
@@ -319,13 +367,12 @@ class VideoProgressUpdateView(APIView):
             )
 
         # Получаем прогресс видео
-        from content.models import VideoLesson
-        video_lesson = get_object_or_404(VideoLesson, lesson=lesson)
-
         video_progress, created = VideoProgress.objects.get_or_create(
             user=request.user,
             video_lesson=video_lesson
         )
+        # Порог завершения берём из уже загруженного видео, а не повторным запросом
+        video_progress.video_lesson = video_lesson
 
         # Обновляем прогресс
         video_progress.update_progress(percentage)
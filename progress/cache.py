@@ -0,0 +1,77 @@
+import logging
+import time
+
+from django.core.cache import caches
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Отдельный алиас (CACHES['my_courses']): остальные кэши проекта остаются на своём бэкенде
+MY_COURSES_CACHE_ALIAS = 'my_courses'
+
+# Ответ «Мои курсы» живёт не дольше этого времени, даже если изменений не было
+MY_COURSES_CACHE_TIMEOUT = 300
+
+
+def _my_courses_cache():
+    return caches[MY_COURSES_CACHE_ALIAS]
+
+
+def _my_courses_version_key(user_id):
+    return f'my-courses:v:{user_id}'
+
+
+def get_my_courses_cache_key(user_id):
+    """
+    Ключ кэша «Мои курсы» с версией пользователя.
+    Версия — метка времени: после сброса новый ключ не совпадёт ни с одним из старых.
+    """
+    cache = _my_courses_cache()
+    version_key = _my_courses_version_key(user_id)
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, time.time_ns(), None)
+        version = cache.get(version_key)
+    return f'my-courses:{user_id}:{version}'
+
+
+def get_cached_my_courses(user_id):
+    """
+    (ключ, данные) из кэша «Мои курсы»; данные None — промах.
+    Недоступный кэш не ломает запрос: ответ просто собирается из БД (ключ тогда None).
+    """
+    try:
+        cache_key = get_my_courses_cache_key(user_id)
+        return cache_key, _my_courses_cache().get(cache_key)
+    except Exception:
+        logger.warning('Кэш «Мои курсы» недоступен (чтение)', exc_info=True)
+        return None, None
+
+
+def set_cached_my_courses(cache_key, data, timeout):
+    """Сохранить ответ «Мои курсы»; ошибки кэша только логируются"""
+    if cache_key is None:
+        return
+    try:
+        _my_courses_cache().set(cache_key, data, timeout)
+    except Exception:
+        logger.warning('Кэш «Мои курсы» недоступен (запись)', exc_info=True)
+
+
+def invalidate_my_courses(user_ids):
+    """
+    Сбросить кэш «Мои курсы» пользователей (зачисление, прогресс или членство изменились).
+    Сброс — после коммита транзакции: иначе параллельный запрос успел бы закэшировать
+    ещё не закоммиченное состояние. Ошибка кэша не откатывает и не ломает запись в БД.
+    """
+    version_keys = [_my_courses_version_key(user_id) for user_id in set(user_ids)]
+    if not version_keys:
+        return
+
+    def reset():
+        try:
+            _my_courses_cache().delete_many(version_keys)
+        except Exception:
+            logger.warning('Не удалось сбросить кэш «Мои курсы»', exc_info=True)
+
+    transaction.on_commit(reset)
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0006_remove_requires_previous_module'),
+        ('progress', '0005_lessonprogress_completed_ip_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='videoprogress',
+            index=models.Index(fields=['-last_watched_at'], name='progress_vi_last_wa_658d42_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:25
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('progress', '0006_videoprogress_progress_vi_last_wa_658d42_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='lessonprogress',
+            name='progress_le_user_id_8c8ec5_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='videoprogress',
+            name='progress_vi_user_id_022123_idx',
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.5 on 2026-10-17 01:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models, transaction
+
+
+# Размер пачки для backfill: каждая пачка — отдельная транзакция
+FILL_BATCH_SIZE = 100000
+
+
+def fill_course(apps, schema_editor):
+    """Заполнить курс в существующем прогрессе из lesson.module.course"""
+    Lesson = apps.get_model('content', 'Lesson')
+    Module = apps.get_model('content', 'Module')
+    LessonProgress = apps.get_model('progress', 'LessonProgress')
+    connection = schema_editor.connection
+
+    if connection.vendor != 'postgresql':
+        course_id = Lesson.objects.filter(
+            pk=models.OuterRef('lesson_id')
+        ).values('module__course_id')[:1]
+        LessonProgress.objects.filter(course__isnull=True).update(
+            course_id=models.Subquery(course_id)
+        )
+        return
+
+    # PostgreSQL: UPDATE ... FROM с join вместо коррелированного подзапроса,
+    # пачками по диапазону id, чтобы не держать блокировки на всю таблицу
+    qn = schema_editor.quote_name
+    sql = (
+        f'UPDATE {qn(LessonProgress._meta.db_table)} AS lp '
+        f'SET course_id = m.course_id '
+        f'FROM {qn(Lesson._meta.db_table)} AS l '
+        f'JOIN {qn(Module._meta.db_table)} AS m ON m.id = l.module_id '
+        f'WHERE lp.lesson_id = l.id AND lp.course_id IS NULL '
+        f'AND lp.id >= %s AND lp.id < %s'
+    )
+    bounds = LessonProgress.objects.aggregate(
+        min_id=models.Min('id'), max_id=models.Max('id')
+    )
+    if bounds['min_id'] is None:
+        return
+
+    for start in range(bounds['min_id'], bounds['max_id'] + 1, FILL_BATCH_SIZE):
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(sql, [start, start + FILL_BATCH_SIZE])
+
+
+class Migration(migrations.Migration):
+    # Backfill коммитит каждую пачку отдельно
+    atomic = False
+
+    dependencies = [
+        ('content', '0008_remove_lesson_content_les_module__c210ff_idx_and_more'),
+        ('progress', '0007_remove_lessonprogress_progress_le_user_id_8c8ec5_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonprogress',
+            name='course',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='lesson_progress', to='content.course', verbose_name='Курс'),
+        ),
+        migrations.RunPython(fill_course, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='lessonprogress',
+            index=models.Index(fields=['user', 'course', 'is_completed'], name='progress_le_user_id_4568d4_idx'),
+        ),
+    ]
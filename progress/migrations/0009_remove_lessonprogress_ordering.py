@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-17 01:26
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('progress', '0008_lessonprogress_course'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='lessonprogress',
+            options={'verbose_name': 'Прогресс по уроку', 'verbose_name_plural': 'Прогресс по урокам'},
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-17 01:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0008_remove_lesson_content_les_module__c210ff_idx_and_more'),
+        ('progress', '0009_remove_lessonprogress_ordering'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lessonprogress',
+            index=models.Index(fields=['user', 'lesson', 'is_completed'], name='progress_le_user_id_9f7ea3_idx'),
+        ),
+    ]
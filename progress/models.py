@@ -4,10 +4,48 @@ from decimal import Decimal
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from django.utils.functional import cached_property
 
-from content.models import Course, Lesson, Module, VideoLesson
+from content.models import Course, Lesson, Module
 from groups.models import Group
+from .cache import invalidate_my_courses
+
+
+class CourseEnrollmentQuerySet(models.QuerySet):
+
+    def with_total_lessons(self):
+        """Аннотировать _total_lessons — число уроков курса"""
+        total_lessons = Lesson.objects.filter(
+            module__course=models.OuterRef('course')
+        ).order_by().values('module__course').annotate(count=models.Count('pk')).values('count')
+
+        return self.annotate(
+            _total_lessons=Coalesce(models.Subquery(total_lessons, output_field=models.IntegerField()), 0),
+        )
+
+    def with_progress(self):
+        """Аннотировать _total_lessons и _completed_lessons одним запросом на весь список"""
+        completed_lessons = LessonProgress.objects.filter(
+            user=models.OuterRef('user'),
+            course=models.OuterRef('course'),
+            is_completed=True
+        ).order_by().values('user').annotate(count=models.Count('pk')).values('count')
+
+        return self.with_total_lessons().annotate(
+            _completed_lessons=Coalesce(models.Subquery(completed_lessons, output_field=models.IntegerField()), 0),
+        )
+
+    def recalculate_progress(self):
+        """Пересчитать прогресс всех зачислений выборки: один SELECT и один bulk UPDATE"""
+        enrollments = list(self.with_progress())
+        for enrollment in enrollments:
+            enrollment._apply_progress(enrollment._total_lessons, enrollment._completed_lessons)
+        self.model.objects.bulk_update(
+            enrollments, ['progress_percentage', 'completed_lessons_count'], batch_size=500
+        )
+        return len(enrollments)
 
 
 class CourseEnrollment(models.Model):
@@ -61,6 +99,8 @@ class CourseEnrollment(models.Model):
 
     is_active = models.BooleanField('Активно', default=True, db_index=True)
 
+    objects = CourseEnrollmentQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Зачисление на курс'
         verbose_name_plural = 'Зачисления на курсы'
@@ -77,13 +117,14 @@ class CourseEnrollment(models.Model):
         Проверка доступа к курсу.
         Доступ есть ТОЛЬКО если есть активное членство в группе.
         """
-        if not self.group:
+        if not self.group_id:
             return False
 
+        # По id — без загрузки группы и студента
         from groups.models import GroupMembership
         return GroupMembership.objects.filter(
-            user=self.user,
-            group=self.group,
+            user_id=self.user_id,
+            group_id=self.group_id,
             is_active=True
         ).exists()
 
@@ -99,9 +140,18 @@ class CourseEnrollment(models.Model):
             self.save(update_fields=['is_active'])
 
     def __str__(self):
-        status = '✅' if self.has_access() else '❌'
+        # В админке доступ уже посчитан аннотацией _has_access — не делаем запрос повторно
+        has_access = getattr(self, '_has_access', None)
+        if has_access is None:
+            has_access = self.has_access()
+        status = '✅' if has_access else '❌'
+        return f"{status} {self.display_name}"
+
+    @cached_property
+    def display_name(self):
+        """Студент, курс и группа — считаются один раз на экземпляр"""
         group_name = self.group.name if self.group else "без группы"
-        return f"{status} {self.user.get_full_name()} → {self.course.title} ({group_name})"
+        return f"{self.user.get_full_name()} → {self.course.title} ({group_name})"
 
 
     def reset_progress(self):
@@ -122,7 +172,7 @@ class CourseEnrollment(models.Model):
         # Удаляем прогресс уроков
         LessonProgress.objects.filter(
             user=user,
-            lesson__module__course=course
+            course=course
         ).delete()
 
         # Удаляем попытки тестов (каскадно удалит QuizResponse)
@@ -149,32 +199,45 @@ class CourseEnrollment(models.Model):
         self.last_activity_at = None
         self.save(update_fields=['progress_percentage', 'completed_lessons_count', 'last_activity_at'])
 
-    def calculate_progress(self):
-        """Рассчитать прогресс по курсу"""
-        # Получаем все уроки курса
-        total_lessons = Lesson.objects.filter(
-            module__course=self.course
-        ).count()
-
+    def calculate_progress(self, touch_activity=False):
+        """
+        Рассчитать прогресс по курсу.
+        touch_activity — заодно обновить last_activity_at тем же UPDATE.
+        """
+        # Всего уроков и завершённые студентом — одним запросом:
+        # LEFT JOIN прогресса только этого студента, по строке на урок
+        counts = Lesson.objects.filter(
+            module__course_id=self.course_id
+        ).annotate(
+            own_progress=models.FilteredRelation(
+                'progress_records', condition=models.Q(progress_records__user_id=self.user_id)
+            )
+        ).aggregate(
+            total=models.Count('pk'),
+            completed=models.Count('pk', filter=models.Q(own_progress__is_completed=True)),
+        )
+        total_lessons, completed_lessons = counts['total'], counts['completed']
+
+        self._apply_progress(total_lessons, completed_lessons)
+
+        update_fields = ['progress_percentage', 'completed_lessons_count']
+        if touch_activity:
+            self.last_activity_at = timezone.now()
+            update_fields.append('last_activity_at')
+        self.save(update_fields=update_fields)
+
+    def _apply_progress(self, total_lessons, completed_lessons):
+        """Записать процент и число завершенных уроков (без сохранения)"""
         if total_lessons == 0:
             self.progress_percentage = 0
             self.completed_lessons_count = 0
-            self.save()
             return
 
-        # Считаем завершенные уроки
-        completed_lessons = LessonProgress.objects.filter(
-            user=self.user,
-            lesson__module__course=self.course,
-            is_completed=True
-        ).count()
-
         # Рассчитываем процент
         percentage = (completed_lessons / total_lessons) * 100
 
         self.progress_percentage = round(percentage, 2)
         self.completed_lessons_count = completed_lessons
-        self.save()
 
     def get_progress_percentage(self):
         """Получить текущий прогресс"""
@@ -188,8 +251,8 @@ class CourseEnrollment(models.Model):
     def get_current_lesson(self):
         """Получить текущий урок (первый незавершенный)"""
         completed_lesson_ids = LessonProgress.objects.filter(
-            user=self.user,
-            lesson__module__course=self.course,
+            user_id=self.user_id,
+            course_id=self.course_id,
             is_completed=True
         ).values_list('lesson_id', flat=True)
 
@@ -202,24 +265,23 @@ class CourseEnrollment(models.Model):
 
     def get_completed_modules_count(self):
         """Количество полностью завершенных модулей"""
-        modules = Module.objects.filter(course=self.course)
-        completed_count = 0
-
-        for module in modules:
-            total_lessons = module.lessons.count()
-            if total_lessons == 0:
-                continue
-
-            completed_lessons = LessonProgress.objects.filter(
-                user=self.user,
-                lesson__module=module,
-                is_completed=True
-            ).count()
-
-            if completed_lessons == total_lessons:
-                completed_count += 1
-
-        return completed_count
+        # Один агрегирующий запрос вместо двух COUNT на каждый модуль
+        return Module.objects.filter(
+            course=self.course
+        ).annotate(
+            total_lessons=models.Count('lessons', distinct=True),
+            completed_lessons=models.Count(
+                'lessons__progress_records',
+                filter=models.Q(
+                    lessons__progress_records__user=self.user,
+                    lessons__progress_records__is_completed=True
+                ),
+                distinct=True
+            )
+        ).filter(
+            total_lessons__gt=0,
+            completed_lessons=models.F('total_lessons')
+        ).count()
 
     def check_group_access(self):
         """
@@ -230,7 +292,7 @@ class CourseEnrollment(models.Model):
             # Нет группы = нет доступа
             if self.is_active:
                 self.is_active = False
-                self.save()
+                self.save(update_fields=['is_active'])
             return False
 
         # Проверяем активное членство
@@ -245,19 +307,22 @@ class CourseEnrollment(models.Model):
             # Нет активного членства = нет доступа
             if self.is_active:
                 self.is_active = False
-                self.save()
+                self.save(update_fields=['is_active'])
             return False
 
         # Есть активное членство = есть доступ
         if not self.is_active:
             self.is_active = True
-            self.save()
+            self.save(update_fields=['is_active'])
         return True
 
 
 class LessonProgress(models.Model):
     """Прогресс по уроку"""
 
+    # Общий ответ для доступных уроков — строка не собирается на каждый вызов
+    AVAILABLE_NOW = 'доступен сейчас'
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -272,6 +337,16 @@ class LessonProgress(models.Model):
         verbose_name='Урок'
     )
 
+    # Курс урока (дублируется из lesson.module.course), чтобы фильтровать прогресс по курсу без JOIN
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='lesson_progress',
+        null=True,
+        editable=False,
+        verbose_name='Курс'
+    )
+
     is_completed = models.BooleanField('Завершен', default=False, db_index=True)
 
     started_at = models.DateTimeField('Начало', null=True, blank=True)
@@ -298,18 +373,36 @@ class LessonProgress(models.Model):
     class Meta:
         verbose_name = 'Прогресс по уроку'
         verbose_name_plural = 'Прогресс по урокам'
-        ordering = ['lesson__module__order', 'lesson__order']
+        # Без ordering по умолчанию: сортировка по урокам требует JOIN, поэтому
+        # экраны, которым нужен порядок курса, задают order_by явно
+        # Индекс (user, lesson) создаётся ограничением unique_together
         unique_together = [['user', 'lesson']]
         indexes = [
-            models.Index(fields=['user', 'lesson']),
+            # Проверки «урок завершён» (user, lesson, is_completed) — только по индексу, без чтения строки
+            models.Index(fields=['user', 'lesson', 'is_completed']),
             models.Index(fields=['user', 'is_completed']),
             models.Index(fields=['lesson', 'is_completed']),
+            models.Index(fields=['user', 'course', 'is_completed']),
         ]
 
     def __str__(self):
         status = '✅' if self.is_completed else '⏳'
         return f"{status} {self.user.get_full_name()} - {self.lesson.title}"
 
+    def save(self, *args, **kwargs):
+        if self.course_id is None and self.lesson_id is not None:
+            self.course_id = self._resolve_course_id()
+        super().save(*args, **kwargs)
+
+    def _resolve_course_id(self):
+        """Курс урока: из уже загруженных урока и модуля, иначе одним запросом"""
+        if self._meta.get_field('lesson').is_cached(self):
+            lesson = self.lesson
+            if Lesson._meta.get_field('module').is_cached(lesson):
+                return lesson.module.course_id
+
+        return Lesson.objects.filter(pk=self.lesson_id).values_list('module__course_id', flat=True).first()
+
     @classmethod
     def get_or_create_safe(cls, user, lesson, **defaults):
         """
@@ -331,8 +424,12 @@ class LessonProgress(models.Model):
             obj = cls.objects.get(user=user, lesson=lesson)
             return obj, False
 
-    def mark_completed(self, completion_data=None, request=None):
-        """Отметить урок как завершенный"""
+    def mark_completed(self, completion_data=None, request=None, enrollment=None):
+        """
+        Отметить урок как завершенный.
+        enrollment — уже загруженное зачисление студента на курс урока (с course_id),
+        чтобы не запрашивать его повторно; после вызова в нём пересчитанный прогресс.
+        """
         if not self.is_completed:
             self.is_completed = True
             self.completed_at = timezone.now()
@@ -346,26 +443,47 @@ class LessonProgress(models.Model):
                 self.completed_ip = x_forwarded.split(',')[0].strip() if x_forwarded else request.META.get('REMOTE_ADDR')
                 self.completed_user_agent = request.META.get('HTTP_USER_AGENT', '')
 
-            self.save()
+            # Условный UPDATE: из параллельных запросов урок завершает только один,
+            # остальные не пересчитывают прогресс и не создают выпускника повторно
+            updated = LessonProgress.objects.filter(pk=self.pk, is_completed=False).update(
+                is_completed=True,
+                completed_at=self.completed_at,
+                completion_data=self.completion_data,
+                completed_ip=self.completed_ip,
+                completed_user_agent=self.completed_user_agent,
+            )
+            if not updated:
+                return
+
+            # UPDATE не шлёт post_save — сбрасываем кэш «Мои курсы» явно
+            invalidate_my_courses([self.user_id])
 
             # Обновить прогресс по курсу
             try:
-                enrollment = CourseEnrollment.objects.get(
-                    user=self.user,
-                    course=self.lesson.module.course
-                )
-                enrollment.calculate_progress()
-                enrollment.update_last_activity()
+                if enrollment is None:
+                    enrollment = CourseEnrollment.objects.get(
+                        user=self.user,
+                        course_id=self.lesson.module.course_id
+                    )
+                # Прогресс и время активности — одним UPDATE
+                enrollment.calculate_progress(touch_activity=True)
 
                 # Пересчитать available_at для следующего урока
                 next_lesson = self._get_next_lesson()
+                self._next_lesson_progress = None
                 if next_lesson:
                     # ✅ Используем безопасный метод вместо try/except
                     next_progress, created = LessonProgress.get_or_create_safe(
                         user=self.user,
                         lesson=next_lesson
                     )
-                    next_progress.calculate_available_at()
+                    # Предыдущий урок для следующего — текущий, и его прогресс уже на руках:
+                    # расчёт доступности обходится без поиска предыдущего урока и его прогресса
+                    next_lesson._previous_lesson = self.lesson
+                    next_progress.lesson = next_lesson
+                    next_progress.calculate_available_at(progress_by_lesson={self.lesson_id: self})
+                    # Открытый следующий урок остаётся на экземпляре: вызывающему не нужно считать его заново
+                    self._next_lesson_progress = next_progress
 
                     # Уведомление если урок доступен СЕЙЧАС
                     if next_progress.is_available():
@@ -385,7 +503,7 @@ class LessonProgress(models.Model):
 
                         if graduate:
                             enrollment.is_active = False
-                            enrollment.save()
+                            enrollment.save(update_fields=['is_active'])
 
                             print(f"🎓 Студент {self.user.email} завершил курс {enrollment.course.title}!")
                             print(f"   Создан Graduate ID: {graduate.id} (статус: pending)")
@@ -398,35 +516,19 @@ class LessonProgress(models.Model):
 
     def _get_next_lesson(self):
         """Получить следующий урок в курсе"""
-        from content.models import Lesson, Module
-
-        # Пытаемся найти следующий урок в том же модуле
-        next_in_module = Lesson.objects.filter(
-            module=self.lesson.module,
-            order__gt=self.lesson.order
-        ).order_by('order').first()
-
-        if next_in_module:
-            return next_in_module
-
-        # Если нет - ищем в следующем модуле
-        next_module = Module.objects.filter(
-            course=self.lesson.module.course,
-            order__gt=self.lesson.module.order
-        ).order_by('order').first()
-
-        if next_module:
-            return Lesson.objects.filter(module=next_module).order_by('order').first()
+        return self.lesson.get_next_lesson()
 
-        return None
-
-    def calculate_available_at(self):
-        """Рассчитать когда урок станет доступен"""
+    def calculate_available_at(self, progress_by_lesson=None):
+        """
+        Рассчитать когда урок станет доступен.
+        progress_by_lesson — уже загруженный прогресс студента по урокам курса {lesson_id: LessonProgress},
+        чтобы не запрашивать прогресс предыдущего урока отдельно.
+        """
 
         # 1. Если не требует завершения предыдущего
         if not self.lesson.requires_previous_completion:
             self.available_at = timezone.now()
-            self.save()
+            self.save(update_fields=['available_at'])
             return
 
         # 2. Получаем предыдущий урок
@@ -434,20 +536,25 @@ class LessonProgress(models.Model):
         if not previous_lesson:
             # Первый урок - доступен сразу
             self.available_at = timezone.now()
-            self.save()
+            self.save(update_fields=['available_at'])
             return
 
         # 3. Проверяем прогресс предыдущего урока
         try:
-            previous_progress = LessonProgress.objects.get(
-                user=self.user,
-                lesson=previous_lesson
-            )
+            if progress_by_lesson is not None:
+                previous_progress = progress_by_lesson.get(previous_lesson.pk)
+                if previous_progress is None:
+                    raise LessonProgress.DoesNotExist
+            else:
+                previous_progress = LessonProgress.objects.get(
+                    user=self.user,
+                    lesson=previous_lesson
+                )
 
             if not previous_progress.is_completed:
                 # Предыдущий не завершен - недоступен
                 self.available_at = None
-                self.save()
+                self.save(update_fields=['available_at'])
                 return
 
             # 4. ВАЖНО: Проверяем что completed_at не None
@@ -455,17 +562,17 @@ class LessonProgress(models.Model):
                 # Урок завершен, но нет даты завершения (старые данные)
                 # Используем текущее время
                 previous_progress.completed_at = timezone.now()
-                previous_progress.save()
+                previous_progress.save(update_fields=['completed_at'])
 
             # 5. Предыдущий завершен - добавляем задержку
             delay = timedelta(hours=self.lesson.access_delay_hours)
             self.available_at = previous_progress.completed_at + delay
-            self.save()
+            self.save(update_fields=['available_at'])
 
         except LessonProgress.DoesNotExist:
             # Если нет прогресса предыдущего - недоступен
             self.available_at = None
-            self.save()
+            self.save(update_fields=['available_at'])
 
     def is_available(self):
         """Проверка доступен ли урок"""
@@ -482,6 +589,24 @@ class LessonProgress(models.Model):
         from django.utils import timezone
         return timezone.now() >= self.available_at
 
+    def get_available_in(self):
+        """Человекочитаемое время до доступности"""
+        if not self.available_at:
+            return None
+
+        seconds = (self.available_at - timezone.now()).total_seconds()
+        if seconds < 0:
+            return self.AVAILABLE_NOW
+
+        # Строка с часами и минутами нужна только для ещё закрытых уроков
+        hours, minutes = divmod(int(seconds) // 60, 60)
+        if hours > 0 and minutes > 0:
+            return f"через {hours} ч. {minutes} мин."
+        elif hours > 0:
+            return f"через {hours} ч."
+        else:
+            return f"через {minutes} мин."
+
     def get_duration_seconds(self):
         """Длительность работы над уроком"""
         if self.started_at and self.completed_at:
@@ -494,6 +619,9 @@ class LessonProgress(models.Model):
 class VideoProgress(models.Model):
     """Прогресс просмотра видео"""
 
+    # Минимальный прирост процента, при котором прогресс записывается в БД
+    SAVE_STEP = 1
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -532,23 +660,54 @@ class VideoProgress(models.Model):
     class Meta:
         verbose_name = 'Прогресс видео'
         verbose_name_plural = 'Прогресс видео'
+        # Индекс (user, video_lesson) создаётся ограничением unique_together
         unique_together = [['user', 'video_lesson']]
         indexes = [
-            models.Index(fields=['user', 'video_lesson']),
+            models.Index(fields=['-last_watched_at']),
         ]
 
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.video_lesson.lesson.title} ({self.watch_percentage}%)"
 
     def update_progress(self, percentage):
-        """Обновить процент просмотра (только увеличивать)"""
-        if percentage > self.watch_percentage:
-            self.watch_percentage = min(percentage, 100)
+        """
+        Обновить процент просмотра (только увеличивать).
+        Плеер шлёт прогресс каждые несколько секунд, поэтому пишем в БД не каждый тик,
+        а при приросте от SAVE_STEP, достижении порога завершения или 100%.
+        """
+        # Сравнения на каждом тике — во float; Decimal собираем только для записи
+        percentage = round(min(float(percentage), 100.0), 2)
+        if not self._should_save_progress(percentage):
+            return False
 
-            if not self.started_at:
-                self.started_at = timezone.now()
+        value = Decimal(f'{percentage:.2f}')
+        now = timezone.now()
+        # Условный UPDATE: параллельный запрос с меньшим процентом не затрёт больший
+        VideoProgress.objects.filter(
+            pk=self.pk, watch_percentage__lt=value
+        ).update(
+            watch_percentage=value,
+            started_at=Coalesce('started_at', models.Value(now)),
+            last_watched_at=now,
+        )
+
+        self.watch_percentage = value
+        self.started_at = self.started_at or now
+        self.last_watched_at = now
+        return True
+
+    def _should_save_progress(self, percentage):
+        """Стоит ли записывать новый процент просмотра"""
+        current = float(self.watch_percentage)
+        if percentage <= current:
+            return False
 
-            self.save()
+        threshold = self.video_lesson.completion_threshold
+        return (
+            percentage - current >= self.SAVE_STEP
+            or percentage == 100
+            or current < threshold <= percentage
+        )
 
     def is_mostly_watched(self):
         """Проверка достижения порога завершения"""
@@ -1,7 +1,7 @@
-from django.db.models import Prefetch
 from django.utils import timezone
 from rest_framework import serializers
 
+from core.serializers import CachedFieldsSerializerMixin
 from content.models import Lesson, Module, VideoLesson
 from .models import CourseEnrollment, LessonProgress, VideoProgress
 
@@ -14,7 +14,7 @@ class VideoProgressSerializer(serializers.ModelSerializer):
         fields = ['watch_percentage', 'started_at', 'last_watched_at']
 
 
-class LessonProgressSerializer(serializers.ModelSerializer):
+class LessonProgressSerializer(CachedFieldsSerializerMixin, serializers.ModelSerializer):
     """Прогресс урока с доступностью"""
     lesson = serializers.SerializerMethodField()
     is_available = serializers.SerializerMethodField()
@@ -73,17 +73,11 @@ class LessonProgressSerializer(serializers.ModelSerializer):
                 from django.conf import settings
                 thumbnail_url = f"{settings.MEDIA_URL}{video.thumbnail.name}"
 
-        # Форматируем длительность
-        duration = video.video_duration or 0
-        minutes = int(duration // 60)
-        seconds = int(duration % 60)
-        formatted = f"{minutes}:{seconds:02d}"
-
         return {
             'vimeo_video_id': video.vimeo_video_id,
             'embed_url': video.get_vimeo_embed_url(),
             'video_duration': video.video_duration,
-            'formatted_duration': formatted,
+            'formatted_duration': video.format_duration(),
             'completion_threshold': video.completion_threshold,
             'thumbnail_url': thumbnail_url,
             'timecodes': video.timecodes,
@@ -94,26 +88,10 @@ class LessonProgressSerializer(serializers.ModelSerializer):
 
     def get_available_in(self, obj):
         """Человекочитаемое время до доступности"""
-        if not obj.available_at:
-            return None
-
-        if obj.is_available():
-            return "доступен сейчас"
-
-        delta = obj.available_at - timezone.now()
-
-        if delta.total_seconds() < 0:
-            return "доступен сейчас"
-
-        hours = int(delta.total_seconds() // 3600)
-        minutes = int((delta.total_seconds() % 3600) // 60)
-
-        if hours > 0 and minutes > 0:
-            return f"через {hours} ч. {minutes} мин."
-        elif hours > 0:
-            return f"через {hours} ч."
-        else:
-            return f"через {minutes} мин."
+        # Завершённый урок доступен всегда — время не считаем
+        if obj.available_at and obj.is_completed:
+            return obj.AVAILABLE_NOW
+        return obj.get_available_in()
 
     def get_video_duration(self, obj):
         """Длительность видео (из prefetch, без запроса!)"""
@@ -164,29 +142,32 @@ class CourseProgressSerializer(serializers.ModelSerializer):
             'duration': obj.course.duration
         }
 
-    def get_current_lesson(self, obj):
-        """Текущий урок (первый незавершенный) - из кэша"""
-        # Используем prefetch если есть
+    def _get_lessons_progress(self, obj):
+        """
+        Весь прогресс студента по курсу одним запросом (с уроками и видео).
+        Загружается один раз: его используют и current_lesson, и modules.
+        """
         lessons_progress = getattr(obj, '_prefetched_lessons_progress', None)
+        if lessons_progress is None:
+            lessons_progress = list(LessonProgress.objects.filter(
+                user_id=obj.user_id,
+                course_id=obj.course_id
+            ).select_related(
+                'lesson',
+                'lesson__videolesson'
+            ).order_by('lesson__module__order', 'lesson__order'))
+            obj._prefetched_lessons_progress = lessons_progress
+        return lessons_progress
 
-        if lessons_progress is not None:
-            for lp in lessons_progress:
-                if not lp.is_completed and lp.is_available():
-                    return {
-                        'id': lp.lesson.id,
-                        'title': lp.lesson.title,
-                        'type': lp.lesson.lesson_type
-                    }
-            return None
-
-        # Fallback к стандартному методу
-        lesson = obj.get_current_lesson()
-        if lesson:
-            return {
-                'id': lesson.id,
-                'title': lesson.title,
-                'type': lesson.lesson_type
-            }
+    def get_current_lesson(self, obj):
+        """Текущий урок (первый незавершенный) - из общего прогресса по курсу"""
+        for lp in self._get_lessons_progress(obj):
+            if not lp.is_completed:
+                return {
+                    'id': lp.lesson.id,
+                    'title': lp.lesson.title,
+                    'type': lp.lesson.lesson_type
+                }
         return None
 
     def get_modules(self, obj):
@@ -194,39 +175,19 @@ class CourseProgressSerializer(serializers.ModelSerializer):
         Модули с прогрессом уроков - ОПТИМИЗИРОВАНО!
 
         Было: N+1 запросов (1 + количество модулей)
-        Стало: 2 запроса (модули + прогресс уроков)
+        Стало: 2 запроса (модули + прогресс уроков, общий с current_lesson)
         """
-        # 1. Получаем все модули курса с prefetch уроков и видео
+        # 1. Получаем все модули курса (уроки и видео приходят вместе с прогрессом ниже)
         modules = Module.objects.filter(
             course=obj.course
-        ).prefetch_related(
-            Prefetch(
-                'lessons',
-                queryset=Lesson.objects.select_related('videolesson').order_by('order')
-            )
         ).order_by('order')
 
-        # 2. ОДИН запрос для всего прогресса пользователя по курсу
-        all_progress = LessonProgress.objects.filter(
-            user=obj.user,
-            lesson__module__course=obj.course
-        ).select_related(
-            'lesson',
-            'lesson__videolesson'
-        ).order_by('lesson__module__order', 'lesson__order')
-
-        # 3. Группируем прогресс по module_id для быстрого доступа
+        # 2. Группируем прогресс по module_id для быстрого доступа
         progress_by_module = {}
-        for lp in all_progress:
-            module_id = lp.lesson.module_id
-            if module_id not in progress_by_module:
-                progress_by_module[module_id] = []
-            progress_by_module[module_id].append(lp)
-
-        # Сохраняем для get_current_lesson
-        obj._prefetched_lessons_progress = list(all_progress)
+        for lp in self._get_lessons_progress(obj):
+            progress_by_module.setdefault(lp.lesson.module_id, []).append(lp)
 
-        # 4. Собираем результат
+        # 3. Собираем результат
         result = []
         for module in modules:
             lessons_progress = progress_by_module.get(module.id, [])
@@ -280,7 +241,11 @@ class MyCourseSerializer(serializers.Serializer):
         return Lesson.objects.filter(module__course=obj.course).count()
 
     def get_current_lesson(self, obj):
-        lesson = obj.get_current_lesson()
+        # Используем prefetch если есть (MyCoursesView загружает уроки всех курсов разом)
+        if hasattr(obj, '_prefetched_current_lesson'):
+            lesson = obj._prefetched_current_lesson
+        else:
+            lesson = obj.get_current_lesson()
         if lesson:
             return {
                 'id': lesson.id,
@@ -316,23 +281,33 @@ class MyCourseSerializer(serializers.Serializer):
         }
 
     def get_has_access(self, obj):
-        return obj.has_access()
+        # Доступ уже посчитан по prefetch членств — не делаем запрос повторно
+        has_access = getattr(obj, '_has_access', None)
+        if has_access is None:
+            has_access = obj.has_access()
+        return has_access
 
     def get_next_lesson_available_at(self, obj):
         """Когда откроется следующий заблокированный урок"""
         from .models import LessonProgress
 
+        # Используем prefetch если есть
+        if hasattr(obj, '_prefetched_next_locked'):
+            return self._serialize_locked_lesson(obj._prefetched_next_locked)
+
         # Находим первый незавершённый урок с датой доступности в будущем
         locked_lesson = LessonProgress.objects.filter(
-            user=obj.user,
-            lesson__module__course=obj.course,
+            user_id=obj.user_id,
+            course_id=obj.course_id,
             is_completed=False,
             available_at__gt=timezone.now()
         ).select_related('lesson').order_by(
             'lesson__module__order',
             'lesson__order'
         ).first()
+        return self._serialize_locked_lesson(locked_lesson)
 
+    def _serialize_locked_lesson(self, locked_lesson):
         if locked_lesson:
             return {
                 'lesson_id': locked_lesson.lesson.id,
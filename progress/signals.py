@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from groups.models import GroupMembership
+from .cache import invalidate_my_courses
+from .models import CourseEnrollment, LessonProgress
+
+
+@receiver([post_save, post_delete], sender=CourseEnrollment)
+@receiver([post_save, post_delete], sender=LessonProgress)
+@receiver([post_save, post_delete], sender=GroupMembership)
+def reset_my_courses_cache(sender, instance, **kwargs):
+    """Зачисление, прогресс урока или членство в группе изменились — кэш «Мои курсы» студента устарел"""
+    invalidate_my_courses([instance.user_id])
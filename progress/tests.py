@@ -1,13 +1,20 @@
 from datetime import timedelta
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from django.utils import timezone
+from rest_framework.test import APIClient
 
 from account.models import User
 from content.models import Course, Module, Lesson
 from groups.models import Group
-from progress.models import CourseEnrollment, LessonProgress
+from progress.cache import MY_COURSES_CACHE_ALIAS
+from progress.models import CourseEnrollment, LessonProgress, VideoProgress
 
 
 class ProgressTestBase(TestCase):
@@ -98,6 +105,26 @@ class CourseEnrollmentCalculateProgressTest(ProgressTestBase):
         self.assertEqual(float(self.enrollment.progress_percentage), 100.0)
         self.assertEqual(self.enrollment.completed_lessons_count, 3)
 
+    def test_single_count_query(self):
+        """Подсчёт уроков и завершённых — один SELECT, плюс UPDATE."""
+        other = User.objects.create_user(
+            email='other2@test.com', password='testpass123', iin='123456789066',
+            first_name='Other', last_name='Student',
+        )
+        self.group.add_student(other)
+        LessonProgress.objects.filter(user=other).update(is_completed=True)
+        LessonProgress.objects.filter(user=self.user, lesson=self.lesson1).update(is_completed=True)
+
+        with self.assertNumQueries(2):
+            self.enrollment.calculate_progress()
+        self.assertEqual(self.enrollment.completed_lessons_count, 1)
+
+    def test_touch_activity_saved_with_progress(self):
+        """touch_activity=True сохраняет last_activity_at вместе с прогрессом."""
+        self.enrollment.calculate_progress(touch_activity=True)
+        self.enrollment.refresh_from_db()
+        self.assertIsNotNone(self.enrollment.last_activity_at)
+
     def test_no_lessons_in_course(self):
         """Курс без уроков → 0%."""
         empty_course = Course.objects.create(title='Empty Course')
@@ -114,6 +141,20 @@ class CourseEnrollmentCalculateProgressTest(ProgressTestBase):
         self.assertEqual(enrollment.progress_percentage, 0)
         self.assertEqual(enrollment.completed_lessons_count, 0)
 
+    def test_bulk_recalculate_matches_calculate_progress(self):
+        """recalculate_progress() считает так же, как calculate_progress()."""
+        LessonProgress.objects.filter(user=self.user, lesson=self.lesson1).update(is_completed=True)
+
+        with self.assertNumQueries(2):
+            count = CourseEnrollment.objects.filter(pk=self.enrollment.pk).recalculate_progress()
+
+        self.assertEqual(count, 1)
+        self.enrollment.refresh_from_db()
+        self.assertAlmostEqual(
+            float(self.enrollment.progress_percentage), 33.33, places=2,
+        )
+        self.assertEqual(self.enrollment.completed_lessons_count, 1)
+
 
 # ─── CourseEnrollment.reset_progress() ─────────────────────────────
 
@@ -186,6 +227,14 @@ class CourseEnrollmentAccessTest(ProgressTestBase):
         self.enrollment.refresh_from_db()
         self.assertFalse(self.enrollment.is_active)
 
+    def test_str_uses_annotated_access(self):
+        self.enrollment._has_access = False
+        str(self.enrollment)
+        with self.assertNumQueries(0):
+            text = str(self.enrollment)
+        self.assertTrue(text.startswith('❌'))
+        self.assertIn(self.course.title, text)
+
 
 # ─── LessonProgress.mark_completed() ──────────────────────────────
 
@@ -287,6 +336,32 @@ class LessonProgressAvailabilityTest(ProgressTestBase):
         lp2.refresh_from_db()
         self.assertFalse(lp2.is_available())
 
+    def test_next_lesson_available_at_uses_completed_at(self):
+        """available_at следующего урока = completed_at текущего + задержка."""
+        self.lesson2.access_delay_hours = 5
+        self.lesson2.save()
+
+        lp1 = LessonProgress.objects.get(user=self.user, lesson=self.lesson1)
+        lp1.mark_completed()
+
+        lp2 = LessonProgress.objects.get(user=self.user, lesson=self.lesson2)
+        self.assertEqual(lp2.available_at, lp1.completed_at + timedelta(hours=5))
+
+    def test_get_available_in(self):
+        """Человекочитаемое время до открытия урока."""
+        lp = LessonProgress.objects.get(user=self.user, lesson=self.lesson2)
+        lp.available_at = None
+        self.assertIsNone(lp.get_available_in())
+
+        lp.available_at = timezone.now() - timedelta(minutes=1)
+        self.assertEqual(lp.get_available_in(), LessonProgress.AVAILABLE_NOW)
+
+        lp.available_at = timezone.now() + timedelta(hours=2, minutes=30, seconds=30)
+        self.assertEqual(lp.get_available_in(), 'через 2 ч. 30 мин.')
+
+        lp.available_at = timezone.now() + timedelta(minutes=5, seconds=30)
+        self.assertEqual(lp.get_available_in(), 'через 5 мин.')
+
     def test_completed_lesson_always_available(self):
         lp = LessonProgress.objects.get(user=self.user, lesson=self.lesson1)
         lp.is_completed = True
@@ -294,3 +369,278 @@ class LessonProgressAvailabilityTest(ProgressTestBase):
         lp.available_at = None
         lp.save()
         self.assertTrue(lp.is_available())
+
+    def test_next_module_first_lesson_follows_previous_module(self):
+        """Первый урок следующего модуля открывается после последнего урока предыдущего."""
+        module2 = Module.objects.create(course=self.course, title='Module 2', order=1)
+        lesson4 = Lesson.objects.create(module=module2, title='Lesson 4', lesson_type='text', order=0)
+
+        self.assertEqual(lesson4.get_previous_lesson(), self.lesson3)
+        self.assertEqual(self.lesson3.get_next_lesson(), lesson4)
+        self.assertIsNone(self.lesson1.get_previous_lesson())
+        self.assertIsNone(lesson4.get_next_lesson())
+
+    def test_prefetch_previous_lessons_matches_queries(self):
+        """Предзагрузка предыдущих уроков совпадает с get_previous_lesson(), включая пустой модуль."""
+        Module.objects.create(course=self.course, title='Empty', order=1)
+        module3 = Module.objects.create(course=self.course, title='Module 3', order=2)
+        module4 = Module.objects.create(course=self.course, title='Module 4', order=3)
+        Lesson.objects.create(module=module3, title='Lesson 4', lesson_type='text', order=0)
+        Lesson.objects.create(module=module4, title='Lesson 5', lesson_type='text', order=0)
+        Lesson.objects.create(module=module4, title='Lesson 6', lesson_type='text', order=1)
+
+        expected = {
+            lesson.pk: lesson.get_previous_lesson()
+            for lesson in Lesson.objects.filter(module__course=self.course)
+        }
+        lessons = list(Lesson.objects.filter(module__course=self.course))
+        with self.assertNumQueries(1):
+            Lesson.prefetch_previous_lessons(lessons)
+            previous = {lesson.pk: lesson.get_previous_lesson() for lesson in lessons}
+        self.assertEqual(previous, expected)
+
+    def test_enrollment_initializes_availability(self):
+        """При зачислении первый урок открыт, остальные ждут завершения предыдущих."""
+        other = User.objects.create_user(
+            email='other@test.com', password='testpass123', iin='123456789077',
+            first_name='Other', last_name='Student',
+        )
+        self.group.add_student(other)
+        progress = {
+            lp.lesson_id: lp for lp in LessonProgress.objects.filter(user=other)
+        }
+        self.assertTrue(progress[self.lesson1.pk].is_available())
+        self.assertFalse(progress[self.lesson2.pk].is_available())
+        self.assertFalse(progress[self.lesson3.pk].is_available())
+
+
+# ─── CourseEnrollment.get_completed_modules_count() ────────────────
+
+class CourseEnrollmentCompletedModulesTest(ProgressTestBase):
+
+    def _complete(self, lesson):
+        LessonProgress.objects.filter(user=self.user, lesson=lesson).update(
+            is_completed=True, completed_at=timezone.now(),
+        )
+
+    def test_partial_module_not_counted(self):
+        self._complete(self.lesson1)
+        self.assertEqual(self.enrollment.get_completed_modules_count(), 0)
+
+    def test_completed_module_counted_empty_module_skipped(self):
+        Module.objects.create(course=self.course, title='Empty', order=1)
+        for lesson in [self.lesson1, self.lesson2, self.lesson3]:
+            self._complete(lesson)
+        self.assertEqual(self.enrollment.get_completed_modules_count(), 1)
+
+    def test_other_user_progress_ignored(self):
+        other = User.objects.create_user(
+            email='other@test.com', password='testpass123', iin='123456789077',
+            first_name='Other', last_name='Student',
+        )
+        self.group.add_student(other)
+        LessonProgress.objects.filter(user=other).update(is_completed=True)
+        self.assertEqual(self.enrollment.get_completed_modules_count(), 0)
+
+
+# ─── CourseProgressSerializer ──────────────────────────────────────
+
+class CourseProgressSerializerTest(ProgressTestBase):
+
+    def test_current_lesson_and_modules_share_progress_query(self):
+        """Прогресс по курсу загружается один раз для current_lesson и modules."""
+        from progress.serializers import CourseProgressSerializer
+
+        LessonProgress.objects.filter(user=self.user, lesson=self.lesson1).update(
+            is_completed=True, completed_at=timezone.now(),
+        )
+        enrollment = CourseEnrollment.objects.select_related('course').get(pk=self.enrollment.pk)
+
+        # Модули + прогресс по урокам
+        with self.assertNumQueries(2):
+            data = CourseProgressSerializer(enrollment).data
+
+        self.assertEqual(data['current_lesson']['id'], self.lesson2.pk)
+        self.assertEqual(data['modules'][0]['completed_lessons'], 1)
+        self.assertEqual(
+            [lesson['lesson']['id'] for lesson in data['modules'][0]['lessons']],
+            [self.lesson1.pk, self.lesson2.pk, self.lesson3.pk],
+        )
+
+
+# ─── MyCoursesView: кэш ответа ─────────────────────────────────────
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'my_courses': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+})
+class MyCoursesCacheTest(ProgressTestBase):
+
+    def setUp(self):
+        super().setUp()
+        caches[MY_COURSES_CACHE_ALIAS].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('progress:api-my-courses')
+
+    def test_second_request_served_from_cache(self):
+        first = self.client.get(self.url).json()
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url).json()
+        self.assertEqual(first, second)
+
+    def test_lesson_completion_resets_cache(self):
+        self.assertEqual(self.client.get(self.url).json()[0]['completed_lessons'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            LessonProgress.objects.get(user=self.user, lesson=self.lesson1).mark_completed()
+
+        data = self.client.get(self.url).json()
+        self.assertEqual(data[0]['completed_lessons'], 1)
+        self.assertEqual(data[0]['current_lesson']['id'], self.lesson2.pk)
+
+    def test_reset_waits_for_commit(self):
+        """Кэш сбрасывается только после коммита транзакции"""
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            LessonProgress.objects.get(user=self.user, lesson=self.lesson1).mark_completed()
+            with self.assertNumQueries(0):
+                self.client.get(self.url)
+
+        self.assertTrue(callbacks)
+
+    def test_cache_failure_does_not_break_requests(self):
+        """Недоступный кэш: запись прогресса и ответ «Мои курсы» работают без него"""
+        broken = patch.object(LocMemCache, 'get', side_effect=ConnectionError)
+        broken_delete = patch.object(LocMemCache, 'delete_many', side_effect=ConnectionError)
+
+        with broken, broken_delete, self.assertLogs('progress.cache', 'WARNING'):
+            with self.captureOnCommitCallbacks(execute=True):
+                LessonProgress.objects.get(user=self.user, lesson=self.lesson1).mark_completed()
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['completed_lessons'], 1)
+
+
+# ─── LessonProgress.course ─────────────────────────────────────────
+
+class LessonProgressCourseTest(ProgressTestBase):
+
+    def test_course_filled_on_create(self):
+        """Курс урока проставляется при создании прогресса."""
+        self.assertEqual(
+            set(LessonProgress.objects.filter(user=self.user).values_list('course_id', flat=True)),
+            {self.course.pk},
+        )
+        LessonProgress.objects.filter(user=self.user, lesson=self.lesson3).delete()
+        progress = LessonProgress.objects.create(user=self.user, lesson=self.lesson3)
+        self.assertEqual(progress.course_id, self.course.pk)
+
+    def test_course_follows_moved_lesson(self):
+        """При переносе урока в модуль другого курса курс в прогрессе обновляется."""
+        other_course = Course.objects.create(title='Other Course')
+        other_module = Module.objects.create(course=other_course, title='Other', order=0)
+        self.lesson3.module = other_module
+        self.lesson3.save()
+
+        progress = LessonProgress.objects.get(user=self.user, lesson=self.lesson3)
+        self.assertEqual(progress.course_id, other_course.pk)
+
+    def test_course_follows_moved_module(self):
+        """При переносе модуля в другой курс курс в прогрессе обновляется."""
+        other_course = Course.objects.create(title='Other Course')
+        self.module.course = other_course
+        self.module.save()
+
+        self.assertFalse(
+            LessonProgress.objects.filter(user=self.user).exclude(course=other_course).exists()
+        )
+
+    def test_course_follows_module_moved_in_loaded_instance(self):
+        other_course = Course.objects.create(title='Other Course')
+        module = Module.objects.get(pk=self.module.pk)
+        module.course = other_course
+        module.save()
+
+        self.assertFalse(
+            LessonProgress.objects.filter(user=self.user).exclude(course=other_course).exists()
+        )
+
+    def test_edit_without_move_skips_resync(self):
+        """Правка названия урока или модуля не трогает прогресс."""
+        lesson = Lesson.objects.get(pk=self.lesson1.pk)
+        lesson.title = 'Новое название'
+        module = Module.objects.get(pk=self.module.pk)
+        module.title = 'Новый модуль'
+
+        progress_table = LessonProgress._meta.db_table
+        with CaptureQueriesContext(connection) as queries:
+            lesson.save()
+            module.save()
+            self.lesson3.save()
+
+        self.assertEqual(len(queries.captured_queries), 3)
+        self.assertFalse(any(progress_table in q['sql'] for q in queries.captured_queries))
+
+
+# ─── VideoProgress.update_progress() ──────────────────────────────
+
+class VideoProgressUpdateTest(ProgressTestBase):
+
+    def setUp(self):
+        super().setUp()
+        from content.models import VideoLesson
+        video_lesson = VideoLesson.objects.create(
+            lesson=self.lesson1, vimeo_video_id='1', completion_threshold=50,
+        )
+        self.progress = VideoProgress.objects.create(user=self.user, video_lesson=video_lesson)
+
+    def _stored(self):
+        return float(VideoProgress.objects.get(pk=self.progress.pk).watch_percentage)
+
+    def test_small_increment_not_saved(self):
+        """Прирост меньше SAVE_STEP не пишется в БД."""
+        self.assertTrue(self.progress.update_progress(10))
+        self.assertFalse(self.progress.update_progress(10.5))
+        self.assertEqual(self._stored(), 10.0)
+
+    def test_threshold_crossing_saved(self):
+        """Переход порога завершения сохраняется даже при малом приросте."""
+        self.progress.update_progress(49.5)
+        self.assertTrue(self.progress.update_progress(50))
+        self.assertEqual(self._stored(), 50.0)
+        self.assertTrue(self.progress.is_mostly_watched())
+
+    def test_never_decreases(self):
+        """Меньший процент из параллельного запроса не затирает больший."""
+        stale = VideoProgress.objects.get(pk=self.progress.pk)
+        self.progress.update_progress(80)
+        stale.update_progress(30)
+        self.assertEqual(self._stored(), 80.0)
+        self.assertIsNotNone(VideoProgress.objects.get(pk=self.progress.pk).started_at)
+
+
+# ─── LessonProgressAdmin.mark_uncompleted ──────────────────────────
+
+class LessonProgressAdminUncompleteTest(ProgressTestBase):
+
+    def test_recalculates_enrollment_once(self):
+        from django.contrib import admin as django_admin
+        from progress.admin import LessonProgressAdmin
+
+        for lesson in [self.lesson1, self.lesson2]:
+            LessonProgress.objects.get(user=self.user, lesson=lesson).mark_completed()
+        model_admin = LessonProgressAdmin(LessonProgress, django_admin.site)
+        queryset = LessonProgress.objects.filter(user=self.user, is_completed=True)
+
+        with patch.object(CourseEnrollment, 'calculate_progress', autospec=True,
+                          side_effect=CourseEnrollment.calculate_progress) as calculate, \
+                patch.object(model_admin, 'message_user'):
+            model_admin.mark_uncompleted(None, queryset)
+
+        self.assertEqual(calculate.call_count, 1)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(float(self.enrollment.progress_percentage), 0)
+        self.assertEqual(self.enrollment.completed_lessons_count, 0)
@@ -1,11 +1,59 @@
 from content.models import Lesson
 from django.contrib import admin
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
 from django.utils.html import format_html
+from django.utils.safestring import mark_safe
 from django.core.exceptions import PermissionDenied
 
+from core.admin_filters import CourseListFilter
+from core.paginators import EstimatedCountPaginator
 from .models import QuizLesson, QuizQuestion, QuizAnswer, QuizAttempt, QuizResponse
 
 
+_BADGE_TEMPLATE = '<span style="background-color: {}; color: white; padding: 3px 10px; border-radius: 3px;">{}</span>'
+_DEFAULT_BADGE_COLOR = '#6c757d'
+
+_QUESTION_TYPE_COLORS = {
+    'single_choice': '#007bff',
+    'multiple_choice': '#28a745',
+    'true_false': '#ffc107',
+}
+_ATTEMPT_STATUS_COLORS = {
+    'in_progress': '#ffc107',
+    'completed': '#28a745',
+    'timeout': '#dc3545',
+}
+
+# Бейджи для фиксированных значений choices собираем один раз при импорте
+_QUESTION_TYPE_BADGES = {
+    value: format_html(_BADGE_TEMPLATE, _QUESTION_TYPE_COLORS.get(value, _DEFAULT_BADGE_COLOR), label)
+    for value, label in QuizQuestion.QUESTION_TYPES
+}
+_ATTEMPT_STATUS_BADGES = {
+    value: format_html(_BADGE_TEMPLATE, _ATTEMPT_STATUS_COLORS.get(value, _DEFAULT_BADGE_COLOR), label)
+    for value, label in QuizAttempt.STATUS_CHOICES
+}
+
+# Статичные фрагменты разметки — без format_html на каждую строку
+_FINAL_EXAM_BADGES = (
+    mark_safe('<span style="background-color: #6c757d; color: white; padding: 3px 8px; border-radius: 3px;">📝 Обычный</span>'),
+    mark_safe('<span style="background-color: #dc3545; color: white; padding: 3px 8px; border-radius: 3px;">🎓 Итоговый</span>'),
+)
+_PASSED_BADGES = (
+    mark_safe('<span style="color: #dc3545; font-weight: bold;">❌ Не пройден</span>'),
+    mark_safe('<span style="color: #28a745; font-weight: bold;">✅ Пройден</span>'),
+)
+_ANSWER_CORRECT_BADGES = (
+    mark_safe('<span style="color: #dc3545;">❌ Неправильный</span>'),
+    mark_safe('<span style="color: #28a745; font-weight: bold;">✅ Правильный</span>'),
+)
+_RESPONSE_CORRECT_BADGES = (
+    mark_safe('<span style="color: #dc3545; font-weight: bold;">❌ Неправильно</span>'),
+    mark_safe('<span style="color: #28a745; font-weight: bold;">✅ Правильно</span>'),
+)
+
+
 class QuizAnswerInline(admin.TabularInline):
     """Inline для вариантов ответов"""
     model = QuizAnswer
@@ -14,6 +62,9 @@ class QuizAnswerInline(admin.TabularInline):
     readonly_fields = ['has_responses']
     ordering = ['order']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_responses_count=Count('selected_by'))
+
     def has_responses(self, obj):
         """Показать есть ли ответы студентов"""
         if not obj.pk:
@@ -21,12 +72,11 @@ class QuizAnswerInline(admin.TabularInline):
         # Проверяем что это QuizAnswer, а не родительский объект
         if not hasattr(obj, 'selected_by'):
             return '-'
-        count = obj.selected_by.count()
+        count = getattr(obj, '_responses_count', None)
+        if count is None:
+            count = obj.selected_by.count()
         if count > 0:
-            return format_html(
-                '<span style="color: red;">🔒 {} ответов</span>',
-                count
-            )
+            return mark_safe(f'<span style="color: red;">🔒 {int(count)} ответов</span>')
         return '✅ Можно удалить'
 
     has_responses.short_description = 'Использован'
@@ -41,7 +91,8 @@ class QuizAnswerInline(admin.TabularInline):
 @admin.register(QuizQuestion)
 class QuizQuestionAdmin(admin.ModelAdmin):
     list_display = ['question_text_short', 'quiz', 'type_badge', 'points', 'order', 'answers_info']
-    list_filter = ['quiz__lesson__module__course', 'question_type']
+    list_select_related = ('quiz__lesson',)
+    list_filter = [CourseListFilter.for_path('quiz__lesson__module__course'), 'question_type']
     search_fields = ['question_text', 'quiz__lesson__title']
     readonly_fields = ['created_at', 'updated_at', 'answers_count', 'correct_answers_count']
 
@@ -61,29 +112,33 @@ class QuizQuestionAdmin(admin.ModelAdmin):
 
     inlines = [QuizAnswerInline]
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        """Тесты в списке выбора — вместе с уроком (он в __str__ теста)"""
+        if db_field.name == "quiz":
+            kwargs["queryset"] = QuizLesson.objects.select_related('lesson')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            _answers_count=Count('answers'),
+            _correct_answers_count=Count('answers', filter=Q(answers__is_correct=True)),
+        )
+
     def question_text_short(self, obj):
         return obj.question_text[:70] + '...' if len(obj.question_text) > 70 else obj.question_text
 
     question_text_short.short_description = 'Вопрос'
 
     def type_badge(self, obj):
-        colors = {
-            'single_choice': '#007bff',
-            'multiple_choice': '#28a745',
-            'true_false': '#ffc107',
-        }
-        return format_html(
-            '<span style="background-color: {}; color: white; padding: 3px 10px; border-radius: 3px;">{}</span>',
-            colors.get(obj.question_type, '#6c757d'),
-            obj.get_question_type_display()
-        )
+        badge = _QUESTION_TYPE_BADGES.get(obj.question_type)
+        if badge is None:
+            return format_html(_BADGE_TEMPLATE, _DEFAULT_BADGE_COLOR, obj.get_question_type_display())
+        return badge
 
     type_badge.short_description = 'Тип'
 
     def answers_info(self, obj):
-        total = obj.get_answers_count()
-        correct = obj.get_correct_answers_count()
-        return f'✅ {correct} / 📝 {total}'
+        return f'✅ {obj._correct_answers_count} / 📝 {obj._answers_count}'
 
     answers_info.short_description = 'Ответы'
 
@@ -115,7 +170,8 @@ class QuizQuestionInline(admin.TabularInline):
 class QuizLessonAdmin(admin.ModelAdmin):
     list_display = ['lesson', 'is_final_badge', 'passing_score', 'max_attempts', 'time_limit', 'questions_count',
                     'total_points']
-    list_filter = ['is_final_exam', 'lesson__module__course']
+    list_select_related = ('lesson',)
+    list_filter = ['is_final_exam', CourseListFilter.for_path('lesson__module__course')]
     search_fields = ['lesson__title']
     readonly_fields = ['questions_count', 'total_points']
 
@@ -142,6 +198,12 @@ class QuizLessonAdmin(admin.ModelAdmin):
 
     inlines = [QuizQuestionInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            _questions_count=Count('questions'),
+            _total_points=Coalesce(Sum('questions__points'), 0),
+        )
+
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
         """Показывать только уроки с типом 'quiz'"""
         if db_field.name == "lesson":
@@ -149,11 +211,7 @@ class QuizLessonAdmin(admin.ModelAdmin):
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
     def is_final_badge(self, obj):
-        if obj.is_final_exam:
-            return format_html(
-                '<span style="background-color: #dc3545; color: white; padding: 3px 8px; border-radius: 3px;">🎓 Итоговый</span>')
-        return format_html(
-            '<span style="background-color: #6c757d; color: white; padding: 3px 8px; border-radius: 3px;">📝 Обычный</span>')
+        return _FINAL_EXAM_BADGES[obj.is_final_exam]
 
     is_final_badge.short_description = 'Тип'
 
@@ -164,22 +222,20 @@ class QuizLessonAdmin(admin.ModelAdmin):
 
     time_limit.short_description = 'Лимит времени'
 
+    @admin.display(description='Вопросов', ordering='_questions_count')
     def questions_count(self, obj):
         if obj.pk:
             if obj.is_final_exam:
                 return f'🎓 {obj.total_questions} (агрегация)'
-            return f'❓ {obj.get_questions_count()}'
+            return f'❓ {obj._questions_count}'
         return 0
 
-    questions_count.short_description = 'Вопросов'
-
+    @admin.display(description='Всего баллов', ordering='_total_points')
     def total_points(self, obj):
         if obj.pk:
-            return f'⭐ {obj.get_total_points()}'
+            return f'⭐ {obj._total_points}'
         return 0
 
-    total_points.short_description = 'Всего баллов'
-
 class QuizResponseInline(admin.TabularInline):
     """Inline для ответов попытки"""
     model = QuizResponse
@@ -188,6 +244,11 @@ class QuizResponseInline(admin.TabularInline):
     readonly_fields = ['question', 'is_correct', 'points_earned', 'selected_answers_display']
     can_delete = False
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'question__quiz__lesson'
+        ).prefetch_related('selected_answers')
+
     def selected_answers_display(self, obj):
         if obj.pk:
             answers = obj.selected_answers.all()
@@ -204,11 +265,14 @@ class QuizResponseInline(admin.TabularInline):
 class QuizAttemptAdmin(admin.ModelAdmin):
     list_display = ['user', 'quiz', 'attempt_number', 'status_badge', 'score_badge', 'passed_badge', 'completed_ip',
                     'started_at', 'duration']
-    list_filter = ['status', 'quiz__lesson__module__course', 'started_at']
+    list_select_related = ('user', 'quiz__lesson')
+    list_filter = ['status', CourseListFilter.for_path('quiz__lesson__module__course'), 'started_at']
     search_fields = ['user__email', 'user__first_name', 'user__last_name', 'quiz__lesson__title']
     readonly_fields = ['user', 'quiz', 'attempt_number', 'status', 'score_percentage', 'started_at', 'completed_at',
                        'duration_display', 'completed_ip', 'completed_user_agent']
     date_hierarchy = 'started_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         ('Основная информация', {
@@ -225,16 +289,10 @@ class QuizAttemptAdmin(admin.ModelAdmin):
     inlines = [QuizResponseInline]
 
     def status_badge(self, obj):
-        colors = {
-            'in_progress': '#ffc107',
-            'completed': '#28a745',
-            'timeout': '#dc3545',
-        }
-        return format_html(
-            '<span style="background-color: {}; color: white; padding: 3px 10px; border-radius: 3px;">{}</span>',
-            colors.get(obj.status, '#6c757d'),
-            obj.get_status_display()
-        )
+        badge = _ATTEMPT_STATUS_BADGES.get(obj.status)
+        if badge is None:
+            return format_html(_BADGE_TEMPLATE, _DEFAULT_BADGE_COLOR, obj.get_status_display())
+        return badge
 
     status_badge.short_description = 'Статус'
 
@@ -247,9 +305,7 @@ class QuizAttemptAdmin(admin.ModelAdmin):
 
     def passed_badge(self, obj):
         if obj.status == 'completed':
-            if obj.is_passed():
-                return format_html('<span style="color: #28a745; font-weight: bold;">✅ Пройден</span>')
-            return format_html('<span style="color: #dc3545; font-weight: bold;">❌ Не пройден</span>')
+            return _PASSED_BADGES[obj.is_passed()]
         return '-'
 
     passed_badge.short_description = 'Пройден'
@@ -267,8 +323,7 @@ class QuizAttemptAdmin(admin.ModelAdmin):
     def duration_display(self, obj):
         if obj.pk:
             seconds = obj.get_duration_seconds()
-            minutes = int(seconds // 60)
-            secs = int(seconds % 60)
+            minutes, secs = divmod(int(seconds), 60)
             return f'{minutes} мин {secs} сек'
         return '-'
 
@@ -284,9 +339,19 @@ class QuizAttemptAdmin(admin.ModelAdmin):
 @admin.register(QuizAnswer)
 class QuizAnswerAdmin(admin.ModelAdmin):
     list_display = ['answer_text_short', 'question_short', 'is_correct_badge', 'order', 'responses_count']
-    list_filter = ['is_correct', 'question__quiz__lesson__module__course']
+    list_select_related = ('question',)
+    list_filter = ['is_correct', CourseListFilter.for_path('question__quiz__lesson__module__course')]
     search_fields = ['answer_text', 'question__question_text']
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        """Вопросы в списке выбора — вместе с тестом и уроком (они в __str__ вопроса)"""
+        if db_field.name == "question":
+            kwargs["queryset"] = QuizQuestion.objects.select_related('quiz__lesson')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_responses_count=Count('selected_by'))
+
     def answer_text_short(self, obj):
         return obj.answer_text[:60] + '...' if len(obj.answer_text) > 60 else obj.answer_text
 
@@ -299,19 +364,18 @@ class QuizAnswerAdmin(admin.ModelAdmin):
     question_short.short_description = 'Вопрос'
 
     def is_correct_badge(self, obj):
-        if obj.is_correct:
-            return format_html('<span style="color: #28a745; font-weight: bold;">✅ Правильный</span>')
-        return format_html('<span style="color: #dc3545;">❌ Неправильный</span>')
+        return _ANSWER_CORRECT_BADGES[obj.is_correct]
 
     is_correct_badge.short_description = 'Правильность'
 
     def responses_count(self, obj):
-        count = obj.selected_by.count()
+        count = obj._responses_count
         if count > 0:
-            return format_html('<span style="color: red;">🔒 {}</span>', count)
+            return mark_safe(f'<span style="color: red;">🔒 {int(count)}</span>')
         return '✅ 0'
 
     responses_count.short_description = 'Выбран студентами'
+    responses_count.admin_order_field = '_responses_count'
 
     def delete_model(self, request, obj):
         if obj.selected_by.exists():
@@ -332,10 +396,13 @@ class QuizAnswerAdmin(admin.ModelAdmin):
 @admin.register(QuizResponse)
 class QuizResponseAdmin(admin.ModelAdmin):
     list_display = ['attempt_info', 'question_short', 'is_correct_badge', 'points_earned', 'answered_at']
+    list_select_related = ('attempt__user', 'question')
     list_filter = ['is_correct', 'answered_at']
     search_fields = ['attempt__user__email', 'question__question_text']
     readonly_fields = ['attempt', 'question', 'selected_answers_display', 'is_correct', 'points_earned', 'answered_at']
     date_hierarchy = 'answered_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         ('Основная информация', {
@@ -358,9 +425,7 @@ class QuizResponseAdmin(admin.ModelAdmin):
     question_short.short_description = 'Вопрос'
 
     def is_correct_badge(self, obj):
-        if obj.is_correct:
-            return format_html('<span style="color: #28a745; font-weight: bold;">✅ Правильно</span>')
-        return format_html('<span style="color: #dc3545; font-weight: bold;">❌ Неправильно</span>')
+        return _RESPONSE_CORRECT_BADGES[obj.is_correct]
 
     is_correct_badge.short_description = 'Результат'
 
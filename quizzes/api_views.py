@@ -1,6 +1,5 @@
 from django.db import transaction
 from django.shortcuts import get_object_or_404
-from django.utils import timezone
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
@@ -18,27 +17,6 @@ from .serializers import (
 )
 
 
-def _format_available_in(available_at):
-    """Форматировать время доступности в человекочитаемый вид"""
-    if not available_at:
-        return None
-
-    delta = available_at - timezone.now()
-
-    if delta.total_seconds() < 0:
-        return "доступен сейчас"
-
-    hours = int(delta.total_seconds() // 3600)
-    minutes = int((delta.total_seconds() % 3600) // 60)
-
-    if hours > 0 and minutes > 0:
-        return f"через {hours} ч. {minutes} мин."
-    elif hours > 0:
-        return f"через {hours} ч."
-    else:
-        return f"через {minutes} мин."
-
-
 def _aggregate_final_exam_questions(quiz):
     """
     Собрать вопросы для итогового теста из промежуточных тестов курса.
@@ -51,11 +29,11 @@ def _aggregate_final_exam_questions(quiz):
     import random
     from content.models import Module
 
-    course = quiz.lesson.module.course
+    course_id = quiz.lesson.module.course_id
 
     # Получаем все промежуточные тесты курса (кроме итоговых)
     module_quizzes = QuizLesson.objects.filter(
-        lesson__module__course=course,
+        lesson__module__course_id=course_id,
         is_final_exam=False
     ).prefetch_related('questions__answers').order_by(
         'lesson__module__order', 'lesson__order'
@@ -176,8 +154,9 @@ def submit_quiz(request, attempt_id):
         ]
     }
     """
+    # Тест, урок и модуль нужны для проверки времени и завершения — берём их тем же запросом
     attempt = get_object_or_404(
-        QuizAttempt,
+        QuizAttempt.objects.select_related('quiz__lesson__module'),
         id=attempt_id,
         user=request.user
     )
@@ -207,9 +186,12 @@ def submit_quiz(request, attempt_id):
 
     # Обработка ответов в транзакции
     with transaction.atomic():
-        correct_count = 0
+        submitted = []
         total_questions = len(answers_data)
 
+        # Варианты ответов подгружаются вместе с вопросом — их используют и порядок, и проверка
+        questions = QuizQuestion.objects.prefetch_related('answers')
+
         for answer_data in answers_data:
             question_id = answer_data['question_id']
             answer_ids = answer_data['answer_ids']
@@ -223,17 +205,18 @@ def submit_quiz(request, attempt_id):
                         {'error': f'Вопрос {question_id} не принадлежит этой попытке'},
                         status=status.HTTP_400_BAD_REQUEST
                     )
-                question = get_object_or_404(QuizQuestion, id=question_id)
+                question = get_object_or_404(questions, id=question_id)
             else:
                 question = get_object_or_404(
-                    QuizQuestion,
+                    questions,
                     id=question_id,
                     quiz=attempt.quiz
                 )
 
             # Получаем ответы в том порядке, как они были показаны
             # (из клиента должен прийти порядок, или восстанавливаем из attempt)
-            answers = list(question.answers.all().order_by('order'))
+            # Ответы загружены вместе с вопросом и уже отсортированы по order
+            answers = list(question.answers.all())
 
             # Если тест перемешивает ответы - используем порядок из attempt
             if attempt.quiz.shuffle_answers:
@@ -243,21 +226,12 @@ def submit_quiz(request, attempt_id):
             else:
                 answers_order = [a.id for a in answers]
 
-            # Создаем ответ пользователя
-            response = QuizResponse.objects.create(
-                attempt=attempt,
-                question=question,
-                answers_order=answers_order  # ← СОХРАНЯЕМ ПОРЯДОК
-            )
-
-            # Добавляем выбранные ответы
-            response.selected_answers.set(answer_ids)
+            # Ответ сохраняется вместе с порядком показа вариантов
+            submitted.append((question, answers_order, answer_ids))
 
-            # Проверяем правильность и начисляем баллы
-            response.check_answer()
-
-            if response.is_correct:
-                correct_count += 1
+        # Сохраняем все ответы пачкой: правильность и баллы считаются до вставки
+        responses = QuizResponse.bulk_submit(attempt, submitted)
+        correct_count = sum(1 for response in responses if response.is_correct)
 
         # Завершаем попытку
         attempt.complete(request=request)
@@ -283,53 +257,30 @@ def submit_quiz(request, attempt_id):
             'time_expired': False
         }
 
-        # Если тест пройден - обновляем прогресс урока
+        # Если тест пройден - урок уже завершён в attempt.complete() (mark_completed с IP и браузером)
         if passed:
             from progress.models import CourseEnrollment
 
-            # ИСПРАВЛЕНО: get_or_create вместо get
-            lesson_progress, created = LessonProgress.objects.get_or_create(
-                user=request.user,
-                lesson=attempt.quiz.lesson,
-                defaults={'is_completed': False}
-            )
-
-            # Завершаем урок с данными о тесте
-            lesson_progress.mark_completed(
-                completion_data={
-                    'quiz_score': attempt.score_percentage,
-                    'quiz_attempt': attempt.attempt_number
-                },
-                request=request
-            )
-
             # Получаем enrollment и курс
-            course = lesson_progress.lesson.module.course
-            enrollment = CourseEnrollment.objects.get(
+            lesson = attempt.quiz.lesson
+            course = lesson.module.course
+            enrollment = CourseEnrollment.objects.only(
+                'progress_percentage', 'completed_lessons_count'
+            ).get(
                 user=request.user,
                 course=course
             )
 
-            # Подсчитываем прогресс
-            total_lessons = course.get_lessons_count()
-            completed_lessons = LessonProgress.objects.filter(
-                user=request.user,
-                lesson__module__course=course,
-                is_completed=True
-            ).count()
-
-            percentage = (completed_lessons / total_lessons * 100) if total_lessons > 0 else 0
-
-            # Добавляем прогресс курса
+            # Прогресс только что пересчитан в mark_completed() — берём сохранённые значения
             course_progress_data = {
-                'percentage': round(percentage, 2),
-                'completed_lessons': completed_lessons,
-                'total_lessons': total_lessons
+                'percentage': float(enrollment.progress_percentage),
+                'completed_lessons': enrollment.completed_lessons_count,
+                'total_lessons': course.get_lessons_count()
             }
             result_data['course_progress'] = course_progress_data
 
             # Получаем следующий урок
-            next_lesson = lesson_progress.lesson.get_next_lesson()
+            next_lesson = lesson.get_next_lesson()
 
             # Добавляем следующий урок
             if next_lesson:
@@ -338,11 +289,15 @@ def submit_quiz(request, attempt_id):
                     lesson=next_lesson
                 )
 
+                # Предыдущий для следующего урока — этот тест: не ищем его заново
+                next_lesson._previous_lesson = lesson
+                next_lesson_progress.lesson = next_lesson
+
                 # ВСЕГДА пересчитываем доступность после завершения предыдущего
                 next_lesson_progress.calculate_available_at()
 
                 # Форматируем время доступности
-                available_in = _format_available_in(next_lesson_progress.available_at)
+                available_in = next_lesson_progress.get_available_in()
 
                 result_data['next_lesson'] = {
                     'id': next_lesson.id,
@@ -420,6 +375,9 @@ def user_quiz_attempts(request):
     if quiz_id:
         attempts = attempts.filter(quiz_id=quiz_id)
 
+    # Просроченные попытки закрываем одним запросом, а не по одной в сериализаторе
+    attempts.close_expired()
+
     serializer = QuizAttemptSerializer(attempts, many=True)
     return Response(serializer.data)
 
@@ -433,7 +391,7 @@ def quiz_attempt_detail(request, attempt_id):
     GET /api/quizzes/attempts/{id}/
     """
     attempt = get_object_or_404(
-        QuizAttempt,
+        QuizAttempt.objects.select_related('quiz__lesson'),
         id=attempt_id,
         user=request.user
     )
@@ -458,8 +416,13 @@ def quiz_attempt_detail(request, attempt_id):
     # Используем сохраненный порядок вопросов
     questions_ids = attempt.questions_order if attempt.questions_order else []
 
+    # Ответы попытки вместе с вопросами, их вариантами и выбранными вариантами — без запросов в цикле
+    responses = attempt.responses.select_related('question').prefetch_related(
+        'question__answers', 'selected_answers'
+    )
+
     if questions_ids:
-        responses_dict = {r.question_id: r for r in attempt.responses.all()}
+        responses_dict = {r.question_id: r for r in responses}
 
         for question_id in questions_ids:
             response = responses_dict.get(question_id)
@@ -479,19 +442,15 @@ def quiz_attempt_detail(request, attempt_id):
 
                 question_data['answers'] = QuizAnswerWithCorrectSerializer(ordered_answers, many=True).data
 
-            question_data['user_selected_ids'] = list(
-                response.selected_answers.values_list('id', flat=True)
-            )
+            question_data['user_selected_ids'] = [a.id for a in response.selected_answers.all()]
             question_data['is_correct'] = response.is_correct
             question_data['points_earned'] = response.points_earned
             questions_with_answers.append(question_data)
     else:
         # Fallback для старых попыток
-        for response in attempt.responses.all():
+        for response in responses:
             question_data = QuizQuestionWithCorrectSerializer(response.question).data
-            question_data['user_selected_ids'] = list(
-                response.selected_answers.values_list('id', flat=True)
-            )
+            question_data['user_selected_ids'] = [a.id for a in response.selected_answers.all()]
             question_data['is_correct'] = response.is_correct
             question_data['points_earned'] = response.points_earned
             questions_with_answers.append(question_data)
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0006_quizattempt_completed_ip_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizresponse',
+            index=models.Index(fields=['-answered_at'], name='quizzes_qui_answere_3dd313_idx'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
+from django.utils.functional import cached_property
 from content.models import Lesson
 
 
@@ -97,11 +98,9 @@ class QuizLesson(models.Model):
         # === ПРОВЕРКА РАСПИСАНИЯ ИТОГОВОГО ТЕСТА ===
         if self.is_final_exam:
             from progress.models import CourseEnrollment
-            course = self.lesson.module.course
-
             enrollment = CourseEnrollment.objects.filter(
                 user=user,
-                course=course,
+                course_id=self.lesson.module.course_id,
                 is_active=True
             ).select_related('group').first()
 
@@ -129,14 +128,14 @@ class QuizLesson(models.Model):
         # Проверка задержки между попытками
         if self.retry_delay_minutes > 0:
             # Учитываем completed И timeout
-            finished_attempts = attempts.filter(
+            # Нужна только дата последней попытки — одним запросом, без exists() и загрузки попытки
+            last_completed_at = attempts.filter(
                 status__in=['completed', 'timeout'],
                 completed_at__isnull=False
-            ).order_by('-completed_at')
+            ).order_by('-completed_at').values_list('completed_at', flat=True).first()
 
-            if finished_attempts.exists():
-                last_attempt = finished_attempts.first()
-                available_at = last_attempt.completed_at + timezone.timedelta(minutes=self.retry_delay_minutes)
+            if last_completed_at:
+                available_at = last_completed_at + timezone.timedelta(minutes=self.retry_delay_minutes)
 
                 if timezone.now() < available_at:
                     remaining = available_at - timezone.now()
@@ -205,6 +204,11 @@ class QuizQuestion(models.Model):
     def __str__(self):
         return f"{self.quiz.lesson.title} - {self.question_text[:50]}"
 
+    @cached_property
+    def correct_answer_ids(self):
+        """ID правильных ответов. С prefetch_related('answers') — без отдельного запроса"""
+        return frozenset(answer.pk for answer in self.answers.all() if answer.is_correct)
+
     def get_correct_answers_count(self):
         """Количество правильных ответов"""
         return self.answers.filter(is_correct=True).count()
@@ -239,6 +243,36 @@ class QuizAnswer(models.Model):
         return f"{correct} {self.answer_text[:50]}"
 
 
+class QuizAttemptQuerySet(models.QuerySet):
+
+    def expired_ids(self, now):
+        """
+        ID попыток в процессе, у которых к моменту now истёк лимит времени.
+        Дедлайн считается в Python: started_at + time_limit_minutes.
+        """
+        candidates = self.filter(
+            status='in_progress', quiz__time_limit_minutes__gt=0,
+        ).values_list('id', 'started_at', 'quiz__time_limit_minutes')
+
+        return [
+            attempt_id
+            for attempt_id, started_at, limit in candidates
+            if now > started_at + timezone.timedelta(minutes=limit)
+        ]
+
+    def close_expired(self):
+        """Закрыть по таймауту все просроченные попытки выборки одним UPDATE"""
+        now = timezone.now()
+        expired_ids = self.expired_ids(now)
+        if not expired_ids:
+            return 0
+
+        # status повторно в условии UPDATE: попытку, сданную между выборкой и обновлением, не трогаем
+        return QuizAttempt.objects.filter(id__in=expired_ids, status='in_progress').update(
+            status='timeout', score_percentage=0, completed_at=now,
+        )
+
+
 class QuizAttempt(models.Model):
     """Попытка прохождения теста"""
 
@@ -294,6 +328,8 @@ class QuizAttempt(models.Model):
     completed_ip = models.GenericIPAddressField('IP при сдаче', null=True, blank=True)
     completed_user_agent = models.TextField('Браузер при сдаче', blank=True, default='')
 
+    objects = QuizAttemptQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Попытка прохождения теста'
         verbose_name_plural = 'Попытки прохождения тестов'
@@ -308,12 +344,13 @@ class QuizAttempt(models.Model):
 
     def calculate_score(self):
         """Рассчитать результат попытки"""
-        responses = self.responses.all()
-        if not responses.exists():
-            return 0
-
-        total_points = sum(r.question.points for r in responses)
-        earned_points = sum(r.points_earned for r in responses)
+        # Баллы по всем ответам одним агрегирующим запросом
+        totals = self.responses.aggregate(
+            total_points=models.Sum('question__points'),
+            earned_points=models.Sum('points_earned'),
+        )
+        total_points = totals['total_points'] or 0
+        earned_points = totals['earned_points'] or 0
 
         if total_points > 0:
             percentage = (earned_points / total_points) * 100
@@ -338,23 +375,24 @@ class QuizAttempt(models.Model):
             self.completed_ip = x_forwarded.split(',')[0].strip() if x_forwarded else request.META.get('REMOTE_ADDR')
             self.completed_user_agent = request.META.get('HTTP_USER_AGENT', '')
 
-        self.save()
+        self.save(update_fields=[
+            'score_percentage', 'status', 'completed_at', 'completed_ip', 'completed_user_agent'
+        ])
 
         # Обновить прогресс урока если тест пройден
         if self.is_passed():
             from progress.models import LessonProgress
 
             # ИСПРАВЛЕНО: Используем mark_completed() для полной логики
-            lesson_progress, created = LessonProgress.objects.get_or_create(
+            lesson_progress, created = LessonProgress.get_or_create_safe(
                 user=self.user,
-                lesson=self.quiz.lesson,
-                defaults={'is_completed': False}
+                lesson=self.quiz.lesson
             )
 
             lesson_progress.mark_completed({
                 'quiz_score': float(self.score_percentage),
                 'quiz_attempt': self.attempt_number
-            })
+            }, request=request)
 
     def get_duration_seconds(self):
         """Длительность попытки в секундах"""
@@ -384,7 +422,7 @@ class QuizAttempt(models.Model):
         self.score_percentage = 0  # При таймауте всегда 0%
         self.status = 'timeout'
         self.completed_at = timezone.now()
-        self.save()
+        self.save(update_fields=['score_percentage', 'status', 'completed_at'])
 
 
 class QuizResponse(models.Model):
@@ -427,18 +465,29 @@ class QuizResponse(models.Model):
         verbose_name_plural = 'Ответы на вопросы'
         ordering = ['attempt', 'question__order']
         unique_together = ['attempt', 'question']
+        indexes = [
+            models.Index(fields=['-answered_at']),
+        ]
 
     def __str__(self):
         status = '✅' if self.is_correct else '❌'
         return f"{status} {self.attempt.user.email} - {self.question.question_text[:30]}"
 
-    def check_answer(self):
-        """Проверить правильность ответа и начислить баллы"""
-        selected = set(self.selected_answers.all())
-        correct = set(self.question.answers.filter(is_correct=True))
+    def check_answer(self, selected_answer_ids=None):
+        """
+        Проверить правильность ответа и начислить баллы.
+        selected_answer_ids — уже известные ID выбранных ответов, чтобы не перечитывать их из БД.
+        """
+        if selected_answer_ids is None:
+            selected_answer_ids = self.selected_answers.values_list('pk', flat=True)
+
+        self._evaluate(selected_answer_ids)
+        self.save(update_fields=['is_correct', 'points_earned'])
 
+    def _evaluate(self, selected_answer_ids):
+        """Выставить is_correct и points_earned без сохранения"""
         # Проверка правильности
-        self.is_correct = (selected == correct)
+        self.is_correct = (frozenset(selected_answer_ids) == self.question.correct_answer_ids)
 
         # Начисление баллов
         if self.is_correct:
@@ -446,4 +495,30 @@ class QuizResponse(models.Model):
         else:
             self.points_earned = 0
 
-        self.save()
\ No newline at end of file
+    @classmethod
+    def bulk_submit(cls, attempt, submitted):
+        """
+        Сохранить ответы попытки пачкой: один INSERT ответов и один INSERT выбранных вариантов.
+        submitted — список кортежей (question, answers_order, answer_ids).
+        """
+        responses = []
+        selected_ids = []
+        for question, answers_order, answer_ids in submitted:
+            # Повторы ID схлопываются, как при selected_answers.set()
+            answer_ids = list(dict.fromkeys(answer_ids))
+
+            response = cls(attempt=attempt, question=question, answers_order=answers_order)
+            response._evaluate(answer_ids)
+            responses.append(response)
+            selected_ids.append(answer_ids)
+
+        cls.objects.bulk_create(responses)
+
+        through = cls.selected_answers.through
+        through.objects.bulk_create([
+            through(quizresponse_id=response.pk, quizanswer_id=answer_id)
+            for response, answer_ids in zip(responses, selected_ids)
+            for answer_id in answer_ids
+        ], ignore_conflicts=True)
+
+        return responses
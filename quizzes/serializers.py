@@ -160,11 +160,9 @@ class QuizLessonDetailSerializer(serializers.ModelSerializer):
         # === ПРОВЕРКА РАСПИСАНИЯ ИТОГОВОГО ТЕСТА ===
         if obj.is_final_exam:
             from progress.models import CourseEnrollment
-            course = obj.lesson.module.course
-
             enrollment = CourseEnrollment.objects.filter(
                 user=user,
-                course=course,
+                course_id=obj.lesson.module.course_id,
                 is_active=True
             ).select_related('group').first()
 
@@ -301,6 +299,7 @@ class QuizSubmitSerializer(serializers.Serializer):
 
     def validate_answers(self, value):
         """Валидация структуры ответов"""
+        id_field = serializers.IntegerField()
         for answer in value:
             if 'question_id' not in answer:
                 raise serializers.ValidationError('Отсутствует question_id')
@@ -309,6 +308,13 @@ class QuizSubmitSerializer(serializers.Serializer):
             if not isinstance(answer['answer_ids'], list):
                 raise serializers.ValidationError('answer_ids должен быть массивом')
 
+            # DictField не приводит типы: "2" и 2 должны проверяться одинаково (сравнение идёт с pk ответов)
+            try:
+                answer['question_id'] = id_field.to_internal_value(answer['question_id'])
+                answer['answer_ids'] = [id_field.to_internal_value(answer_id) for answer_id in answer['answer_ids']]
+            except serializers.ValidationError:
+                raise serializers.ValidationError('question_id и answer_ids должны быть целыми числами')
+
         return value
 
 
@@ -1,3 +1,256 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from account.models import User
+from content.models import Course, Module, Lesson
+from groups.models import Group
+from quizzes.models import (
+    QuizLesson, QuizQuestion, QuizAnswer, QuizAttempt, QuizAttemptQuerySet, QuizResponse,
+)
+from quizzes.serializers import QuizSubmitSerializer
+
+
+class QuizTestBase(TestCase):
+    """
+    Общие фикстуры. Создаёт студента в группе курса с уроком-тестом:
+    вопрос с одним правильным ответом и вопрос с двумя правильными.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='student@test.com',
+            password='testpass123',
+            iin='123456789012',
+            first_name='Test',
+            last_name='Student',
+        )
+        self.course = Course.objects.create(title='Test Course')
+        self.module = Module.objects.create(
+            course=self.course, title='Module 1', order=0,
+        )
+        self.lesson = Lesson.objects.create(
+            module=self.module, title='Quiz', lesson_type='quiz', order=0,
+            requires_previous_completion=False,
+        )
+        self.quiz = QuizLesson.objects.create(lesson=self.lesson, passing_score=100)
+
+        self.single = QuizQuestion.objects.create(
+            quiz=self.quiz, question_type='single_choice', question_text='2 + 2?', order=0,
+        )
+        self.single_right = QuizAnswer.objects.create(question=self.single, answer_text='4', is_correct=True, order=0)
+        self.single_wrong = QuizAnswer.objects.create(question=self.single, answer_text='5', order=1)
+
+        self.multiple = QuizQuestion.objects.create(
+            quiz=self.quiz, question_type='multiple_choice', question_text='Чётные?', order=1,
+        )
+        self.multiple_a = QuizAnswer.objects.create(question=self.multiple, answer_text='2', is_correct=True, order=0)
+        self.multiple_b = QuizAnswer.objects.create(question=self.multiple, answer_text='4', is_correct=True, order=1)
+        self.multiple_c = QuizAnswer.objects.create(question=self.multiple, answer_text='5', order=2)
+
+        self.group = Group.objects.create(
+            course=self.course,
+            name='Test Group',
+            deadline_type='personal_days',
+            deadline_days=90,
+            max_students=0,
+            is_active=True,
+        )
+        # Сигнал создаст enrollment + lesson progress
+        self.group.add_student(self.user)
+
+        self.attempt = QuizAttempt.objects.create(
+            user=self.user,
+            quiz=self.quiz,
+            questions_order=[self.single.pk, self.multiple.pk],
+        )
+
+
+# ─── QuizSubmitSerializer ──────────────────────────────────────────
+
+class QuizSubmitSerializerTest(QuizTestBase):
+
+    def test_string_ids_coerced_to_int(self):
+        """ID из JSON строками приводятся к int."""
+        serializer = QuizSubmitSerializer(data={'answers': [
+            {'question_id': str(self.multiple.pk), 'answer_ids': [str(self.multiple_a.pk), self.multiple_b.pk]},
+        ]})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        answer = serializer.validated_data['answers'][0]
+        self.assertEqual(answer['question_id'], self.multiple.pk)
+        self.assertEqual(answer['answer_ids'], [self.multiple_a.pk, self.multiple_b.pk])
+
+    def test_non_integer_ids_rejected(self):
+        serializer = QuizSubmitSerializer(data={'answers': [
+            {'question_id': self.single.pk, 'answer_ids': ['abc']},
+        ]})
+        self.assertFalse(serializer.is_valid())
+
+
+# ─── QuizResponse: оценка ответа ───────────────────────────────────
+
+class QuizResponseScoringTest(QuizTestBase):
+
+    def test_check_answer_all_correct(self):
+        response = QuizResponse.objects.create(attempt=self.attempt, question=self.multiple)
+        response.selected_answers.set([self.multiple_a, self.multiple_b])
+        response.check_answer()
+        self.assertTrue(response.is_correct)
+        self.assertEqual(response.points_earned, self.multiple.points)
+
+    def test_check_answer_partial_is_wrong(self):
+        response = QuizResponse.objects.create(attempt=self.attempt, question=self.multiple)
+        response.check_answer(selected_answer_ids=[self.multiple_a.pk])
+        self.assertFalse(response.is_correct)
+        self.assertEqual(response.points_earned, 0)
+
+    def test_multiple_choice_scored_from_correct_answer_ids(self):
+        """С prefetch ответов правильные ID берутся из correct_answer_ids — кроме UPDATE запросов нет."""
+        question = QuizQuestion.objects.prefetch_related('answers').get(pk=self.multiple.pk)
+        self.assertEqual(question.question_type, 'multiple_choice')
+        response = QuizResponse.objects.create(attempt=self.attempt, question=question)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(question.correct_answer_ids, {self.multiple_a.pk, self.multiple_b.pk})
+            response.check_answer(selected_answer_ids=[self.multiple_b.pk, self.multiple_a.pk])
+
+        self.assertTrue(response.is_correct)
+        self.assertEqual(response.points_earned, question.points)
+
+    def test_bulk_submit_scores_and_saves_selection(self):
+        responses = QuizResponse.bulk_submit(self.attempt, [
+            (self.single, [], [self.single_right.pk]),
+            (self.multiple, [], [self.multiple_b.pk, self.multiple_a.pk, self.multiple_a.pk]),
+        ])
+        self.assertEqual([r.is_correct for r in responses], [True, True])
+        self.assertEqual(
+            set(responses[1].selected_answers.values_list('pk', flat=True)),
+            {self.multiple_a.pk, self.multiple_b.pk},
+        )
+
+
+# ─── submit_quiz ───────────────────────────────────────────────────
+
+class QuizSubmitViewTest(QuizTestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('quizzes:submit_quiz', args=[self.attempt.pk])
+
+    def _submit(self, answers):
+        response = self.client.post(self.url, {'answers': answers}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_int_ids_scored(self):
+        data = self._submit([
+            {'question_id': self.single.pk, 'answer_ids': [self.single_right.pk]},
+            {'question_id': self.multiple.pk, 'answer_ids': [self.multiple_a.pk, self.multiple_b.pk]},
+        ])
+        self.assertEqual(data['correct_answers'], 2)
+        self.assertTrue(data['passed'])
+
+    def test_string_ids_scored_like_int_ids(self):
+        """Клиент прислал ID строками — оценка та же, что и для чисел."""
+        data = self._submit([
+            {'question_id': str(self.single.pk), 'answer_ids': [str(self.single_right.pk)]},
+            {'question_id': str(self.multiple.pk), 'answer_ids': [str(self.multiple_a.pk), str(self.multiple_b.pk)]},
+        ])
+        self.assertEqual(data['correct_answers'], 2)
+        self.assertTrue(data['passed'])
+
+    def test_wrong_answer_not_counted(self):
+        data = self._submit([
+            {'question_id': self.single.pk, 'answer_ids': [str(self.single_wrong.pk)]},
+            {'question_id': self.multiple.pk, 'answer_ids': [self.multiple_a.pk, self.multiple_b.pk]},
+        ])
+        self.assertEqual(data['correct_answers'], 1)
+        self.assertFalse(data['passed'])
+
+
+# ─── QuizAttempt.objects.close_expired() ───────────────────────────
+
+class QuizAttemptCloseExpiredTest(QuizTestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.quiz.time_limit_minutes = 10
+        self.quiz.save(update_fields=['time_limit_minutes'])
+        QuizAttempt.objects.filter(pk=self.attempt.pk).update(
+            started_at=timezone.now() - timedelta(minutes=30),
+        )
+
+    def test_expired_attempt_closed(self):
+        self.assertEqual(QuizAttempt.objects.close_expired(), 1)
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.status, 'timeout')
+        self.assertEqual(self.attempt.score_percentage, 0)
+
+    def test_attempt_within_limit_untouched(self):
+        QuizAttempt.objects.filter(pk=self.attempt.pk).update(started_at=timezone.now())
+        self.assertEqual(QuizAttempt.objects.close_expired(), 0)
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.status, 'in_progress')
+
+    def test_attempt_submitted_meanwhile_keeps_result(self):
+        """Попытку сдали между выборкой кандидатов и UPDATE — результат не затирается."""
+        fetch_expired_ids = QuizAttemptQuerySet.expired_ids
+        fetched = []
+
+        def submit_after_fetch(queryset, now):
+            expired_ids = fetch_expired_ids(queryset, now)
+            fetched.extend(expired_ids)
+            QuizAttempt.objects.filter(pk=self.attempt.pk).update(status='completed', score_percentage=100)
+            return expired_ids
+
+        with patch.object(QuizAttemptQuerySet, 'expired_ids', autospec=True, side_effect=submit_after_fetch):
+            self.assertEqual(QuizAttempt.objects.close_expired(), 0)
+
+        self.assertEqual(fetched, [self.attempt.pk])
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.status, 'completed')
+        self.assertEqual(self.attempt.score_percentage, 100)
+
+
+# ─── QuizAnswerAdmin ───────────────────────────────────────────────
+
+class QuizAnswerAdminTest(QuizTestBase):
+
+    def setUp(self):
+        super().setUp()
+        admin_user = User.objects.create_superuser(
+            email='admin@test.com', iin='123456789000', first_name='Admin', last_name='Test', password='testpass123',
+        )
+        self.client.force_login(admin_user)
+        self.url = reverse('admin:quizzes_quizanswer_changelist')
+
+        response = QuizResponse.objects.create(attempt=self.attempt, question=self.multiple)
+        response.selected_answers.set([self.multiple_a, self.multiple_b])
+
+    def test_responses_count_annotated(self):
+        """Число выборов берётся из аннотации — без COUNT на каждую строку."""
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.url)
+
+        for order in range(2, 12):
+            QuizAnswer.objects.create(question=self.single, answer_text=str(order), order=order)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
 
-# Create your tests here.
+    def test_sort_by_responses_count(self):
+        response = self.client.get(self.url, {'o': '-5'})
+        self.assertEqual(response.status_code, 200)
+        answers = list(response.context['cl'].result_list)
+        self.assertEqual([a._responses_count for a in answers[:2]], [1, 1])
+        self.assertEqual({a.pk for a in answers[:2]}, {self.multiple_a.pk, self.multiple_b.pk})